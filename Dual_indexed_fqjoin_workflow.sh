@@ -96,31 +96,16 @@ Dual-indexed read joining workflow starting" >> $log
 	date "+%a %b %d %I:%M %p %Z %Y" >> $log
 	res1=$(date +%s.%N)
 
-## Set start of read data for fastx_trimmer steps
-
-	readno=$(($5+1))
-
-## Concatenate index1 in front of index2
+## Concatenate index1 and index2 in front of read1
 
 	echo "
 Concatenating indices and first read."
 	echo "
-First concatenation:" >> $log
-	date "+%a %b %d %I:%M %p %Z %Y" >> $log
-#	echo "	paste -d '' <(echo; sed -n '1,${n;p;}' $1 | sed G) $2 | sed '/^$/d' > $outdir/i1i2.fq" >> $log
-
-	`paste -d '' <(echo; sed -n '1,${n;p;}' $1 | sed G) $2 | sed '/^$/d' > $outdir/i1i2.fq`
-	wait
-
-## Concatenate indexes in front of read1
-
-	echo "
-Second concatenation:" >> $log
+Concatenation:" >> $log
 	date "+%a %b %d %I:%M %p %Z %Y" >> $log
-#	echo "	paste -d '' <(echo; sed -n '1,${n;p;}' $outdir/i1i2.fq | sed G) $3 | sed '/^$/d' > $outdir/i1i2r1.fq"
+	echo "	python $scriptdir/akutils_resources/fastq_concatenate.py join -i $1 $2 $3 -o $outdir/i1i2r1.fq" >> $log
 
-	`paste -d '' <(echo; sed -n '1,${n;p;}' $outdir/i1i2.fq | sed G) $3 | sed '/^$/d' > $outdir/i1i2r1.fq`
-	wait
+	python $scriptdir/akutils_resources/fastq_concatenate.py join -i $1 $2 $3 -o $outdir/i1i2r1.fq >> $log
 
 ## Fastq-join command
 
@@ -144,14 +129,11 @@ Fastq-join results:" >> $log
 Splitting read and index data from successfully joined data."
 
 	echo "
-Split index and read commands:" >> $log
+Split index and read command:" >> $log
 	date "+%a %b %d %I:%M %p %Z %Y" >> $log
-	echo "	fastx_trimmer -l $5 -i $outdir/temp.join.fq -o $outdir/idx.fq -Q 33" >> $log
-	echo "	fastx_trimmer -f $readno -i $outdir/temp.join.fq -o $outdir/rd.fq -Q 33" >> $log
+	echo "	python $scriptdir/akutils_resources/fastq_concatenate.py split -i $outdir/temp.join.fq -l $5 -x $outdir/idx.fq -r $outdir/rd.fq" >> $log
 
-	( fastx_trimmer -l $5 -i $outdir/temp.join.fq -o $outdir/idx.fq -Q 33 ) &
-	( fastx_trimmer -f $readno -i $outdir/temp.join.fq -o $outdir/rd.fq -Q 33 ) &
-	wait
+	python $scriptdir/akutils_resources/fastq_concatenate.py split -i $outdir/temp.join.fq -l $5 -x $outdir/idx.fq -r $outdir/rd.fq >> $log
 
 ## Remove temp files
 
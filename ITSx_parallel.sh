@@ -27,8 +27,9 @@ set -e
 
 ## check whether user had supplied -h or --help. If yes display help 
 
-	if [[ "$1" == "--help" ]] || [[ "$1" == "-h" ]]; then
 	scriptdir="$( cd "$( dirname "$0" )" && pwd )"
+
+	if [[ "$1" == "--help" ]] || [[ "$1" == "-h" ]]; then
 	less $scriptdir/docs/ITSx_parallel.help
 	exit 0
 	fi 
@@ -59,12 +60,18 @@ ITSx_parallel.sh <InputFasta> <ThreadsToUse> <ITSx options>
 
 	cd $workdir
 
-## Check to see if requested output directory exists
+## Check to see if requested output directory exists, unless it holds the
+## batches of an interrupted run to resume
 
-	if [[ -d ${seqfile}\_ITSx_output ]]; then
+	outdir=${seqbase}_ITSx_output
+	if [[ -d $outdir/ITSx_batches ]]; then
+		echo "
+Resuming interrupted run in existing output directory.
+($outdir)"
+	elif [[ -d $outdir ]]; then
 		echo "
 Output directory already exists.
-(${seqfile}_ITSx_output).  
+($outdir).  
 Choose a different output name and try again.
 
 	Exiting.
@@ -79,10 +86,9 @@ Beginning parallel ITSx processing.  This can take a while.
 $date1
 		"
 
-## Make output subdirectories and extract input name and extension to variables
+## Make output directory
 
-	outdir=${seqbase}_ITSx_output
-	mkdir $outdir
+	mkdir -p $outdir
 	log=$outdir/log_${date0}.txt
 
 ## Log search start
@@ -91,57 +97,14 @@ $date1
 Parallel ITSx processing starting.
 $date1" > $log
 
-## Split input using fasta-splitter command
-
-	echo "
-Fasta-splitter command:
-	fasta-splitter.pl --n-parts $2 $infile" >> $log
-	fasta-splitter.pl --n-parts $2 $infile 2>/dev/null 1>/dev/null
-	wait
-
-## Move split input to output directory and construct subdirectory structure for separate processing
-
-	for splitseq in $seqbase.part-* ; do
-		( mv $splitseq $outdir ) &
-	wait
-	done
-
-	for fasta in $outdir/$seqbase.part-*.$seqextension ; do
-    		base=$(basename $fasta .$seqextension)
-    		mkdir $outdir/${base}_ITSx_tmp
-    		mv $fasta $outdir/${base}_ITSx_tmp/
-	wait
-	done
-
-## Log that files have been split and moved as needed
-	echo "
-File splitting achieved." >> $log
-
-## parallel ITSx command
+## Run ITSx on batches of the input from a work queue and merge the results
+## in input order (batches already completed by an interrupted run are
+## skipped)
 
 	echo "
 ITSx command:
-	ITSx -i infile -o outfile -3" >> $log
-
-	for dir in $outdir/*\_ITSx_tmp; do
-		dirbase=$( basename $dir \_ITSx_tmp )
-		( cd $dir/ && sleep 1 && `ITSx -i $dirbase.$seqextension -o $dirbase ${@:3}` && sleep 1 && cd .. ) &
-	done
-	wait
-
-## compile results
-
-	for dir1 in $outdir/*\_ITSx_tmp; do
-		dirbase1=$(basename $dir1 \_ITSx_tmp)
-		( cat $dir1/$dirbase1\_no_detections.txt >> $outdir/$seqbase\_no_detections.txt ) &
-		( cat $dir1/$dirbase1.ITS1.fasta >> $outdir/$seqbase\_ITS1only.fasta ) &
-		( cat $dir1/$dirbase1.ITS2.fasta >> $outdir/$seqbase\_ITS2only.fasta ) &
-	done
-	wait
-
-## Remove temporary files (split input and separate ITSx searches)
-
-	rm -r $outdir/$seqbase.part-*
+	python $scriptdir/akutils_resources/itsx_parallel.py -i $infile -o $outdir -b $seqbase -w $2 --itsx_options \"${*:3}\"" >> $log
+	python $scriptdir/akutils_resources/itsx_parallel.py -i $infile -o $outdir -b $seqbase -w $2 --itsx_options "${*:3}" >> $log
 
 ## Filter input sequences with no_detections file
 
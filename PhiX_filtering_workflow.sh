@@ -191,159 +191,82 @@ PhiX filtering workflow beginning in paired read mode."
 	date "+%a %b %d %I:%M %p %Z %Y" >> $log
 	res1=$(date +%s.%N)
 
-## Make output directory for fastq-multx step
+## Make output directory for demultiplexing step
 
-	mkdir $outdir/fastq-multx_output
+	mkdir $outdir/demultiplexed_output
 
-## Extract barcodes information from mapping file
-
-	grep -v "#" $mapfile | cut -f 1-3 > $outdir/fastq-multx_output/barcodes.fil
-	barcodes=($outdir/fastq-multx_output/barcodes.fil)
-
-## Fastq-multx command:
+## Demultiplex with barcode_demultiplexer.py, writing the reads matching a
+## barcode of the mapping file to a single file per input
 
 	echo "
-Demultiplexing sample data with fastq-multx.  Allowing $multx_errors indexing
-errors.
+Demultiplexing sample data.  Allowing $multx_errors indexing errors.
 Mapping file: $mapfile"
 	echo "
-Demultiplexing data (fastq-multx):" >> $log
+Demultiplexing data (barcode_demultiplexer.py):" >> $log
 	date "+%a %b %d %I:%M %p %Z %Y" >> $log
 
 	if [[ `echo $mode` == "single" ]]; then
-	echo "	fastq-multx -m $multx_errors -x -B $barcodes $index $read1 -o $outdir/fastq-multx_output/index.%.fq -o $outdir/fastq-multx_output/read1.%.fq &>$outdir/fastq-multx_output/multx_log.txt" >> $log
-	`fastq-multx -m $multx_errors -x -B $barcodes $index $read1 -o $outdir/fastq-multx_output/index.%.fq -o $outdir/fastq-multx_output/read1.%.fq &>$outdir/fastq-multx_output/multx_log.txt`
+	echo "	python $scriptdir/akutils_resources/barcode_demultiplexer.py -m $mapfile -e $multx_errors -i $index -r $read1 -o $outdir/demultiplexed_output/index.fastq $outdir/demultiplexed_output/read1.fastq > $outdir/demultiplexed_output/demultiplex_log.txt" >> $log
+	python $scriptdir/akutils_resources/barcode_demultiplexer.py -m $mapfile -e $multx_errors -i $index -r $read1 -o $outdir/demultiplexed_output/index.fastq $outdir/demultiplexed_output/read1.fastq > $outdir/demultiplexed_output/demultiplex_log.txt 2>>$log || {
+	echo "
+Demultiplexing failed.  Check the log for details:
+$log
+Exiting.
+"
+	exit 1
+	}
 	
 	elif [[ `echo $mode` == "paired" ]]; then
-	echo "	fastq-multx -m $multx_errors -x -B $barcodes $index $read1 $read2 -o $outdir/fastq-multx_output/index.%.fq -o $outdir/fastq-multx_output/read1.%.fq -o $outdir/fastq-multx_output/read2.%.fq &>$outdir/fastq-multx_output/multx_log.txt" >> $log
-	`fastq-multx -m $multx_errors -x -B $barcodes $index $read1 $read2 -o $outdir/fastq-multx_output/index.%.fq -o $outdir/fastq-multx_output/read1.%.fq -o $outdir/fastq-multx_output/read2.%.fq &>$outdir/fastq-multx_output/multx_log.txt`
-	fi
-
-## Remove unmatched sequences to save space (comment this out if you need to inspect them)
-
-	echo "
-Removing unmatched reads to save space."
+	echo "	python $scriptdir/akutils_resources/barcode_demultiplexer.py -m $mapfile -e $multx_errors -i $index -r $read1 $read2 -o $outdir/demultiplexed_output/index.fastq $outdir/demultiplexed_output/read1.fastq $outdir/demultiplexed_output/read2.fastq > $outdir/demultiplexed_output/demultiplex_log.txt" >> $log
+	python $scriptdir/akutils_resources/barcode_demultiplexer.py -m $mapfile -e $multx_errors -i $index -r $read1 $read2 -o $outdir/demultiplexed_output/index.fastq $outdir/demultiplexed_output/read1.fastq $outdir/demultiplexed_output/read2.fastq > $outdir/demultiplexed_output/demultiplex_log.txt 2>>$log || {
 	echo "
-Removing unmatched reads:" >> $log
-	date "+%a %b %d %I:%M %p %Z %Y" >> $log
-	echo "	rm $outdir/fastq-multx_output/*unmatched.fq" >> $log
-
-	rm $outdir/fastq-multx_output/*unmatched.fq
-
-## Cat together multx results (in parallel)
-
-	echo "
-Remultiplexing demultiplexed data."
-	echo "
-Remultiplexing demultiplexed data:" >> $log
-	date "+%a %b %d %I:%M %p %Z %Y" >> $log
-
-	if [[ `echo $mode` == "single" ]]; then
-	echo "	( cat $outdir/fastq-multx_output/index.*.fq > $outdir/fastq-multx_output/index.fastq ) &
-	( cat $outdir/fastq-multx_output/read1.*.fq > $outdir/fastq-multx_output/read1.fastq ) &" >> $log
-
-	( cat $outdir/fastq-multx_output/index.*.fq > $outdir/fastq-multx_output/index.fastq ) &
-	( cat $outdir/fastq-multx_output/read1.*.fq > $outdir/fastq-multx_output/read1.fastq ) &
-
-	elif [[ `echo $mode` == "paired" ]]; then
-	echo "	( cat $outdir/fastq-multx_output/index.*.fq > $outdir/fastq-multx_output/index.fastq ) &
-	( cat $outdir/fastq-multx_output/read1.*.fq > $outdir/fastq-multx_output/read1.fastq ) &
-	( cat $outdir/fastq-multx_output/read2.*.fq > $outdir/fastq-multx_output/read2.fastq ) &" >> $log
-
-	( cat $outdir/fastq-multx_output/index.*.fq > $outdir/fastq-multx_output/index.fastq ) &
-	( cat $outdir/fastq-multx_output/read1.*.fq > $outdir/fastq-multx_output/read1.fastq ) &
-	( cat $outdir/fastq-multx_output/read2.*.fq > $outdir/fastq-multx_output/read2.fastq ) &
+Demultiplexing failed.  Check the log for details:
+$log
+Exiting.
+"
+	exit 1
+	}
 	fi
-	wait
 
-## Define demultiplexed/remultiplexed read files
+## Define demultiplexed read files
 
-	idx=$outdir/fastq-multx_output/index.fastq
-	rd1=$outdir/fastq-multx_output/read1.fastq
+	idx=$outdir/demultiplexed_output/index.fastq
+	rd1=$outdir/demultiplexed_output/read1.fastq
 	if [[ `echo $mode` == "paired" ]]; then
-	rd2=$outdir/fastq-multx_output/read2.fastq
+	rd2=$outdir/demultiplexed_output/read2.fastq
 	fi
 
-## Remove demultiplexed components of read files (comment out if you need them, but they take up a lot of space)
+## Smalt command to identify phix reads, streamed into phix_filter.py which
+## keeps the reads (or read pairs) and index reads that did not map to phix
 
 	echo "
-Removing redundant sequence files to save space."
+Smalt search of demultiplexed data and filtering of phix reads."
 	echo "
-Removing extra files:" >> $log
+Smalt search of demultiplexed data, filtering phix reads with phix_filter.py:" >> $log
 	date "+%a %b %d %I:%M %p %Z %Y" >> $log
-	echo "	rm $outdir/fastq-multx_output/*.fq" >> $log
-
-	rm $outdir/fastq-multx_output/*.fq
-
-## Smalt command to identify phix reads
-
-	echo "
-Smalt search of demultiplexed data."
-	echo "
-Smalt search of demultiplexed data:" >> $log
-	date "+%a %b %d %I:%M %p %Z %Y" >> $log
-	mkdir $outdir/smalt_output
 
 	if [[ `echo $mode` == "single" ]]; then
-	echo "	smalt map -n $smalt_threads -O -f sam:nohead -o $outdir/smalt_output/phix.mapped.sam $smaltdir/$smaltbase $rd1" >> $log
-	`smalt map -n $smalt_threads -O -f sam:nohead -o $outdir/smalt_output/phix.mapped.sam $smaltdir/$smaltbase $rd1 &>>$log`
-
-	elif [[ `echo $mode` == "paired" ]]; then
-	echo "	smalt map -n $smalt_threads -O -f sam:nohead -o $outdir/smalt_output/phix.mapped.sam $smaltdir/$smaltbase $rd1 $rd2" >> $log
-	`smalt map -n $smalt_threads -O -f sam:nohead -o $outdir/smalt_output/phix.mapped.sam $smaltdir/$smaltbase $rd1 $rd2 &>>$log`
-	fi
-	wait
-
-#use grep to identify reads that are non-phix
-
-	if [[ `echo $mode` == "single" ]]; then
-	echo "
-Screening smalt search for non-phix reads."
-	echo "Screening smalt search for non-phix reads." >> $log
-	
-	elif [[ `echo $mode` == "paired" ]]; then
+	echo "	smalt map -n $smalt_threads -O -f sam:nohead $smaltdir/$smaltbase $rd1 | python $scriptdir/akutils_resources/phix_filter.py -s - -m single -r $rd1 -x $idx -o $outdir/read1.phixfiltered.fastq $outdir/index.phixfiltered.fastq" >> $log
+	phixresult=`smalt map -n $smalt_threads -O -f sam:nohead $smaltdir/$smaltbase $rd1 2>>$log | python $scriptdir/akutils_resources/phix_filter.py -s - -m single -r $rd1 -x $idx -o $outdir/read1.phixfiltered.fastq $outdir/index.phixfiltered.fastq 2>>$log` || {
 	echo "
-Screening smalt search for non-phix read pairs."
-	echo "Screening smalt search for non-phix read pairs." >> $log
-	fi
-
-	echo "
-Grep search of smalt output:" >> $log
-	date "+%a %b %d %I:%M %p %Z %Y" >> $log
-
-	if [[ `echo $mode` == "single" ]]; then
-	echo "	egrep \".+\s4\s\" $outdir/smalt_output/phix.mapped.sam > $outdir/smalt_output/phix.unmapped.sam" >> $log
-	egrep ".+\s4\s" $outdir/smalt_output/phix.mapped.sam > $outdir/smalt_output/phix.unmapped.sam
+Filtering phix reads failed.  Check the log for details:
+$log
+Exiting.
+"
+	exit 1
+	}
 
 	elif [[ `echo $mode` == "paired" ]]; then
-	echo "	egrep \".+\s77\s\" $outdir/smalt_output/phix.mapped.sam > $outdir/smalt_output/phix.unmapped.sam" >> $log
-	egrep ".+\s77\s" $outdir/smalt_output/phix.mapped.sam > $outdir/smalt_output/phix.unmapped.sam
-	fi
-	wait
-
-## Use filter_fasta.py to filter contaminating sequences out prior to joining
-
-	echo "
-Filtering phix reads from sample data."
+	echo "	smalt map -n $smalt_threads -O -f sam:nohead $smaltdir/$smaltbase $rd1 $rd2 | python $scriptdir/akutils_resources/phix_filter.py -s - -m paired -r $rd1 $rd2 -x $idx -o $outdir/read1.phixfiltered.fastq $outdir/read2.phixfiltered.fastq $outdir/index.phixfiltered.fastq" >> $log
+	phixresult=`smalt map -n $smalt_threads -O -f sam:nohead $smaltdir/$smaltbase $rd1 $rd2 2>>$log | python $scriptdir/akutils_resources/phix_filter.py -s - -m paired -r $rd1 $rd2 -x $idx -o $outdir/read1.phixfiltered.fastq $outdir/read2.phixfiltered.fastq $outdir/index.phixfiltered.fastq 2>>$log` || {
 	echo "
-Filter phix reads with filter_fasta.py:" >> $log
-	date "+%a %b %d %I:%M %p %Z %Y" >> $log
-
-	if [[ `echo $mode` == "single" ]]; then
-	echo "	( filter_fasta.py -f $outdir/fastq-multx_output/index.fastq -o $outdir/index.phixfiltered.fastq -s $outdir/smalt_output/phix.unmapped.sam ) &
-	( filter_fasta.py -f $outdir/fastq-multx_output/read1.fastq -o $outdir/read1.phixfiltered.fastq -s $outdir/smalt_output/phix.unmapped.sam ) &" >> $log
-	( filter_fasta.py -f $outdir/fastq-multx_output/index.fastq -o $outdir/index.phixfiltered.fastq -s $outdir/smalt_output/phix.unmapped.sam ) &
-	( filter_fasta.py -f $outdir/fastq-multx_output/read1.fastq -o $outdir/read1.phixfiltered.fastq -s $outdir/smalt_output/phix.unmapped.sam ) &
-
-	elif [[ `echo $mode` == "paired" ]]; then
-	echo "	( filter_fasta.py -f $outdir/fastq-multx_output/index.fastq -o $outdir/index.phixfiltered.fastq -s $outdir/smalt_output/phix.unmapped.sam ) &
-	( filter_fasta.py -f $outdir/fastq-multx_output/read1.fastq -o $outdir/read1.phixfiltered.fastq -s $outdir/smalt_output/phix.unmapped.sam ) &
-	( filter_fasta.py -f $outdir/fastq-multx_output/read2.fastq -o $outdir/read2.phixfiltered.fastq -s $outdir/smalt_output/phix.unmapped.sam ) &" >> $log
-	( filter_fasta.py -f $outdir/fastq-multx_output/index.fastq -o $outdir/index.phixfiltered.fastq -s $outdir/smalt_output/phix.unmapped.sam ) &
-	( filter_fasta.py -f $outdir/fastq-multx_output/read1.fastq -o $outdir/read1.phixfiltered.fastq -s $outdir/smalt_output/phix.unmapped.sam ) &
-	( filter_fasta.py -f $outdir/fastq-multx_output/read2.fastq -o $outdir/read2.phixfiltered.fastq -s $outdir/smalt_output/phix.unmapped.sam ) &
+Filtering phix reads failed.  Check the log for details:
+$log
+Exiting.
+"
+	exit 1
+	}
 	fi
-	wait
 
 ## Check for and remove empty fastq records
 #
@@ -394,26 +317,14 @@ Filter phix reads with filter_fasta.py:" >> $log
 #		fi
 
 ## Arithmetic and variable definitions to report PhiX contamintaion levels
-	if [[ `echo $mode` == "single" ]]; then
-	totalseqs=$(cat $outdir/smalt_output/phix.mapped.sam | wc -l)
-	nonphixseqs=$(cat $outdir/smalt_output/phix.unmapped.sam | wc -l)
+	totalseqs=`echo $phixresult | cut -d" " -f1`
+	nonphixseqs=`echo $phixresult | cut -d" " -f2`
 	phixseqs=$(($totalseqs-$nonphixseqs))
 	nonphix100seqs=$(($nonphixseqs*100))
 	datapercent=$(($nonphix100seqs/$totalseqs))
 	contampercent=$((100-$datapercent))
 	quotient=($phixseqs/$totalseqs)
 	decimal=$(echo "scale=10; ${quotient}" | bc)
-	elif [[ `echo $mode` == "paired" ]]; then
-	totalseqs1=$(cat $outdir/smalt_output/phix.mapped.sam | wc -l)
-	nonphixseqs=$(cat $outdir/smalt_output/phix.unmapped.sam | wc -l)
-	totalseqs=$(($totalseqs1/2))
-	phixseqs=$(($totalseqs-$nonphixseqs))
-	nonphix100seqs=$(($nonphixseqs*100))
-	datapercent=$(($nonphix100seqs/$totalseqs))
-	contampercent=$((100-$datapercent))
-	quotient=($phixseqs/$totalseqs)
-	decimal=$(echo "scale=10; ${quotient}" | bc)
-	fi
 
 ## Log results of PhiX filtering
 
@@ -447,8 +358,7 @@ Contamination level (decimal value): $decimal" >> $log
 
 ## Remove excess files
 
-	rm -r $outdir/smalt_output
-	rm $outdir/fastq-multx_output/*.fastq
+	rm $outdir/demultiplexed_output/*.fastq
 
 
 ## Log script completion
@@ -96,10 +96,6 @@ Single-indexed read joining workflow starting" >> $log
 	date "+%a %b %d %I:%M %p %Z %Y" >> $log
 	res1=$(date +%s.%N)
 
-## Set start of read data for fastx_trimmer steps
-
-	readno=$(($4+1))
-
 ## Concatenate index1 in front of read1
 
 	echo "
@@ -107,10 +103,9 @@ Concatenating index and first read."
 	echo "
 Concatenation:" >> $log
 	date "+%a %b %d %I:%M %p %Z %Y" >> $log
-#	echo "	paste -d '' <(echo; sed -n '1,${n;p;}' $1 | sed G) $2 | sed '/^$/d' > $outdir/i1r1.fq" >> $log
+	echo "	python $scriptdir/akutils_resources/fastq_concatenate.py join -i $1 $2 -o $outdir/i1r1.fq" >> $log
 
-paste -d '' <(echo; sed -n '1,${n;p;}' $1 | sed G) $2 | sed '/^$/d' > $outdir/i1r1.fq
-	wait
+	python $scriptdir/akutils_resources/fastq_concatenate.py join -i $1 $2 -o $outdir/i1r1.fq >> $log
 
 ## Fastq-join command
 
@@ -134,14 +129,11 @@ Fastq-join results:" >> $log
 Splitting read and index data from successfully joined data."
 
 	echo "
-Split index and read commands:" >> $log
+Split index and read command:" >> $log
 	date "+%a %b %d %I:%M %p %Z %Y" >> $log
-	echo "	fastx_trimmer -l $4 -i $outdir/temp.join.fq -o $outdir/idx.fq -Q 33" >> $log
-	echo "	fastx_trimmer -f $readno -i $outdir/temp.join.fq -o $outdir/rd.fq -Q 33" >> $log
+	echo "	python $scriptdir/akutils_resources/fastq_concatenate.py split -i $outdir/temp.join.fq -l $4 -x $outdir/idx.fq -r $outdir/rd.fq" >> $log
 
-	( fastx_trimmer -l $4 -i $outdir/temp.join.fq -o $outdir/idx.fq -Q 33 ) &
-	( fastx_trimmer -f $readno -i $outdir/temp.join.fq -o $outdir/rd.fq -Q 33 ) &
-	wait
+	python $scriptdir/akutils_resources/fastq_concatenate.py split -i $outdir/temp.join.fq -l $4 -x $outdir/idx.fq -r $outdir/rd.fq >> $log
 
 ## Remove temp files
 
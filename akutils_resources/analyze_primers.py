@@ -44,28 +44,41 @@ supplied, they should be separated by a colon.
 """
 
 
-from os.path import basename
+import re
+import sqlite3
+from os import makedirs
+from os.path import basename, dirname, expanduser, isdir, join
+from hashlib import sha1
 from string import lower, upper
 from math import ceil
+from collections import deque
+from itertools import product
+from multiprocessing import Pool
 import warnings
 warnings.filterwarnings('ignore', 'Not using MPI as mpi4py not found')
 
-from matplotlib import use
-use ("Agg")
-from pylab import plot, savefig, xlabel, ylabel, text,\
-    hist, figure, title, xlim, ylim, xticks, yticks,\
-    subplot, clf, close, subplots_adjust
-from cogent import LoadSeqs, DNA
+# matplotlib/pylab and the cogent alignment modules are imported by the 
+# functions using them, so that they are only loaded when needed
+from cogent import DNA
 from cogent.core.moltype import IUPAC_DNA_ambiguities
-from cogent.core.alphabet import AlphabetError
-from cogent.align.align import make_dna_scoring_dict, local_pairwise
 from cogent.parse.fasta import MinimalFastaParser
-from numpy import arange
+from cogent.util.option_parsing import parse_command_line_parameters,\
+ make_option
+from numpy import arange, array, zeros, ones, identity, inner, exp, log,\
+ newaxis, inf, add, maximum, equal, greater, errstate, frombuffer, uint8,\
+ concatenate, lexsort, unique, histogram, savez_compressed, load
 
 from primerprospector.parse import parse_formatted_primers_data,\
  get_fasta_filepaths
 from primerprospector.util import correct_primer_name
 
+# Engines accepted by local_align_primer_seq(s)
+ALIGNMENT_ENGINES = ('numpy', 'cogent')
+# Histogram data are counted in steps of 1/HIST_RESOLUTION up to 
+# HIST_MAX_VALUE, the cap of the mismatches, gaps and weighted scores
+HIST_RESOLUTION = 100
+HIST_MAX_VALUE = 5
+
 #####
 # Start input/output handling functions
 #####     
@@ -89,6 +102,135 @@ def get_outf_paths(output_dir,
     
     return graph_out_fp, hits_out_fp
     
+    
+class AlignmentCache(object):
+    """ SQLite store of the alignments and scores of earlier runs
+    
+    Results are keyed by the primer (sequence, orientation and scoring
+    penalties, see get_cache_primer_key) and the sha1 of the target sequence,
+    so they are found again for unchanged sequences whatever their fasta file.
+    Each result records the last run using it; when the cache is closed with
+    more than max_entries results, those of the least recent runs are removed.
+    
+    Every write is committed at once and the database is in WAL mode, so
+    runs sharing the cache file (the default one) do not hold its lock for
+    their whole length; a run waits up to timeout seconds for another's
+    write to finish.
+    """
+    
+    def __init__(self,
+                 cache_fp,
+                 max_entries=5000000,
+                 timeout=60):
+        """ Opens (creating if needed) the cache in cache_fp """
+        
+        if dirname(cache_fp) and not isdir(dirname(cache_fp)):
+            makedirs(dirname(cache_fp))
+        self.MaxEntries = max_entries
+        self.Hits = 0
+        self.Misses = 0
+        
+        self.Connection = sqlite3.connect(cache_fp, timeout=timeout)
+        self.Connection.execute('PRAGMA journal_mode=WAL')
+        # Sequences are kept as str, like the rest of the hits data
+        self.Connection.text_factory = str
+        # The weighted score column has no type, so that int and float
+        # scores are returned as they were stored
+        self.Connection.execute('CREATE TABLE IF NOT EXISTS alignments '+\
+         '(primer_key TEXT, seq_sha1 TEXT, primer_hit TEXT, '+\
+         'target_hit TEXT, hit_start INTEGER, weighted_score, '+\
+         'non_tp_gaps INTEGER, tp_gaps INTEGER, non_tp_mismatches INTEGER, '+\
+         'tp_mismatches INTEGER, last_base_mismatches INTEGER, '+\
+         'last_used INTEGER, PRIMARY KEY (primer_key, seq_sha1))')
+        self.Connection.execute('CREATE TABLE IF NOT EXISTS runs '+\
+         '(run INTEGER)')
+        self.Run = self.Connection.execute('INSERT INTO runs VALUES (NULL)')\
+         .lastrowid
+        self.Connection.commit()
+        
+    def getScores(self,
+                  primer_key,
+                  seq_digests):
+        """ Returns the cached result of each sequence, or None
+        
+        A result is a tuple of the primer hit, target hit, hit start and the
+        score_primer values.
+        
+        primer_key: key of the primer from get_cache_primer_key
+        seq_digests: list of sha1 hex digests of the sequences
+        """
+        
+        cached = {}
+        for chunk_start in range(0, len(seq_digests), 500):
+            chunk = seq_digests[chunk_start:chunk_start+500]
+            query = 'WHERE primer_key = ? AND seq_sha1 IN (%s)' %\
+             ','.join('?' * len(chunk))
+            for row in self.Connection.execute('SELECT seq_sha1, '+\
+             'primer_hit, target_hit, hit_start, weighted_score, '+\
+             'non_tp_gaps, tp_gaps, non_tp_mismatches, tp_mismatches, '+\
+             'last_base_mismatches FROM alignments ' + query,
+             [primer_key] + chunk):
+                cached[row[0]] = row[1:]
+            self.Connection.execute('UPDATE alignments SET last_used = ? ' +\
+             query, [self.Run, primer_key] + chunk)
+        self.Connection.commit()
+        
+        results = [cached.get(seq_digest) for seq_digest in seq_digests]
+        self.Hits += len(results) - results.count(None)
+        self.Misses += results.count(None)
+        
+        return results
+        
+    def addScores(self,
+                  primer_key,
+                  seq_digests_results):
+        """ Stores results of score_records
+        
+        primer_key: key of the primer from get_cache_primer_key
+        seq_digests_results: list of (sequence sha1 hex digest, result) with
+         results as returned by getScores
+        """
+        
+        self.Connection.executemany('INSERT OR REPLACE INTO alignments '+\
+         'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+         [(primer_key, seq_digest) + tuple(result) + (self.Run,)
+         for seq_digest, result in seq_digests_results])
+        self.Connection.commit()
+        
+    def close(self):
+        """ Removes the least recently used results above MaxEntries, saves """
+        
+        entries = self.Connection.execute('SELECT COUNT(*) FROM alignments')\
+         .fetchone()[0]
+        if entries > self.MaxEntries:
+            self.Connection.execute('DELETE FROM alignments WHERE rowid IN '+\
+             '(SELECT rowid FROM alignments ORDER BY last_used LIMIT ?)',
+             (entries - self.MaxEntries,))
+        self.Connection.commit()
+        self.Connection.close()
+        
+        
+def get_cache_primer_key(primer,
+                         tp_len,
+                         last_base_mm,
+                         tp_mm,
+                         non_tp_mm,
+                         tp_gap,
+                         non_tp_gap):
+    """ Returns the AlignmentCache key of a primer and scoring penalties
+    
+    primer: DNA.Sequence object of the primer, its name gives its orientation
+    tp_len: three prime length
+    last_base_mm: penalty for last base mismatch
+    tp_mm: three prime mismatch penalty
+    non_tp_mm: non three prime mismatch penalty
+    tp_gap: penalty for three prime gaps
+    non_tp_gap: penalty for non three prime gaps
+    """
+    
+    return '\t'.join(map(repr, [primer.Name.split('_')[0][-1], str(primer),
+     tp_len, last_base_mm, tp_mm, non_tp_mm, tp_gap, non_tp_gap]))
+    
          
 #####
 # End input/output handling functions
@@ -98,7 +240,7 @@ def get_outf_paths(output_dir,
 # Start graphing functions
 #####  
 
-def primer_hit_histogram(data,
+def primer_hit_histogram(counts,
                          figure_title,
                          x_label,
                          bin_size=1,
@@ -107,7 +249,8 @@ def primer_hit_histogram(data,
                          y_axis_size=None):
     """ Build and write primer mismatch/gaps/score histograms
     
-        data: list of values (i.e., mismatches) for each sequence
+        counts: histogram counts of the values (i.e., mismatches) of the
+         sequences, see add_histogram_count
         figure_title: string passed to title()
         x_label: string passed to xlabel()
         bin_size: width of the bins to be plotted, for discrete values, such
@@ -122,6 +265,8 @@ def primer_hit_histogram(data,
         
     """
     
+    from pylab import xlabel, ylabel, hist, xlim, ylim, xticks, yticks
+    
     # Set x and y labels
     xlabel(x_label, size='x-small')
     ylabel(y_label, size='x-small')
@@ -136,11 +281,13 @@ def primer_hit_histogram(data,
     # effectively calculate the least common multiple float value for all
     # elements of the input data list.
     
+    values = get_histogram_values(counts)
+    
     min_x = 0
     if max_cap:
         max_x = max_cap
     else:
-        max_x = int(round(max(data)))+1
+        max_x = int(round(max(values[counts.nonzero()])))+1
     
     if max_cap:
         max_bin = max_cap + 2
@@ -150,7 +297,7 @@ def primer_hit_histogram(data,
         
     # Create bins
     counts, bins, rects = \
-     hist(data, bins=arange(0, max_bin, bin_size),\
+     hist(values, bins=arange(0, max_bin, bin_size), weights=counts,\
      rwidth=0.25, ec=color, fc=color)
      
     # Needs to be of type int to avoid errors with newer versions of Matplotlib
@@ -193,11 +340,16 @@ def write_primer_histogram(hist_data,
                            graph_filepath):
     """ Writes histogram from input list of hits data, title/subtitle 
     
-    hist_data: histogram data, list of data for different components of the
-     output histogram
+    hist_data: histogram data, list of histogram counts for different
+     components of the output histogram followed by the title and subtitle
     graph_filepath: output filepath.
     """
     
+    # Plotting libraries are only loaded when a figure is drawn
+    from matplotlib import use
+    use("Agg")
+    from pylab import savefig, figure, subplot, clf, close, subplots_adjust
+    
     # indices of lists for histogram data
     non_tp_mm_data_index = 0
     tp_mm_data_index = 1
@@ -254,9 +406,9 @@ def write_primer_histogram(hist_data,
     
     subplot(7, 1, 6)
     # Get rounded data for displaying easily read graph
-    rounded_weighted_score_data =\
-     [round(x) for x in hist_data[weighted_score_index]]
-    primer_hit_histogram(rounded_weighted_score_data, '', 'Weighted Score',
+    rounded_weighted_score_counts =\
+     round_histogram_counts(hist_data[weighted_score_index])
+    primer_hit_histogram(rounded_weighted_score_counts, '', 'Weighted Score',
      y_axis_size=y_axis_max)
     
     subplots_adjust(hspace=0.5)
@@ -269,6 +421,40 @@ def write_primer_histogram(hist_data,
     close()
     
     
+def get_hist_data_filepath(graph_filepath):
+    """ Returns the histogram data filepath saved in place of a graph """
+    
+    return graph_filepath[:-len(".ps")] + "_hist.npz"
+    
+    
+def write_histogram_data(hist_data,
+                         hist_data_filepath):
+    """ Saves histogram data for drawing the histogram later
+    
+    The counts are saved in a compressed numpy .npz file, which 
+    read_histogram_data reads back for write_primer_histogram.
+    
+    hist_data: histogram data, see write_primer_histogram
+    hist_data_filepath: output filepath, should end with .npz
+    """
+    
+    savez_compressed(hist_data_filepath, counts=array(hist_data[0:6]),
+     titles=array(hist_data[6:8]))
+    
+    
+def read_histogram_data(hist_data_filepath):
+    """ Returns the histogram data saved by write_histogram_data """
+    
+    hist_data_f = load(hist_data_filepath)
+    try:
+        hist_data = list(hist_data_f['counts']) +\
+         map(str, hist_data_f['titles'])
+    finally:
+        hist_data_f.close()
+    
+    return hist_data
+    
+    
 #####
 # End graphing functions
 #####
@@ -378,6 +564,10 @@ def pair_hmm_align_unaligned_seqs(seqs,
          is desired.
     """
     
+    from cogent import LoadSeqs
+    from cogent.core.alphabet import AlphabetError
+    from cogent.align.align import make_dna_scoring_dict, local_pairwise
+    
     try:
         seqs = LoadSeqs(data=seqs,moltype=moltype,aligned=False)
     except AlphabetError:
@@ -406,22 +596,48 @@ def pair_hmm_align_unaligned_seqs(seqs,
     return local_pairwise(s1, s2, score_matrix, gap_open, gap_extend)
 
 
+def get_hit_start(query_sequence,
+                  target_hit):
+    """ Returns index of the (degapped) target hit in the query sequence
+    
+    query_sequence: sequence the primer was aligned to
+    target_hit: aligned segment of query_sequence, can contain gaps
+    """
+    
+    try:
+        hit_start = query_sequence.index(target_hit.replace('-',''))
+    except ValueError:
+        raise ValueError,('substring not found, query string %s, target_hit %s'\
+         % (query_sequence, target_hit))
+         
+    return hit_start
+
+
 def local_align_primer_seq(primer,
-                           sequence):
+                           sequence,
+                           engine='cogent',
+                           params={}):
     """Perform local alignment of primer and sequence
     
         primer: Current primer being tested
         sequence: Current sequence
+        engine: alignment engine, 'cogent' (PyCogent pair HMM, the reference
+         implementation) or 'numpy' (see local_align_primer_seqs)
+        params: gap and score matrix settings passed to 
+         pair_hmm_align_unaligned_seqs
         
         Returns the Alignment object primer sequence and target sequence, 
          and the start position in sequence of the hit.
     """
 
+    if engine != 'cogent':
+        return local_align_primer_seqs(primer, [sequence], engine, params)[0]
 
     query_sequence = sequence
      
     # Get alignment object from primer, target sequence
-    alignment = pair_hmm_align_unaligned_seqs([primer,query_sequence])
+    alignment = pair_hmm_align_unaligned_seqs([primer,query_sequence],
+     params=params)
 
     # Extract sequence of primer, target site, may have gaps in insertions
     # or deletions have occurred.
@@ -429,16 +645,745 @@ def local_align_primer_seq(primer,
     target_hit = str(alignment.Seqs[1])
     
     # Get index of primer hit in target sequence.
-    try:
-        hit_start = query_sequence.index(target_hit.replace('-',''))
-    except ValueError:
-        raise ValueError,('substring not found, query string %s, target_hit %s'\
-         % (query_sequence, target_hit))
-         
+    hit_start = get_hit_start(query_sequence, target_hit)
     
     return primer_hit, target_hit, hit_start
+
+
+def local_align_primer_seqs(primer,
+                            sequences,
+                            engine='numpy',
+                            params={},
+                            batch_size=128):
+    """Perform local alignment of primer against a list of sequences
+    
+        primer: Current primer being tested
+        sequences: list of sequences, in string format
+        engine: 'numpy' aligns batches of sequences at once with a vectorized
+         version of the cogent pair HMM, 'cogent' aligns each sequence with
+         local_align_primer_seq.  Both give identical results.
+        params: gap_open, gap_extend and score_matrix as for
+         pair_hmm_align_unaligned_seqs
+        batch_size: number of sequences aligned together by the numpy engine
+        
+        Returns a list of (primer_hit, target_hit, hit_start) tuples in the
+         order of sequences.
+    """
+    
+    if engine == 'cogent':
+        return [local_align_primer_seq(primer, seq, params=params)
+         for seq in sequences]
+    elif engine != 'numpy':
+        raise ValueError, ("Unknown alignment engine %s, " % engine +\
+         "must be one of %s" % ', '.join(ALIGNMENT_ENGINES))
+    
+    try:
+        gap_open = params['gap_open']
+    except KeyError:
+        gap_open = 5
+    try:
+        gap_extend = params['gap_extend']
+    except KeyError:
+        gap_extend = 2
+    try:
+        score_matrix = params['score_matrix']
+    except KeyError:
+        score_matrix = None
+        
+    char_codes, code_chars, emission_table =\
+     get_iupac_emission_table(score_matrix)
+    transitions = get_pair_hmm_transitions(gap_open, gap_extend)
+    
+    results = [None] * len(sequences)
+    
+    # Characters outside of the IUPAC table (gaps, '?', or invalid characters)
+    # are left to cogent, which either handles or reports them.
+    primer_codes = char_codes[frombuffer(primer, uint8)]
+    if len(primer_codes) == 0 or (primer_codes < 0).any():
+        return [local_align_primer_seq(primer, seq, params=params)
+         for seq in sequences]
+    
+    encoded_seqs = []
+    for seq_index, seq in enumerate(sequences):
+        seq_codes = char_codes[frombuffer(seq, uint8)]
+        if len(seq_codes) == 0 or (seq_codes < 0).any():
+            results[seq_index] = local_align_primer_seq(primer, seq,
+             params=params)
+        else:
+            encoded_seqs.append((len(seq_codes), seq_index, seq_codes))
+    
+    # Align sequences of similar length together to limit padding
+    encoded_seqs.sort()
+    for batch_start in range(0, len(encoded_seqs), batch_size):
+        batch = encoded_seqs[batch_start:batch_start + batch_size]
+        alignments = viterbi_local_align_batch(primer_codes,
+         [seq_codes for (seq_len, seq_index, seq_codes) in batch],
+         emission_table, transitions)
+        for (seq_len, seq_index, seq_codes), aligned_positions in\
+         zip(batch, alignments):
+            primer_hit = ''.join([code_chars[primer_codes[i]]
+             if i is not None else '-' for (i, j) in aligned_positions])
+            target_hit = ''.join([code_chars[seq_codes[j]]
+             if j is not None else '-' for (i, j) in aligned_positions])
+            results[seq_index] = (primer_hit, target_hit,
+             get_hit_start(sequences[seq_index], target_hit))
+    
+    return results
+    
+
+def get_iupac_emission_table(score_matrix=None):
+    """ Returns log emission scores for every primer/target character pair
+    
+    The scores are computed the same way the cogent pair HMM computes match
+    emissions for local_pairwise (gap emissions are always zero), so that
+    alignments from the numpy engine are identical to the cogent ones.
+    
+    score_matrix: scoring dict for unambiguous bases, defaults to the one
+     used by pair_hmm_align_unaligned_seqs
+    
+    Returns char_codes, an array of the table index for each byte value (-1
+     for characters not in the table), code_chars, the uppercase character
+     for each table index, and the table.  The last row/column of the table
+     is a padding code that can not be matched.
+    """
+    
+    if score_matrix is None:
+        from cogent.align.align import make_dna_scoring_dict
+        score_matrix = make_dna_scoring_dict(\
+         match=1, transition=-1, transversion=-1)
+    
+    alphabet = DNA.Alphabet
+    code_chars = list('ACGT') + sorted(IUPAC_DNA_ambiguities.keys())
+    
+    sub_scores = zeros([len(alphabet), len(alphabet)], float)
+    for (i, m1) in enumerate(alphabet):
+        for (j, m2) in enumerate(alphabet):
+            sub_scores[i, j] = score_matrix[m1, m2]
+    psub = exp(sub_scores)
+    mprobs = ones(len(psub), float) / len(psub)
+    
+    # Ambiguous characters are profiles over all the bases they can be
+    likelihoods = alphabet.fromAmbigToLikelihoods(code_chars, float)
+    primer_plh = inner(likelihoods, psub)
+    primer_plh /= inner(likelihoods, mprobs)[..., newaxis]
+    target_plh = inner(likelihoods, identity(len(psub)))
+    target_plh /= inner(likelihoods, mprobs)[..., newaxis]
+    
+    emission_table = zeros([len(code_chars) + 1] * 2, float) - inf
+    emission_table[:-1, :-1] = log(inner(primer_plh * mprobs, target_plh))
+    
+    char_codes = zeros(256, int) - 1
+    for code, char in enumerate(code_chars):
+        char_codes[ord(char)] = code
+        char_codes[ord(lower(char))] = code
+    char_codes[ord('U')] = char_codes[ord('u')] = code_chars.index('T')
+    
+    return char_codes, code_chars, emission_table
+    
+
+def get_pair_hmm_transitions(gap_open,
+                             gap_extend):
+    """ Returns log transition matrix and state indices of the pair HMM
+    
+    gap_open: gap opening cost
+    gap_extend: gap extension cost
+    
+    Returns the log transition matrix (begin state first, end state last) 
+     and the indices of the match, primer-only and target-only states.
+    """
+    
+    from cogent.align.indel_model import ClassicGapScores
+    from cogent.align.pairwise import adaptPairTM
+    
+    state_directions, transitions = adaptPairTM(\
+     ClassicGapScores(gap_open, gap_extend))
+    with errstate(divide='ignore'):
+        transitions = log(transitions)
+    
+    for (state, bin, dx, dy) in state_directions:
+        if dx and dy:
+            match_state = state
+        elif dx:
+            primer_state = state
+        else:
+            target_state = state
+    
+    return transitions, (match_state, primer_state, target_state)
+    
+
+def viterbi_local_align_batch(primer_codes,
+                              seqs_codes,
+                              emission_table,
+                              transitions,
+                              return_scores=False):
+    """ Local Viterbi alignment of a primer against a batch of sequences
+    
+    The dynamic programming matrices of all sequences are filled together, one
+    anti-diagonal at a time, so each step is a handful of array operations
+    over (sequences x primer length) cells.  Scores are added in the same
+    order as in the cogent implementation, and ties are resolved the same
+    way, so the same alignment is returned.
+    
+    primer_codes: array of emission table indices for the primer
+    seqs_codes: list of arrays of emission table indices, one per sequence
+    emission_table: log emission scores from get_iupac_emission_table
+    transitions: log transition matrix, state indices from 
+     get_pair_hmm_transitions
+    return_scores: also return the array of alignment scores
+    
+    Returns a list of aligned positions for each sequence, a list of 
+     (primer index, sequence index) tuples where None indicates a gap.
+    """
+    
+    transitions, (match_state, primer_state, target_state) = transitions
+    begin_state = 0
+    emitting_states = [match_state, primer_state, target_state]
+    
+    primer_len = len(primer_codes)
+    seqs_len = max([len(seq_codes) for seq_codes in seqs_codes])
+    batch_len = len(seqs_codes)
+    diagonals_len = primer_len + seqs_len + 1
+    
+    # Target codes are padded on both sides, so that the codes along any
+    # anti-diagonal are a (reversed) slice; padding can never be matched.
+    padding_code = len(emission_table) - 1
+    target_codes = zeros([seqs_len + 2*primer_len + 1, batch_len], int) +\
+     padding_code
+    for n, seq_codes in enumerate(seqs_codes):
+        target_codes[primer_len+1:primer_len+1+len(seq_codes), n] = seq_codes
+    row_emissions = emission_table[primer_codes].ravel()
+    row_offsets = (arange(primer_len) * len(emission_table))[..., newaxis]
+    
+    # For each state, the offsets of the source cell and the diagonal it is on
+    # (cells are indexed by primer position along an anti-diagonal) and the
+    # transitions into it, in the order cogent searches them.
+    state_sources = []
+    for (state, row_offset, diagonal_offset) in [(match_state, 1, 2),
+     (primer_state, 1, 1), (target_state, 0, 1)]:
+        prev_states = emitting_states_in_order(transitions, state,
+         emitting_states)
+        if state == match_state:
+            # Local alignments can start at any match
+            choices = [begin_state] + prev_states
+        else:
+            choices = prev_states
+        state_sources.append((state, row_offset, diagonal_offset, 
+         prev_states, choices))
+    
+    # Scores of the last three anti-diagonals, indexed by [primer position,
+    # sequence] with the sequences innermost so that every step works on
+    # contiguous blocks.  Row 0 is impossible.
+    scores = [dict([(state, zeros([primer_len+1, batch_len], float) - inf)
+     for state in emitting_states]) for n in range(3)]
+    candidates = dict([(state, zeros([primer_len, batch_len], float))
+     for state in emitting_states])
+    emissions = zeros([primer_len, batch_len], float)
+    code_indices = zeros([primer_len, batch_len], int)
+    
+    # For the traceback, whether each transition (but the last one searched) 
+    # reached the best score of a cell; the first one that did was taken.
+    reached_best = {}
+    for state, row_offset, diagonal_offset, prev_states, choices in\
+     state_sources:
+        for choice in choices[:-1]:
+            reached_best[state, choice] = zeros([diagonals_len, primer_len,
+             batch_len], bool)
+    
+    # Best match score in each row, and the first diagonal reaching it
+    row_max_scores = zeros([primer_len+1, batch_len], float) - inf
+    row_max_diagonals = zeros([primer_len+1, batch_len], int)
+    improved = zeros([primer_len+1, batch_len], bool)
+    
+    for diagonal in range(2, diagonals_len):
+        current = scores[diagonal % 3]
+        for state, row_offset, diagonal_offset, prev_states, choices in\
+         state_sources:
+            sources = scores[(diagonal - diagonal_offset) % 3]
+            cumulative = current[state][1:]
+            if state == match_state:
+                cumulative[:] = transitions[begin_state, state]
+            else:
+                cumulative[:] = -inf
+            for prev_state in prev_states:
+                if row_offset:
+                    source = sources[prev_state][:-1]
+                else:
+                    source = sources[prev_state][1:]
+                add(source, transitions[prev_state, state],
+                 candidates[prev_state])
+                maximum(cumulative, candidates[prev_state], cumulative)
+            for choice in choices[:-1]:
+                if choice == begin_state:
+                    equal(cumulative, transitions[begin_state, state],
+                     reached_best[state, choice][diagonal])
+                else:
+                    equal(cumulative, candidates[choice],
+                     reached_best[state, choice][diagonal])
+            if state == match_state:
+                add(target_codes[diagonal:diagonal+primer_len][::-1],
+                 row_offsets, code_indices)
+                row_emissions.take(code_indices, out=emissions)
+                add(cumulative, emissions, cumulative)
+            if diagonal <= primer_len:
+                # Cells before the start of the sequences
+                current[state][diagonal:] = -inf
+        
+        # Cells past the end of a sequence score -inf as they can not be
+        # matched
+        greater(current[match_state], row_max_scores, improved)
+        maximum(row_max_scores, current[match_state], row_max_scores)
+        row_max_diagonals += improved * (diagonal - row_max_diagonals)
+    
+    # Best match cell overall, the first one in row-major order as in cogent
+    best_rows = row_max_scores.argmax(0)
+    best_diagonals = row_max_diagonals[best_rows, arange(batch_len)]
+    
+    alignments = []
+    for n in range(batch_len):
+        row, diagonal = best_rows[n], best_diagonals[n]
+        state = match_state
+        aligned_positions = []
+        while state != begin_state:
+            for (source_state, row_offset, diagonal_offset, prev_states,
+             choices) in state_sources:
+                if source_state == state:
+                    break
+            if state == match_state:
+                aligned_positions.append((row-1, diagonal-row-1))
+            elif state == primer_state:
+                aligned_positions.append((row-1, None))
+            else:
+                aligned_positions.append((None, diagonal-row-1))
+            for prev_state in choices[:-1]:
+                if reached_best[state, prev_state][diagonal, row-1, n]:
+                    break
+            else:
+                prev_state = choices[-1]
+            row -= row_offset
+            diagonal -= diagonal_offset
+            state = prev_state
+        aligned_positions.reverse()
+        alignments.append(aligned_positions)
+    
+    if return_scores:
+        return alignments, row_max_scores[best_rows, arange(batch_len)]
+    return alignments
+    
+    
+def emitting_states_in_order(transitions,
+                             state,
+                             emitting_states):
+    """ Returns states that can transition to state, in cogent's search order
+    
+    transitions: log transition matrix
+    state: state being entered
+    emitting_states: list of match and gap state indices
+    """
+    
+    return [prev_state for prev_state in sorted(emitting_states)
+     if transitions[prev_state, state] > -inf]
    
 
+def get_exact_match_finder(primer,
+                           params={}):
+    """ Returns a function finding exact (degenerate) matches of primer
+    
+    A primer site matching every primer base, with no gaps, is the local
+    alignment the pair HMM returns, so records holding one need not be aligned.
+    This is only certain if the full length match scores strictly higher than
+    any other alignment could, including ones trimming poorly scoring
+    degenerate bases off the ends of the primer, which is checked here with
+    an upper bound on the score of all other alignments.
+    
+    primer: primer sequence, as given to local_align_primer_seqs
+    params: gap_open, gap_extend and score_matrix as for
+     pair_hmm_align_unaligned_seqs
+    
+    The returned function takes a sequence and returns the same (primer_hit,
+     target_hit, hit_start) tuple as local_align_primer_seq if the primer
+     matches the sequence exactly, or None if the sequence must be aligned.
+     Only uppercase ACGT sequences are matched.  None is returned instead of
+     a function if the alignments of primer can not be predicted this way.
+    """
+    
+    try:
+        gap_open = params['gap_open']
+    except KeyError:
+        gap_open = 5
+    try:
+        gap_extend = params['gap_extend']
+    except KeyError:
+        gap_extend = 2
+    try:
+        score_matrix = params['score_matrix']
+    except KeyError:
+        score_matrix = None
+        
+    char_codes, code_chars, emission_table =\
+     get_iupac_emission_table(score_matrix)
+    transitions, (match_state, primer_state, target_state) =\
+     get_pair_hmm_transitions(gap_open, gap_extend)
+    begin_state = 0
+    
+    primer_codes = char_codes[frombuffer(primer, uint8)]
+    if len(primer_codes) == 0 or (primer_codes < 0).any():
+        return None
+    
+    # Emission scores of each primer position against the four bases, and the
+    # best score of a matching and of a mismatching base
+    bases = 'ACGT'
+    position_emissions = []
+    max_emissions = []
+    mismatch_losses = []
+    pattern = []
+    for code in primer_codes:
+        matching_bases = IUPAC_DNA_ambiguities.get(code_chars[code],
+         code_chars[code])
+        emissions = [emission_table[code, char_codes[ord(base)]]
+         for base in bases]
+        position_emissions.append(emissions)
+        max_emission = max([emission for base, emission in
+         zip(bases, emissions) if base in matching_bases])
+        max_emissions.append(max_emission)
+        mismatch_losses.append(min([max_emission - emission for base, emission
+         in zip(bases, emissions) if base not in matching_bases] or [inf]))
+        pattern.append('[%s]' % ''.join(sorted(matching_bases)))
+    
+    # Best scores of alignments ending at each primer position, with all
+    # matches scoring the best possible emission.  Pure alignments start at
+    # the first primer position and have no gaps, all others are impure.
+    t = transitions
+    M, X, Y = match_state, primer_state, target_state
+    pure_scores = []
+    impure_scores = []
+    prev_pure = prev_impure = prev_primer_gap = prev_target_gap = -inf
+    for position, max_emission in enumerate(max_emissions):
+        if position == 0:
+            pure = t[begin_state, M] + max_emission
+            impure = -inf
+            primer_gap = -inf
+        else:
+            pure = prev_pure + t[M, M] + max_emission
+            impure = max(t[begin_state, M], prev_impure + t[M, M],
+             prev_primer_gap + t[X, M], prev_target_gap + t[Y, M]) +\
+             max_emission
+            primer_gap = max(max(prev_pure, prev_impure) + t[M, X],
+             prev_primer_gap + t[X, X], prev_target_gap + t[Y, X])
+        target_gap = max(max(pure, impure) + t[M, Y], primer_gap + t[X, Y])
+        pure_scores.append(pure)
+        impure_scores.append(impure)
+        prev_pure, prev_impure = pure, impure
+        prev_primer_gap, prev_target_gap = primer_gap, target_gap
+    
+    # Any alignment other than an exact match scores at most other_max
+    exact_score = pure_scores[-1]
+    other_max = max(impure_scores + pure_scores[:-1] +\
+     [exact_score - min(mismatch_losses)])
+    if not exact_score > other_max + 1e-6:
+        return None
+    
+    primer_hit = ''.join([code_chars[code] for code in primer_codes])
+    primer_len = len(primer_codes)
+    # Lookahead so overlapping matches are found
+    matches_finder = re.compile('(?=%s)' % ''.join(pattern)).finditer
+    base_codes = dict([(base, n) for n, base in enumerate(bases)])
+    
+    def find_exact_match(sequence):
+        if sequence.translate(None, bases):
+            return None
+        best_score = -inf
+        best_start = None
+        for match in matches_finder(sequence):
+            start = match.start()
+            # Score the match as the alignment does, exact matches at
+            # different positions can differ by rounding
+            score = t[begin_state, M] +\
+             position_emissions[0][base_codes[sequence[start]]]
+            for position in range(1, primer_len):
+                score = score + t[M, M] + position_emissions[position]\
+                 [base_codes[sequence[start+position]]]
+            if score > best_score:
+                best_score = score
+                best_start = start
+        if best_start is None:
+            return None
+        target_hit = sequence[best_start:best_start+primer_len]
+        return primer_hit, target_hit, get_hit_start(sequence, target_hit)
+    
+    return find_exact_match
+   
+
+def get_primer_seeds(primer,
+                     index,
+                     start=0,
+                     stop=None,
+                     max_expansions=256):
+    """ Finds the hits of the k-mers of a primer in a reference index
+    
+    Every k-mer of the primer is expanded into the bases its degenerate
+    positions can be and looked up in the index.  K-mers with more than
+    max_expansions expansions are not looked up.
+    
+    primer: primer sequence, as given to local_align_primer_seqs
+    index: ReferenceIndex object (see reference_index.py)
+    start, stop: only hits in records start to stop (excluded) are looked up
+    max_expansions: largest number of expansions of a looked up k-mer
+    
+    Returns a dict of the record index to the sorted array of diagonals of
+     the hits in the record (the position of the first primer base, when
+     aligned without gaps to the hit), and a list of whether each k-mer of the
+     primer was looked up.
+    """
+    
+    from reference_index import get_kmer_codes
+    
+    kmer_len = index.KmerLen
+    char_codes, code_chars, emission_table = get_iupac_emission_table()
+    primer_chars = [code_chars[code] for code in
+     char_codes[frombuffer(primer, uint8)]]
+    position_bases = [IUPAC_DNA_ambiguities.get(char, char)
+     for char in primer_chars]
+    
+    seedable = []
+    hits_records = []
+    hits_diagonals = []
+    for kmer_start in range(len(primer) - kmer_len + 1):
+        kmer_bases = position_bases[kmer_start:kmer_start+kmer_len]
+        if reduce(lambda x, y: x * y, map(len, kmer_bases)) > max_expansions:
+            seedable.append(False)
+            continue
+        seedable.append(True)
+        kmer_codes = get_kmer_codes([''.join(kmer) for kmer in
+         product(*kmer_bases)])
+        records, offsets = index.findKmers(kmer_codes, start, stop)
+        hits_records.append(records)
+        hits_diagonals.append(offsets.astype(int) - kmer_start)
+    
+    seeds = {}
+    if hits_records:
+        records = concatenate(hits_records)
+        diagonals = concatenate(hits_diagonals)
+        order = lexsort((diagonals, records))
+        records = records[order]
+        diagonals = diagonals[order]
+        bounds = concatenate([[0], (records[1:] != records[:-1]).nonzero()[0]
+         + 1, [len(records)]])
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            seeds[records[start]] = unique(diagonals[start:stop])
+    
+    return seeds, seedable
+
+
+def get_seeded_alignment_bounds(primer_codes,
+                                code_chars,
+                                emission_table,
+                                transitions,
+                                kmer_len,
+                                seedable):
+    """ Returns upper bounds on alignment scores used by align_seeded_windows
+    
+    The bounds come from a dynamic programming over the primer positions only,
+    with every match scoring the best emission of any target base.  The
+    target sequences are made of uppercase A, C, G and T only.
+    
+    primer_codes: array of emission table indices for the primer
+    code_chars: character of each emission table index
+    emission_table: log emission scores from get_iupac_emission_table
+    transitions: log transition matrix, state indices from 
+     get_pair_hmm_transitions
+    kmer_len: length of the k-mers of the reference index
+    seedable: whether each k-mer of the primer was looked up in the index
+    
+    Returns the highest score of any alignment without a run of kmer_len
+     matching bases (A, C, G or T) starting at a looked up k-mer, the highest
+     score of any alignment, and the most a target-only gap can add to a score
+     (negative, or inf if there is no such bound).
+    """
+    
+    transitions, (M, X, Y) = transitions
+    t = transitions
+    begin_state = 0
+    bases = 'ACGT'
+    
+    # Best emissions of each primer position for a matching base, and for a
+    # mismatching base
+    run_emissions = []
+    break_emissions = []
+    for code in primer_codes:
+        matching_bases = IUPAC_DNA_ambiguities.get(code_chars[code],
+         code_chars[code])
+        emissions = [(base in matching_bases, emission_table[code,
+         code_chars.index(base)]) for base in bases]
+        run_emissions.append(max([emission for (matching, emission) in
+         emissions if matching]))
+        break_emissions.append(max([emission for (matching, emission) in
+         emissions if not matching] or [-inf]))
+    
+    def max_alignment_score(seedable):
+        """ Best score of alignments without a seeded run of matches """
+        # runs[r] is the best alignment ending with a run of r+1 matching
+        # bases, the last one of which is at least kmer_len long
+        max_score = -inf
+        prev_runs = [-inf] * kmer_len
+        prev_break = prev_primer_gap = prev_target_gap = -inf
+        for position in range(len(primer_codes)):
+            prev_match = max(prev_runs + [prev_break])
+            enter_match = max(t[begin_state, M], prev_break + t[M, M],
+             prev_primer_gap + t[X, M], prev_target_gap + t[Y, M])
+            runs = [enter_match] + [prev_run + t[M, M]
+             for prev_run in prev_runs[:-1]]
+            runs[-1] = max(runs[-1], prev_runs[-1] + t[M, M])
+            runs = [run + run_emissions[position] for run in runs]
+            kmer_start = position - kmer_len + 1
+            if kmer_start >= 0 and seedable[kmer_start]:
+                runs[-1] = -inf
+            match_break = max(enter_match, max(prev_runs) + t[M, M]) +\
+             break_emissions[position]
+            primer_gap = max(prev_match + t[M, X], prev_primer_gap + t[X, X],
+             prev_target_gap + t[Y, X])
+            match = max(runs + [match_break])
+            target_gap = max(match + t[M, Y], primer_gap + t[X, Y])
+            max_score = max(max_score, match)
+            prev_runs, prev_break = runs, match_break
+            prev_primer_gap, prev_target_gap = primer_gap, target_gap
+        return max_score
+    
+    seedless_max = max_alignment_score(seedable)
+    any_max = max_alignment_score([False] * len(seedable))
+    
+    # Dropping a block of g target-only gaps from an alignment changes its
+    # score by at most g * target_gap_cost
+    target_gap_cost = t[Y, Y]
+    for prev_state in [M, X]:
+        for next_state in [M, X]:
+            gap_block = t[prev_state, Y] + t[Y, next_state]
+            if gap_block > -inf:
+                target_gap_cost = max(target_gap_cost,
+                 gap_block - t[prev_state, next_state])
+    
+    return seedless_max, any_max, target_gap_cost
+
+
+def align_seeded_windows(primer,
+                         sequences,
+                         sequences_seeds,
+                         kmer_len,
+                         seedable,
+                         params={},
+                         batch_size=128):
+    """ Local alignment of a primer against windows around k-mer hits
+    
+    The windows of a sequence around its seeds (see get_primer_seeds) are
+    aligned instead of the whole sequence.  This gives the alignment of the
+    whole sequence whenever the best window alignment provably is the best
+    alignment of the sequence, and its ties are resolved the same way:
+    its score must be above that of any alignment without a seed
+    (get_seeded_alignment_bounds), above the other windows of the sequence,
+    and high enough that the best alignment can not have more target-only
+    gaps than the windows are padded with.  Only sequences of uppercase A, C,
+    G and T are aligned this way.
+    
+    primer: primer sequence, as given to local_align_primer_seqs
+    sequences: list of sequences, in string format
+    sequences_seeds: list of sorted arrays of seed diagonals, or None, for
+     each sequence
+    kmer_len: length of the k-mers of the reference index
+    seedable: whether each k-mer of the primer was looked up in the index
+    params: gap_open, gap_extend and score_matrix as for
+     pair_hmm_align_unaligned_seqs
+    batch_size: number of windows aligned together
+    
+    Returns a list with, for each sequence, the (primer_hit, target_hit,
+     hit_start) tuple of local_align_primer_seq, or None if the sequence must
+     be aligned in full.
+    """
+    
+    try:
+        gap_open = params['gap_open']
+    except KeyError:
+        gap_open = 5
+    try:
+        gap_extend = params['gap_extend']
+    except KeyError:
+        gap_extend = 2
+    try:
+        score_matrix = params['score_matrix']
+    except KeyError:
+        score_matrix = None
+        
+    char_codes, code_chars, emission_table =\
+     get_iupac_emission_table(score_matrix)
+    transitions = get_pair_hmm_transitions(gap_open, gap_extend)
+    
+    results = [None] * len(sequences)
+    
+    primer_codes = char_codes[frombuffer(primer, uint8)]
+    if len(primer_codes) == 0 or (primer_codes < 0).any():
+        return results
+    primer_len = len(primer_codes)
+    
+    seedless_max, any_max, target_gap_cost = get_seeded_alignment_bounds(\
+     primer_codes, code_chars, emission_table, transitions, kmer_len,
+     seedable)
+    if not target_gap_cost < 0:
+        return results
+    
+    # Windows are padded with as many target-only gaps as primer bases
+    max_target_gaps = primer_len
+    margin = 1e-6
+    min_score = max(seedless_max, any_max +\
+     (max_target_gaps + 1) * target_gap_cost) + margin
+    
+    # Windows of each sequence, overlapping windows are merged
+    windows = []
+    for seq_index, (seq, seeds) in enumerate(zip(sequences, sequences_seeds)):
+        if seeds is None or not len(seeds) or seq.translate(None, 'ACGT'):
+            continue
+        seq_codes = char_codes[frombuffer(seq, uint8)]
+        window_start = window_end = None
+        for diagonal in seeds:
+            start = max(diagonal - max_target_gaps, 0)
+            end = min(diagonal + primer_len + max_target_gaps, len(seq))
+            if window_end is not None and start <= window_end:
+                window_end = max(window_end, end)
+                continue
+            if window_end is not None:
+                windows.append((window_end - window_start, seq_index,
+                 window_start, seq_codes[window_start:window_end]))
+            window_start, window_end = start, end
+        windows.append((window_end - window_start, seq_index, window_start,
+         seq_codes[window_start:window_end]))
+    
+    # Align windows of similar length together to limit padding
+    windows.sort()
+    seqs_windows = {}
+    for batch_start in range(0, len(windows), batch_size):
+        batch = windows[batch_start:batch_start + batch_size]
+        alignments, scores = viterbi_local_align_batch(primer_codes,
+         [window_codes for (window_len, seq_index, window_start,
+         window_codes) in batch], emission_table, transitions,
+         return_scores=True)
+        for (window_len, seq_index, window_start, window_codes),\
+         aligned_positions, score in zip(batch, alignments, scores):
+            seqs_windows.setdefault(seq_index, []).append((score,
+             window_codes, aligned_positions))
+    
+    for seq_index, seq_windows in seqs_windows.items():
+        seq_windows.sort(key=lambda window: window[0])
+        score, window_codes, aligned_positions = seq_windows[-1]
+        if score < min_score or (len(seq_windows) > 1 and
+         score < seq_windows[-2][0] + margin):
+            continue
+        primer_hit = ''.join([code_chars[primer_codes[i]]
+         if i is not None else '-' for (i, j) in aligned_positions])
+        target_hit = ''.join([code_chars[window_codes[j]]
+         if j is not None else '-' for (i, j) in aligned_positions])
+        results[seq_index] = (primer_hit, target_hit,
+         get_hit_start(sequences[seq_index], target_hit))
+    
+    return results
+    
+
 def score_primer(primer,
                  primer_hit,
                  target_hit,
@@ -532,6 +1477,141 @@ def score_primer(primer,
     return weighted_score, non_tp_gaps, tp_gaps, non_tp_mismatches,\
      tp_mismatches, last_base_mismatches
      
+     
+def get_mismatch_table(sw_scorer=match_scorer_ambigs(1, -1)):
+    """ Returns the characters and mismatches known to sw_scorer as tables
+    
+    Returns an array of whether sw_scorer accepts each byte value, and an
+    array of whether each (target, primer) pair of byte values is counted as
+    a mismatch by score_primer (a mismatch of two characters other than '-').
+    
+    sw_scorer: scorer used by score_primer
+    """
+    
+    known_chars = []
+    for code in range(256):
+        try:
+            sw_scorer(chr(code), '-')
+        except ValueError:
+            continue
+        known_chars.append(chr(code))
+    
+    known = zeros(256, bool)
+    mismatches = zeros([256, 256], bool)
+    for x in known_chars:
+        known[ord(x)] = True
+        for y in known_chars:
+            mismatches[ord(x), ord(y)] = sw_scorer(x, y) == -1 and\
+             x != '-' and y != '-'
+    
+    return known, mismatches
+    
+    
+def score_primer_hits(primer,
+                      primer_hits,
+                      target_hits,
+                      tp_len,
+                      last_base_mm,
+                      tp_mm,
+                      non_tp_mm,
+                      tp_gap,
+                      non_tp_gap,
+                      sw_scorer=match_scorer_ambigs(1, -1)):
+    """ Gets mismatches and gaps of many primer hits and seq hits at once
+    
+    Returns a list of the score_primer results of each pair of hits, which 
+    are identical to calling score_primer on every pair.  Hits are scored in
+    groups of the same length, as arrays of bytes, using a lookup table of 
+    mismatches (see get_mismatch_table).  Pairs that score_primer would 
+    reject are passed to it, so it raises the same errors.
+    
+    primer: Current primer sequence object being tested.
+    primer_hits: list of primer hit strings, see score_primer
+    target_hits: list of target hit strings, see score_primer
+    tp_len: three prime length
+    last_base_mm: penalty for last base mismatch
+    tp_mm: three prime mismatch penalty
+    non_tp_mm: non three prime mismatch penalty
+    tp_gap: penalty for three prime gaps
+    non_tp_gap: penalty for non three prime gaps
+    sw_scorer: Gives scores for mismatches, gap insertions in alignment.
+    """
+    
+    if primer.Name.split('_')[0].endswith('f'):
+        forward = True
+    elif primer.Name.split('_')[0].endswith('r'):
+        forward = False
+    else:
+        raise ValueError,\
+         "Primer name must end with 'f' or 'r' to indicate forward or reverse."
+    
+    known, mismatch_table = get_mismatch_table(sw_scorer)
+    gap_code = ord('-')
+    
+    results = [None] * len(primer_hits)
+    hits_by_len = {}
+    for n, (primer_hit, target_hit) in enumerate(zip(primer_hits,
+     target_hits)):
+        if len(primer_hit) == len(target_hit) and len(primer_hit):
+            hits_by_len.setdefault(len(primer_hit), []).append(n)
+        else:
+            results[n] = score_primer(primer, primer_hit, target_hit, tp_len,
+             last_base_mm, tp_mm, non_tp_mm, tp_gap, non_tp_gap, sw_scorer)
+    
+    for hit_len, hit_indices in hits_by_len.items():
+        # Masks of the 3', non 3', and last base regions, sliced the same
+        # way score_primer slices the hits
+        hit_tp_len = min(tp_len, hit_len)
+        positions = range(hit_len)
+        if forward:
+            non_tp_positions = positions[:-hit_tp_len]
+            tp_positions = positions[-hit_tp_len:-1]
+            last_base_position = positions[-1]
+        else:
+            non_tp_positions = positions[hit_tp_len:]
+            tp_positions = positions[1:hit_tp_len]
+            last_base_position = positions[0]
+        non_tp_mask = zeros(hit_len, bool)
+        non_tp_mask[non_tp_positions] = True
+        tp_mask = zeros(hit_len, bool)
+        tp_mask[tp_positions] = True
+        scored_mask = non_tp_mask | tp_mask
+        scored_mask[last_base_position] = True
+        
+        primer_codes = frombuffer(''.join([primer_hits[n] for n in
+         hit_indices]), uint8).reshape(len(hit_indices), hit_len)
+        target_codes = frombuffer(''.join([target_hits[n] for n in
+         hit_indices]), uint8).reshape(len(hit_indices), hit_len)
+        
+        gaps = (primer_codes == gap_code).astype(int) +\
+         (target_codes == gap_code)
+        mismatches = mismatch_table[target_codes, primer_codes]
+        rejected = ~(known[primer_codes] & known[target_codes])[:,
+         scored_mask].all(1)
+        
+        non_tp_gaps = gaps[:, non_tp_mask].sum(1).tolist()
+        tp_gaps = (gaps[:, tp_mask].sum(1) +\
+         gaps[:, last_base_position]).tolist()
+        non_tp_mismatches = mismatches[:, non_tp_mask].sum(1).tolist()
+        tp_mismatches = mismatches[:, tp_mask].sum(1).tolist()
+        last_base_mismatches =\
+         mismatches[:, last_base_position].astype(int).tolist()
+        
+        for i, n in enumerate(hit_indices):
+            if rejected[i]:
+                results[n] = score_primer(primer, primer_hits[n],
+                 target_hits[n], tp_len, last_base_mm, tp_mm, non_tp_mm,
+                 tp_gap, non_tp_gap, sw_scorer)
+                continue
+            # Weighted score summed in the same order as in score_primer
+            weighted_score = (last_base_mm * last_base_mismatches[i] +\
+             tp_mm * tp_mismatches[i] + non_tp_mm * non_tp_mismatches[i] +\
+             tp_gap * tp_gaps[i] + non_tp_gap * non_tp_gaps[i])
+            results[n] = (weighted_score, non_tp_gaps[i], tp_gaps[i],
+             non_tp_mismatches[i], tp_mismatches[i], last_base_mismatches[i])
+    
+    return results
+     
 
 
 
@@ -570,12 +1650,12 @@ def hits_seq_end(seq,
 def get_yaxis_max(all_data_sets,
                   max_bin=5,
                   bin_size=1):
-    """ Returns largest single bin in list of lists
+    """ Returns largest single bin in list of histogram counts
     
     The purpose of this function is to find the largest single bin so that
     all subplots in a graph can use this maximum value for the y-axis size.
     
-    all_data_sets: list of lists containing primer hit data (3', non 3'
+    all_data_sets: list of histogram counts of primer hit data (3', non 3'
      mismatches, 3' and non 3' gaps, weighted score).
     max_bin: Upper limit that values are capped at for creating bins.
     bin_size: step size for bins.  Module is currently written to handle
@@ -587,12 +1667,55 @@ def get_yaxis_max(all_data_sets,
     
     for data_set in all_data_sets:
         # Create bins
-        counts, bins, rects = hist(data_set, bins=arange(0, max_bin, bin_size))
+        counts, bins = histogram(get_histogram_values(data_set),
+         bins=arange(0, max_bin, bin_size), weights=data_set)
         counts_all_max.append(max(counts))
         
     return max(counts_all_max)
     
     
+def new_histogram_counts():
+    """ Returns zero counts for the values of a primer hit data histogram
+    
+    Values are counted in steps of 1/HIST_RESOLUTION from 0 up to
+    HIST_MAX_VALUE (the capped values), so the counts take the same memory
+    for any number of sequences.
+    """
+    
+    return zeros(HIST_MAX_VALUE * HIST_RESOLUTION + 1, int)
+    
+    
+def add_histogram_count(counts,
+                        value):
+    """ Counts value in histogram counts, ignored if out of their range
+    
+    counts: array from new_histogram_counts
+    value: value rounded to 1/HIST_RESOLUTION, such as a mismatch count or
+     a weighted score rounded to two decimals
+    """
+    
+    index = int(round(value * HIST_RESOLUTION))
+    if 0 <= index < len(counts):
+        counts[index] += 1
+        
+        
+def get_histogram_values(counts):
+    """ Returns the value counted at each index of histogram counts """
+    
+    return arange(len(counts)) / float(HIST_RESOLUTION)
+    
+    
+def round_histogram_counts(counts):
+    """ Returns histogram counts with the values rounded to whole numbers """
+    
+    rounded_counts = zeros(len(counts), int)
+    for index in counts.nonzero()[0]:
+        rounded_counts[int(round(index / float(HIST_RESOLUTION))) *\
+         HIST_RESOLUTION] += counts[index]
+         
+    return rounded_counts
+    
+    
 def get_primers(primers_data=None, 
                 primer_name=None,
                 primer_sequence=None):
@@ -677,6 +1800,24 @@ def get_primers(primers_data=None,
     return primers
                 
         
+def get_fasta_batches(fasta_fp,
+                      batch_size=512):
+    """ Yields lists of (label, seq) tuples from a fasta file
+    
+    fasta_fp: open fasta file object
+    batch_size: maximum number of records per list
+    """
+    
+    batch = []
+    for label, seq in MinimalFastaParser(fasta_fp):
+        batch.append((label, seq))
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+        
+        
 ####
 # Main program loops
 ####
@@ -689,12 +1830,15 @@ def get_hits_data(primer,
                   tp_mm,
                   non_tp_mm,
                   tp_gap,
-                  non_tp_gap):
+                  non_tp_gap,
+                  align_engine='numpy',
+                  pool=None):
     """ Finds mismatches, gaps, scores for primer/seqs sets
     
     Returns a list of lines of hits data for writing to the output hits file,
-    and a list of lists containing the mismatches, gaps, and weighted scores
-    for writing a histogram file.
+    and a list of the histogram counts of the mismatches, gaps, and weighted 
+    scores, followed by the figure title and subtext, for writing a histogram
+    file.
     
     primer: current primer (DNA.Sequence object)
     primer_ids: current primer name
@@ -707,10 +1851,204 @@ def get_hits_data(primer,
     non_tp_mm: non three prime mismatch penalty
     tp_gap: penalty for three prime gaps
     non_tp_gap: penalty for non three prime gaps
+    align_engine: alignment engine used by local_align_primer_seqs
+    pool: multiprocessing.Pool used to score batches of records in parallel,
+     or None to score them in this process
     """
     
+    hits_lines, hist_data, exact_matches = get_primers_hits_data([primer],
+     [primer_id], fasta_fp, tp_len, last_base_mm, tp_mm, non_tp_mm, tp_gap,
+     non_tp_gap, align_engine, pool)[0]
+    
+    return hits_lines, hist_data
+    
+    
+def get_primers_hits_data(primers, 
+                          primer_ids,
+                          fasta_fp,
+                          tp_len,
+                          last_base_mm,
+                          tp_mm,
+                          non_tp_mm,
+                          tp_gap,
+                          non_tp_gap,
+                          align_engine='numpy',
+                          pool=None,
+                          index=None,
+                          cache=None,
+                          hits_fps=None,
+                          batch_handler=None):
+    """ Finds mismatches, gaps, scores for several primers in one fasta pass
+    
+    The fasta file is read and parsed once, and every batch of records is
+    scored against all of the primers.  Returns a list with, for each primer,
+    the hits lines and histogram data described in get_hits_data, and the
+    number of records that matched the primer exactly.  The histogram data
+    are counts of fixed size, and with hits_fps the hits lines are written
+    as they are scored rather than returned, so the memory used does not 
+    grow with the size of the fasta file.
+    
+    primers: list of primers (DNA.Sequence objects)
+    primer_ids: list of primer names
+    fasta_fp: current open fasta filepath object to test primers against
+    tp_len: three prime length
+    last_base_mm: penalty for last base mismatch
+    tp_mm: three prime mismatch penalty
+    non_tp_mm: non three prime mismatch penalty
+    tp_gap: penalty for three prime gaps
+    non_tp_gap: penalty for non three prime gaps
+    align_engine: alignment engine used by local_align_primer_seqs
+    pool: multiprocessing.Pool used to score batches of records in parallel,
+     or None to score them in this process
+    index: ReferenceIndex of the fasta file (see reference_index.py), if given
+     the records are read from the index and only windows around the k-mer
+     hits of the primers are aligned when this gives the same alignment
+    cache: AlignmentCache object, if given records with a cached result are
+     not aligned again, and new results are added to the cache
+    hits_fps: list of open hits file objects of the primers, if given the
+     hits lines are written to them and empty lists of lines are returned
+    batch_handler: function called with the records of each batch and the 
+     list of the hits lines of each primer for them, in input order, so that
+     the records can be used with their hits without reading them again
+    """
+    
+    primers_hits_data = []
+    for primer, primer_id in zip(primers, primer_ids):
+        hits_lines, figure_title, weighted_score_subtext =\
+         get_hits_header_and_titles(primer, primer_id, fasta_fp, tp_len,
+         last_base_mm, tp_mm, non_tp_mm, tp_gap, non_tp_gap)
+        # non 3' mismatches, 3' mismatches, non 3' gaps, 3' gaps, weighted
+        # scores, last base mismatches
+        hist_data = [new_histogram_counts() for n in range(6)] +\
+         [figure_title, weighted_score_subtext]
+        primers_hits_data.append([hits_lines, hist_data, 0])
+    
+    if hits_fps:
+        for primer_hits_data, hits_fp in zip(primers_hits_data, hits_fps):
+            hits_fp.write('\n'.join(primer_hits_data[0]))
+            primer_hits_data[0] = []
+    
+    if index:
+        records_batches = index.iterBatches()
+    else:
+        records_batches = get_fasta_batches(fasta_fp)
+    
+    primer_keys = [get_cache_primer_key(primer, tp_len, last_base_mm, tp_mm,
+     non_tp_mm, tp_gap, non_tp_gap) for primer in primers]
+    # Sequence digests and records of the batches submitted but not yet
+    # collected
+    batches_digests = deque()
+    batches_records = deque()
+    
+    def get_batches_args():
+        for batch_start, records in iter_numbered_batches(records_batches):
+            if batch_handler:
+                batches_records.append(records)
+            # The cache is only used in this process, workers get the
+            # cached results with the records
+            if cache:
+                seq_digests = [sha1(seq).hexdigest() for (label, seq) in
+                 records]
+                batches_digests.append(seq_digests)
+                primers_cached = [cache.getScores(primer_key, seq_digests)
+                 for primer_key in primer_keys]
+            else:
+                primers_cached = None
+            yield ([p.Name for p in primers], map(str, primers), records,
+             tp_len, last_base_mm, tp_mm, non_tp_mm, tp_gap, non_tp_gap,
+             align_engine, get_batch_seeds(primers, index, batch_start,
+             len(records)), primers_cached)
+    
+    # Records are scored in batches, in worker processes if a pool is given.
+    # Batches come back in input order, so the hits lines are the same
+    # as when scoring serially.
+    for batch_results in imap_ordered(score_records_batch, get_batches_args(),
+     pool):
+        if cache:
+            seq_digests = batches_digests.popleft()
+        if batch_handler:
+            batch_handler(batches_records.popleft(),
+             [batch_result[0] for batch_result in batch_results])
+        for n, primer_hits_data, batch_result in\
+         zip(range(len(primers)), primers_hits_data, batch_results):
+            batch_hits_lines, batch_hist_data, batch_exact_matches =\
+             batch_result[:3]
+            if hits_fps:
+                # Lines follow the header, no newline at the end of file
+                for line in batch_hits_lines:
+                    hits_fps[n].write('\n' + line)
+            else:
+                primer_hits_data[0].extend(batch_hits_lines)
+            # Merge the partial histogram counts of the batch
+            for data, batch_data in zip(primer_hits_data[1], batch_hist_data):
+                data += batch_data
+            primer_hits_data[2] += batch_exact_matches
+            if cache:
+                cache.addScores(primer_keys[n], [(seq_digests[record_index],
+                 result) for record_index, result in batch_result[3]])
+    
+    return map(tuple, primers_hits_data)
+    
+    
+def iter_numbered_batches(batches):
+    """ Yields (index of the first record, records) for lists of records """
+    
+    batch_start = 0
+    for records in batches:
+        yield batch_start, records
+        batch_start += len(records)
+    
+    
+def get_batch_seeds(primers,
+                    index,
+                    batch_start,
+                    batch_len):
+    """ Returns the seeds argument of score_records for a batch of records
+    
+    Seeds are looked up for the records of the batch only, so they are 
+    never held for the whole index.
+    
+    primers: list of primers (DNA.Sequence objects)
+    index: ReferenceIndex of the records, or None
+    batch_start: index of the first record of the batch
+    batch_len: number of records in the batch
+    """
+    
+    if index is None:
+        return None
+    
+    batch_stop = batch_start + batch_len
+    batch_seeds = []
+    for primer in primers:
+        seeds, seedable = get_primer_seeds(primer_to_match_query(primer),
+         index, batch_start, batch_stop)
+        batch_seeds.append((index.KmerLen, seedable, [seeds.get(record_index)
+         for record_index in range(batch_start, batch_stop)]))
+    
+    return batch_seeds
     
     
+def get_hits_header_and_titles(primer,
+                               primer_id,
+                               fasta_fp,
+                               tp_len,
+                               last_base_mm,
+                               tp_mm,
+                               non_tp_mm,
+                               tp_gap,
+                               non_tp_gap):
+    """ Returns hits file header lines, figure title and weighted score text
+    
+    primer: current primer (DNA.Sequence object)
+    primer_id: current primer name
+    fasta_fp: open fasta file object, its name is used in the header
+    tp_len: three prime length
+    last_base_mm: penalty for last base mismatch
+    tp_mm: three prime mismatch penalty
+    non_tp_mm: non three prime mismatch penalty
+    tp_gap: penalty for three prime gaps
+    non_tp_gap: penalty for non three prime gaps
+    """
     
     # Contains header, parameters, comments for the output hits file
     hits_lines = ["# Primer: %s 5'-%s-3'" % (primer.Name, primer),
@@ -758,65 +2096,145 @@ def get_hits_data(primer,
     weighted_score_subtext = tp_len_title + weighted_score_info +\
      last_base_info + rounded_clause
     
+    return hits_lines, figure_title, weighted_score_subtext
+        
+
+def score_records(primer,
+                  records,
+                  tp_len,
+                  last_base_mm,
+                  tp_mm,
+                  non_tp_mm,
+                  tp_gap,
+                  non_tp_gap,
+                  align_engine='numpy',
+                  seeds=None,
+                  cached=None):
+    """ Aligns and scores primer against a list of fasta records
+    
+    Returns a list of lines of hits data, a list of the histogram counts of
+    the (capped) mismatches, gaps, and weighted scores of the records (see
+    new_histogram_counts), the number of records matching the primer exactly,
+    which are not aligned (see get_exact_match_finder), and if cached is given, a
+    list of (record index, result) of the records not found in the cache, 
+    for AlignmentCache.addScores.
+    
+    primer: current primer (DNA.Sequence object)
+    records: list of (label, seq) tuples
+    tp_len: three prime length
+    last_base_mm: penalty for last base mismatch
+    tp_mm: three prime mismatch penalty
+    non_tp_mm: non three prime mismatch penalty
+    tp_gap: penalty for three prime gaps
+    non_tp_gap: penalty for non three prime gaps
+    align_engine: alignment engine used by local_align_primer_seqs
+    seeds: None, or (k-mer length, seedable k-mers of the primer, list of 
+     seed diagonals of each record) from get_primer_seeds, in which case only
+     windows around the seeds are aligned when this gives the same result
+    cached: None, or the list of AlignmentCache.getScores results of the
+     records, records with a result are not aligned or scored again
+    """
     
     # Set upper limit for purpose of displaying data on histograms
     max_mm = 5
     max_gaps = 5
     max_weighted_score = 5.0
     
-    non_tp_mm_data = []
-    tp_mm_data = []
-    non_tp_gap_data = []
-    tp_gap_data = []
-    weighted_score_data = []
-    last_base_mm_data = []
-    
+    hits_lines = []
+    # non 3' mismatches, 3' mismatches, non 3' gaps, 3' gaps, weighted
+    # scores, last base mismatches
+    hist_data = [new_histogram_counts() for n in range(6)]
+    non_tp_mm_data, tp_mm_data, non_tp_gap_data, tp_gap_data,\
+     weighted_score_data, last_base_mm_data = hist_data
     
     # get primer length to test for hitting sequence end
     primer_len = len(primer)
     primer_seq = primer_to_match_query(primer)
     
-    for label, seq in MinimalFastaParser(fasta_fp):
-        primer_hit, target_hit, hit_start = \
-         local_align_primer_seq(primer_seq, seq)
-        # Get score, numbers of gaps/mismatches
-        weighted_score, non_tp_gaps, tp_gaps, non_tp_mismatches,\
-         tp_mismatches, last_base_mismatches = score_primer(primer, primer_hit,
-         target_hit, tp_len, last_base_mm,
-         tp_mm, non_tp_mm, tp_gap, non_tp_gap)
-        
-        # Append data to lists for generating histograms
-        # Max value appended to this list capped for purposes of readability
+    if cached is None:
+        records_cached = [None] * len(records)
+    else:
+        records_cached = cached
+    new_results = []
+    
+    # Records with an exact match of the primer skip the alignment, as do
+    # records with a cached result
+    alignments = [None] * len(records)
+    unaligned = [n for n in range(len(records)) if records_cached[n] is None]
+    find_exact_match = get_exact_match_finder(primer_seq)
+    if find_exact_match:
+        for n in unaligned:
+            alignments[n] = find_exact_match(records[n][1])
+    exact_matches = len(unaligned)
+    unaligned = [n for n in unaligned if alignments[n] is None]
+    exact_matches -= len(unaligned)
+    # Then records with k-mer hits of the primer are aligned around the hits
+    if seeds:
+        kmer_len, seedable, records_seeds = seeds
+        for n, alignment in zip(unaligned, align_seeded_windows(primer_seq,
+         [records[n][1] for n in unaligned],
+         [records_seeds[n] for n in unaligned], kmer_len, seedable)):
+            alignments[n] = alignment
+        unaligned = [n for n in unaligned if alignments[n] is None]
+    for n, alignment in zip(unaligned, local_align_primer_seqs(primer_seq,
+     [records[n][1] for n in unaligned], align_engine)):
+        alignments[n] = alignment
+    
+    # Get scores, numbers of gaps/mismatches of the new alignments together
+    scored = [n for n in range(len(records)) if records_cached[n] is None]
+    scores = [None] * len(records)
+    for n, score in zip(scored, score_primer_hits(primer,
+     [alignments[n][0] for n in scored], [alignments[n][1] for n in scored],
+     tp_len, last_base_mm, tp_mm, non_tp_mm, tp_gap, non_tp_gap)):
+        scores[n] = score
+    
+    for n, ((label, seq), alignment) in enumerate(zip(records, alignments)):
+        if records_cached[n] is not None:
+            primer_hit, target_hit, hit_start, weighted_score, non_tp_gaps,\
+             tp_gaps, non_tp_mismatches, tp_mismatches,\
+             last_base_mismatches = records_cached[n]
+        else:
+            primer_hit, target_hit, hit_start = alignment
+            weighted_score, non_tp_gaps, tp_gaps, non_tp_mismatches,\
+             tp_mismatches, last_base_mismatches = scores[n]
+            if cached is not None:
+                new_results.append((n, (primer_hit, target_hit, hit_start,
+                 weighted_score, non_tp_gaps, tp_gaps, non_tp_mismatches,
+                 tp_mismatches, last_base_mismatches)))
+        
+        # Count data for generating histograms
+        # Max value counted capped for purposes of readability
         # in the output histogram
         if non_tp_mismatches <= max_mm:
-            non_tp_mm_data.append(non_tp_mismatches)
+            add_histogram_count(non_tp_mm_data, non_tp_mismatches)
         else:
-            non_tp_mm_data.append(max_mm)
+            add_histogram_count(non_tp_mm_data, max_mm)
             
         if tp_mismatches <= max_mm:
-            tp_mm_data.append(tp_mismatches)
+            add_histogram_count(tp_mm_data, tp_mismatches)
         else:
-            tp_mm_data.append(max_mm)
+            add_histogram_count(tp_mm_data, max_mm)
             
         if non_tp_gaps <= max_gaps:
-            non_tp_gap_data.append(non_tp_gaps)
+            add_histogram_count(non_tp_gap_data, non_tp_gaps)
         else:
-            non_tp_gap_data.append(max_gaps)
+            add_histogram_count(non_tp_gap_data, max_gaps)
             
         if tp_gaps <= max_gaps:
-            tp_gap_data.append(tp_gaps)
+            add_histogram_count(tp_gap_data, tp_gaps)
         else:
-            tp_gap_data.append(max_gaps)
+            add_histogram_count(tp_gap_data, max_gaps)
             
         if weighted_score <= max_weighted_score:
-            weighted_score_data.append(float('%2.2f' % weighted_score))
+            add_histogram_count(weighted_score_data,
+             float('%2.2f' % weighted_score))
         else:
-            weighted_score_data.append(max_weighted_score)
+            add_histogram_count(weighted_score_data, max_weighted_score)
             
         if last_base_mismatches:
-            last_base_mm_data.append(1)
+            add_histogram_count(last_base_mm_data, 1)
         else:
-            last_base_mm_data.append(0)
+            add_histogram_count(last_base_mm_data, 0)
          
         # Determine if primer hits sequence end
         # Difficult to use this in scoring, but can be parsed out if one wants
@@ -829,19 +2247,62 @@ def get_hits_data(primer,
                 primer_hit, hit_start, non_tp_mismatches, tp_mismatches,
                 bool(last_base_mismatches), non_tp_gaps, tp_gaps,
                 weighted_score, hits_sequence_end])))
-                
     
-    # Make list of all histogram data lists so only one data item being
-    # passed around
-    hist_data = [non_tp_mm_data, tp_mm_data, non_tp_gap_data, tp_gap_data,
-     weighted_score_data, last_base_mm_data, figure_title, 
-     weighted_score_subtext]
+    if cached is None:
+        return hits_lines, hist_data, exact_matches
+    return hits_lines, hist_data, exact_matches, new_results
     
     
+def score_records_batch(args):
+    """ Calls score_records for each primer on the same list of records
+    
+    Takes a single tuple so that it can be mapped over a process pool, the
+    primers are rebuilt from their names and sequences.  Returns a list of
+    score_records results, in the order of the primers.
+    
+    args: (primer names, primer sequences, records) followed by the remaining
+     score_records arguments but the seeds and cached results, then the lists
+     of seeds and of cached results of each primer (or None)
+    """
+    
+    primer_names, primer_seqs, records = args[:3]
+    primers_seeds = args[-2] or [None] * len(primer_names)
+    primers_cached = args[-1] or [None] * len(primer_names)
+    
+    return [score_records(DNA.makeSequence(primer_seq, Name=primer_name),
+     records, *(args[3:-2] + (seeds, cached)))
+     for primer_name, primer_seq, seeds, cached in
+     zip(primer_names, primer_seqs, primers_seeds, primers_cached)]
     
-    return hits_lines, hist_data
-        
 
+def imap_ordered(function,
+                 iterable,
+                 pool=None,
+                 max_pending=64):
+    """ Maps function over iterable, in a process pool if given, in order
+    
+    Only max_pending tasks are submitted ahead of the results being consumed,
+    so a large input file is never held in memory at once.
+    
+    function: function taking one argument, must be picklable for a pool
+    iterable: arguments for function
+    pool: multiprocessing.Pool object, or None to map in this process
+    max_pending: maximum number of tasks submitted to the pool at once
+    """
+    
+    if pool is None:
+        for args in iterable:
+            yield function(args)
+        return
+    
+    pending = deque()
+    for args in iterable:
+        pending.append(pool.apply_async(function, (args,)))
+        if len(pending) >= max_pending:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+    
         
 def generate_hits_file_and_histogram(\
          primers,
@@ -855,7 +2316,16 @@ def generate_hits_file_and_histogram(\
          tp_mm = 1,
          non_tp_mm = 0.4,
          tp_gap = 3,
-         non_tp_gap = 1):
+         non_tp_gap = 1,
+         align_engine = 'numpy',
+         workers = 1,
+         single_pass = False,
+         index_dir = None,
+         kmer_len = 8,
+         cache_fp = None,
+         cache_max_entries = 5000000,
+         graphs = True,
+         batch_handler = None):
     """ Iterates through primers, test against input fasta sequences
     
     primers: list of primers (DNA.Sequence objects)
@@ -869,40 +2339,142 @@ def generate_hits_file_and_histogram(\
     tp_mm: three prime mismatch penalty
     non_tp_mm: non three prime mismatch penalty
     tp_gap: penalty for three prime gaps
-    non_tp_gap: penalty for non three prime gaps """
+    non_tp_gap: penalty for non three prime gaps
+    align_engine: alignment engine, 'numpy' or 'cogent'
+    workers: number of processes scoring batches of fasta records
+    single_pass: if True, each fasta file is read once and tested against all
+     primers at the same time, rather than once per primer.  The hits files
+     of all primers for a fasta file are open together.
+    index_dir: if given, directory of the k-mer indices of the fasta files 
+     (built or rebuilt as needed), used to align only windows around the 
+     k-mer hits of the primers
+    kmer_len: length of the k-mers of the indices
+    cache_fp: if given, SQLite file of the AlignmentCache of alignment results
+     reused across runs
+    cache_max_entries: maximum number of results kept in the cache
+    graphs: if True, a graph is written for each primer and fasta file (drawn
+     in the worker processes if workers > 1), otherwise the histogram data 
+     are saved for drawing later (see render_primer_histograms.py)
+    batch_handler: function called with each batch of records and their hits
+     lines (see get_primers_hits_data), only used with single_pass """
 
+    if workers > 1:
+        pool = Pool(workers)
+    else:
+        pool = None
+    
+    # Graphs being drawn in the pool
+    pending_graphs = []
+    
+    def write_histogram(hist_data, graph_filepath):
+        if not graphs:
+            write_histogram_data(hist_data,
+             get_hist_data_filepath(graph_filepath))
+        elif pool:
+            pending_graphs.append(pool.apply_async(write_primer_histogram,
+             (hist_data, graph_filepath)))
+        else:
+            write_primer_histogram(hist_data, graph_filepath)
     
-    for i in range(len(primers)):
-        primer = primers[i]
-        primer_id = primer_ids[i]
-        if verbose:
-            print "Starting %s" % primer_id
+    indices = {}
+    if index_dir:
+        from reference_index import get_reference_index
+        for fasta_filepath in fasta_filepaths:
+            indices[fasta_filepath] = get_reference_index(fasta_filepath,
+             join(index_dir, basename(fasta_filepath) + '.kmer_index'),
+             kmer_len, verbose)
+    
+    if cache_fp:
+        cache = AlignmentCache(cache_fp, cache_max_entries)
+    else:
+        cache = None
+    
+    if single_pass:
         for fasta_filepath in fasta_filepaths:
+            if verbose:
+                print "Starting %s" % fasta_filepath
             
             fasta_fp = open(fasta_filepath, "U")
+            outf_paths = [get_outf_paths(output_dir, primer, fasta_filepath)
+             for primer in primers]
+            hits_fps = [open(hits_filepath, 'w') for graph_filepath,
+             hits_filepath in outf_paths]
             
-            # Get hits data and histogram data for writing the hits file and
-            # histogram
-            hits_data, hist_data = get_hits_data(primer, primer_id,
-             fasta_fp, tp_len, last_base_mm,
-             tp_mm, non_tp_mm, tp_gap, non_tp_gap)
-                        
-            # Generate output filepaths based on seq collection and primer name
-            graph_filepath, hits_filepath = get_outf_paths(output_dir, primer,
-             fasta_filepath)
-            
-            # Write lines of data from hits data to output hits filepath
-            hits_f = open(hits_filepath, 'w')
-            hits_f.write('\n'.join(hits_data))
-            hits_f.close()
+            # Hits lines are written to the hits files as they are scored
+            primers_hits_data = get_primers_hits_data(primers, primer_ids,
+             fasta_fp, tp_len, last_base_mm, tp_mm, non_tp_mm, tp_gap,
+             non_tp_gap, align_engine, pool, indices.get(fasta_filepath),
+             cache, hits_fps, batch_handler)
             
             fasta_fp.close()
+            for hits_fp in hits_fps:
+                hits_fp.close()
             
-            # write histogram
-            write_primer_histogram(hist_data, graph_filepath)
-
+            for primer, (hits_data, hist_data, exact_matches),\
+             (graph_filepath, hits_filepath) in\
+             zip(primers, primers_hits_data, outf_paths):
+                if verbose:
+                    report_exact_matches(primer, fasta_filepath, hist_data,
+                     exact_matches)
+                write_histogram(hist_data, graph_filepath)
+    else:
+        for i in range(len(primers)):
+            primer = primers[i]
+            primer_id = primer_ids[i]
+            if verbose:
+                print "Starting %s" % primer_id
+            for fasta_filepath in fasta_filepaths:
+                
+                fasta_fp = open(fasta_filepath, "U")
+                # Generate output filepaths based on seq collection and
+                # primer name
+                graph_filepath, hits_filepath = get_outf_paths(output_dir,
+                 primer, fasta_filepath)
+                hits_fp = open(hits_filepath, 'w')
+                
+                # Write the hits file and get histogram data for writing
+                # the histogram
+                hits_data, hist_data, exact_matches = get_primers_hits_data(\
+                 [primer], [primer_id], fasta_fp, tp_len, last_base_mm,
+                 tp_mm, non_tp_mm, tp_gap, non_tp_gap, align_engine, pool,
+                 indices.get(fasta_filepath), cache, [hits_fp])[0]
+                
+                fasta_fp.close()
+                hits_fp.close()
+                
+                if verbose:
+                    report_exact_matches(primer, fasta_filepath, hist_data,
+                     exact_matches)
+                write_histogram(hist_data, graph_filepath)
+            
+    if pool:
+        for pending_graph in pending_graphs:
+            pending_graph.get()
+        pool.close()
+        pool.join()
     
+    if cache:
+        if verbose:
+            print "Alignment cache %s: %d hits, %d misses" % (cache_fp,
+             cache.Hits, cache.Misses)
+        cache.close()
+
 
+def report_exact_matches(primer,
+                         fasta_filepath,
+                         hist_data,
+                         exact_matches):
+    """ Prints the number of records matching primer exactly (not aligned)
+    
+    primer: primer tested (DNA.Sequence object)
+    fasta_filepath: fasta filepath the primer was tested against
+    hist_data: histogram data, counting each record once in each histogram
+    exact_matches: number of records that matched the primer exactly
+    """
+    
+    print "%s, %s: %d of %d sequences matched exactly, not aligned" %\
+     (primer.Name, basename(fasta_filepath), exact_matches, hist_data[0].sum())
+    
 
 def analyze_primers(fasta_fps, 
                     verbose = False, 
@@ -915,7 +2487,16 @@ def analyze_primers(fasta_fps,
                     tp_mm = 1, 
                     non_tp_mm = 0.4, 
                     tp_gap = 3, 
-                    non_tp_gap = 1):
+                    non_tp_gap = 1,
+                    align_engine = 'numpy',
+                    workers = 1,
+                    single_pass = False,
+                    index_dir = None,
+                    kmer_len = 8,
+                    cache_fp = None,
+                    cache_max_entries = 5000000,
+                    graphs = True,
+                    batch_handler = None):
     """ Main function for primer analysis
     
     fasta_fps: fasta filepaths(s) to test the primers against.  For each fasta
@@ -931,7 +2512,25 @@ def analyze_primers(fasta_fps,
     tp_mm: three prime mismatch penalty
     non_tp_mm: non three prime mismatch penalty
     tp_gap: penalty for three prime gaps
-    non_tp_gap: penalty for non three prime gaps """
+    non_tp_gap: penalty for non three prime gaps
+    align_engine: alignment engine, 'numpy' (vectorized) or 'cogent' (the
+     reference implementation), both give identical hits
+    workers: number of processes used to score each fasta file, output is
+     the same as with a single process
+    single_pass: read each fasta file once for all primers instead of once
+     per primer, output is the same
+    index_dir: directory of the k-mer indices of the fasta files, built when
+     missing or out of date (see reference_index.py), output is the same
+    kmer_len: length of the k-mers of the indices
+    cache_fp: SQLite file caching alignment results across runs, or None for
+     no cache, output is the same
+    cache_max_entries: maximum number of results kept in the cache, the
+     least recently used ones are removed first
+    graphs: write the graphs, if False the histogram data are saved in 
+     _hist.npz files instead, for render_primer_histograms.py
+    batch_handler: function called with each batch of records and the hits
+     lines of each primer for them, as they are scored, which requires 
+     single_pass (see extract_amplicons_and_reads.py) """
     # tp means 'three prime', mm 'mismatch'
     
     
@@ -946,18 +2545,123 @@ def analyze_primers(fasta_fps,
     # Test fasta filepaths, split into list of filepaths 
     fasta_filepaths = get_fasta_filepaths(fasta_fps)
     
+    if batch_handler and not single_pass:
+        raise ValueError,("A batch handler needs all primers scored in a "+\
+         "single pass.")
+    
     
     # Generate hits file 
     generate_hits_file_and_histogram(\
          primers,[p.Name for p in primers], fasta_filepaths,\
          max_mismatches=4, output_dir=output_dir, verbose = verbose,\
          tp_len=tp_len, last_base_mm=last_base_mm, tp_mm=tp_mm,\
-         non_tp_mm=non_tp_mm, tp_gap=tp_gap, non_tp_gap=non_tp_gap)
+         non_tp_mm=non_tp_mm, tp_gap=tp_gap, non_tp_gap=non_tp_gap,\
+         align_engine=align_engine, workers=workers, single_pass=single_pass,\
+         index_dir=index_dir, kmer_len=kmer_len, cache_fp=cache_fp,\
+         cache_max_entries=cache_max_entries, graphs=graphs,\
+         batch_handler=batch_handler)
 
-    
 
-    
 
+####
+# Command line interface
+####
+
+script_info = {}
+script_info['brief_description'] = """Analyzes primers against fasta files"""
+script_info['script_description'] = """Tests each primer against every
+sequence of the input fasta file(s), writing a hits file and a summary graph
+for each primer/fasta file pair (see analyze_primers.py in PrimerProspector).
+This version can spread the alignments of each fasta file over several
+processes."""
+script_info['script_usage'] = [("Analyze primers",
+ "Analyze the primers in primers.txt against refs.fasta with 32 processes",
+ "%prog -f refs.fasta -P primers.txt -o analyze_primers_out --workers 32")]
+script_info['output_description'] = """Hits files and .ps graphs are written
+to the output directory for each primer and fasta file.  With --no_graphs, the
+histogram data are written to _hist.npz files instead of the graphs, which
+render_primer_histograms.py draws later."""
+script_info['required_options'] = [
+    make_option('-f', '--fasta_seqs', help='fasta file(s) to test primers '+\
+     'against, separated by colons'),
+]
+script_info['optional_options'] = [
+    make_option('-P', '--primers_filepath', help='file of primer names '+\
+     'and sequences [default: %default]', default=None),
+    make_option('-p', '--primer_name', help='name of a single primer to '+\
+     'test [default: %default]', default=None),
+    make_option('-s', '--primer_sequence', help='sequence of a single '+\
+     'primer to test [default: %default]', default=None),
+    make_option('-o', '--output_dir', help='output directory '+\
+     '[default: %default]', default='.'),
+    make_option('-t', '--three_prime_len', type='int', help='length of the '+\
+     '3\' region of the primer [default: %default]', default=5),
+    make_option('-T', '--last_base_mismatch', type='float', help='penalty '+\
+     'for a mismatch of the final 3\' base [default: %default]', default=3),
+    make_option('-M', '--three_prime_mismatch', type='float', help='3\' '+\
+     'mismatch penalty [default: %default]', default=1),
+    make_option('-m', '--non_three_prime_mismatch', type='float',
+     help='non 3\' mismatch penalty [default: %default]', default=0.4),
+    make_option('-g', '--three_prime_gap', type='float', help='3\' gap '+\
+     'penalty [default: %default]', default=3),
+    make_option('-G', '--non_three_prime_gap', type='float', help='non 3\' '+\
+     'gap penalty [default: %default]', default=1),
+    make_option('--align_engine', type='choice',
+     choices=list(ALIGNMENT_ENGINES), help='alignment engine, cogent is the '+\
+     'reference implementation [default: %default]', default='numpy'),
+    make_option('--workers', type='int', help='number of processes used '+\
+     'to score each fasta file [default: %default]', default=1),
+    make_option('--single_pass', action='store_true', help='read each '+\
+     'fasta file once and test all primers against it, instead of '+\
+     'reading it once per primer [default: %default]', default=False),
+    make_option('--index_dir', help='directory of the k-mer indices of the '+\
+     'fasta files, which are built if missing or out of date.  Only '+\
+     'windows around the k-mer hits of the primers are aligned where this '+\
+     'gives the same result [default: %default]', default=None),
+    make_option('--kmer_len', type='int', help='length of the k-mers of '+\
+     'the indices [default: %default]', default=8),
+    make_option('--cache_fp', help='SQLite file caching alignment results '+\
+     'across runs, by primer, scoring penalties and sequence '+\
+     '[default: %default]',
+     default=expanduser('~/.akutils/analyze_primers_cache.sqlite')),
+    make_option('--cache_max_entries', type='int', help='maximum number '+\
+     'of results kept in the cache, least recently used ones are removed '+\
+     'first [default: %default]', default=5000000),
+    make_option('--no_cache', action='store_true', help='do not read or '+\
+     'write the alignment cache [default: %default]', default=False),
+    make_option('--no_graphs', action='store_true', help='save the '+\
+     'histogram data of each graph in a _hist.npz file instead of drawing '+\
+     'it, see render_primer_histograms.py [default: %default]',
+     default=False),
+]
+script_info['version'] = __version__
 
 
+def main():
+    option_parser, opts, args = parse_command_line_parameters(**script_info)
+    
+    if opts.workers < 1:
+        option_parser.error('--workers must be at least 1')
+    
+    if not 0 < opts.kmer_len <= 16:
+        option_parser.error('--kmer_len must be between 1 and 16')
+    
+    if not isdir(opts.output_dir):
+        makedirs(opts.output_dir)
+    
+    if opts.no_cache:
+        cache_fp = None
+    else:
+        cache_fp = opts.cache_fp
+    
+    analyze_primers(opts.fasta_seqs, opts.verbose, opts.output_dir,
+     opts.primers_filepath, opts.primer_name, opts.primer_sequence,
+     opts.three_prime_len, opts.last_base_mismatch, opts.three_prime_mismatch,
+     opts.non_three_prime_mismatch, opts.three_prime_gap,
+     opts.non_three_prime_gap, opts.align_engine, opts.workers,
+     opts.single_pass, opts.index_dir, opts.kmer_len, cache_fp,
+     opts.cache_max_entries, not opts.no_graphs)
+
 
+if __name__ == "__main__":
+    main()
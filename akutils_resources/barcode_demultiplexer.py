@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+#
+#  barcode_demultiplexer.py - Assign reads to samples by their index barcodes
+#
+#  Version 1.0.0 (October 16, 2026)
+#
+#  Copyright (c) 2026 Andrew Krohn
+#
+#  This software is provided 'as-is', without any express or implied
+#  warranty. In no event will the authors be held liable for any damages
+#  arising from the use of this software.
+#
+#  Permission is granted to anyone to use this software for any purpose,
+#  including commercial applications, and to alter it and redistribute it
+#  freely, subject to the following restrictions:
+#
+#  1. The origin of this software must not be misrepresented; you must not
+#     claim that you wrote the original software. If you use this software
+#     in a product, an acknowledgment in the product documentation would be
+#     appreciated but is not required.
+#  2. Altered source versions must be plainly marked as such, and must not be
+#     misrepresented as being the original software.
+#  3. This notice may not be removed or altered from any source distribution.
+#
+
+## Used by PhiX_filtering_workflow.sh in place of fastq-multx and the cat of
+## its per-sample files.  The barcodes of a QIIME mapping file (SampleID and
+## BarcodeSequence columns) are expanded once into a table of every sequence
+## within the allowed number of mismatches of a barcode, so that the sample
+## of a read is a single lookup of the start of its index read.  A sequence
+## as close to two barcodes as to any other is ambiguous and its reads are
+## not assigned; pairs of barcodes close enough for this are reported.
+##
+## The index file (-i) and the read files (-r) are read in lockstep.  If no
+## output contains "%", the reads of every sample are written in input order
+## to one file per input (filter only).  Otherwise "%" is replaced by the
+## sample ID and each sample is written to its own files, as fastq-multx -o.
+## Barcodes are not trimmed.  The number of reads of each sample is printed.
+##
+## Assignment is a dict lookup per read, so reading and writing the fastqs
+## dominates and the reads are demultiplexed in a single process.
+
+from argparse import ArgumentParser
+from itertools import combinations, product
+from sys import exit, stderr
+
+from fastq_length_filter import read_record_tuples, write_fastq_record
+
+__author__ = "Andrew Krohn"
+__copyright__ = "Copyright 2026"
+__license__ = "zlib"
+__version__ = "1.0.0"
+
+BUFFER_SIZE = 1 << 20
+BASES = 'ACGTN'
+AMBIGUOUS = -1
+
+
+def read_barcodes(mapping_fp):
+    """ Returns [(sample id, barcode)] of a QIIME mapping file """
+
+    barcodes = []
+    with open(mapping_fp, 'U') as mapping_f:
+        for line in mapping_f:
+            if line.startswith('#') or not line.strip():
+                continue
+            fields = line.rstrip('\n').split('\t')
+            if len(fields) < 2 or not fields[1].strip():
+                raise ValueError('No barcode for sample %s in %s' %
+                 (fields[0], mapping_fp))
+            barcodes.append((fields[0], fields[1].strip().upper()))
+
+    sample_ids = [sample_id for sample_id, barcode in barcodes]
+    if len(set(sample_ids)) != len(sample_ids):
+        raise ValueError('Sample IDs are repeated in %s' % mapping_fp)
+    if not barcodes:
+        raise ValueError('No barcodes found in %s' % mapping_fp)
+
+    return barcodes
+
+
+def get_barcode_variants(barcode, max_mismatches):
+    """ Yields (variant, mismatches) of each sequence within max_mismatches
+    of barcode, N counting as a mismatch
+    """
+
+    yield barcode, 0
+    for mismatches in range(1, min(max_mismatches, len(barcode)) + 1):
+        for positions in combinations(range(len(barcode)), mismatches):
+            choices = [[base for base in BASES if base != barcode[position]]
+             for position in positions]
+            for bases in product(*choices):
+                variant = list(barcode)
+                for position, base in zip(positions, bases):
+                    variant[position] = base
+                yield ''.join(variant), mismatches
+
+
+def build_barcode_table(barcodes, max_mismatches):
+    """ Returns (table, collisions) of a list of (sample id, barcode)
+
+    table: {barcode length: {sequence: sample number}}, the sample number
+     being the index of the closest barcode or AMBIGUOUS if two barcodes are
+     equally close
+    collisions: sorted (sample id, sample id) pairs whose barcodes share
+     sequences within max_mismatches
+    """
+
+    closest = {}
+    collisions = set()
+    for sample_number, (sample_id, barcode) in enumerate(barcodes):
+        sequences = closest.setdefault(len(barcode), {})
+        for variant, mismatches in get_barcode_variants(barcode,
+         max_mismatches):
+            if variant not in sequences:
+                sequences[variant] = (mismatches, [sample_number])
+                continue
+            best_mismatches, sample_numbers = sequences[variant]
+            collisions.update((barcodes[other][0], sample_id) for other in
+             sample_numbers)
+            if mismatches < best_mismatches:
+                sequences[variant] = (mismatches, [sample_number])
+            elif mismatches == best_mismatches:
+                sample_numbers.append(sample_number)
+
+    table = {}
+    for length, sequences in closest.iteritems():
+        table[length] = dict((variant, sample_numbers[0] if
+         len(sample_numbers) == 1 else AMBIGUOUS) for variant,
+         (mismatches, sample_numbers) in sequences.iteritems())
+
+    return table, sorted(collisions)
+
+
+def assign_barcode(table, sequence):
+    """ Returns the sample number of an index sequence, None if unmatched
+
+    The start of the sequence is looked up once for each barcode length,
+    longest first.
+    """
+
+    for length in sorted(table, reverse=True):
+        sample_number = table[length].get(sequence[:length].upper())
+        if sample_number is not None:
+            return None if sample_number == AMBIGUOUS else sample_number
+    return None
+
+
+def demultiplex(index_fp,
+                read_fps,
+                output_fps,
+                barcodes,
+                max_mismatches=1):
+    """ Writes the record tuples whose index reads match a barcode
+
+    index_fp: index fastq file, its reads beginning with the barcodes
+    read_fps: fastq files whose records follow those of the index file
+    output_fps: output files of the index file, then of the read files;
+     "%" in them is replaced by the sample ID, one file per sample
+    barcodes: list of (sample id, barcode)
+    max_mismatches: mismatches allowed between an index read and a barcode
+
+    Returns (counts, unmatched), counts being the number of records of each
+    sample in the order of barcodes.
+    """
+
+    input_fps = [index_fp] + list(read_fps)
+    if len(output_fps) != len(input_fps):
+        raise ValueError('Give one output file for the index file and each '
+         'read file')
+    split_samples = ['%' in fp for fp in output_fps]
+    if any(split_samples) and not all(split_samples):
+        raise ValueError('Either all or none of the output files must '
+         'contain "%"')
+
+    table, collisions = build_barcode_table(barcodes, max_mismatches)
+    for sample_id, other_sample_id in collisions:
+        stderr.write('Warning: the barcodes of %s and %s are within %d '
+         'mismatches of the same sequences, reads equally close to both are '
+         'not assigned\n' % (sample_id, other_sample_id, max_mismatches))
+
+    if all(split_samples):
+        output_fs = [[open(fp.replace('%', sample_id), 'w', BUFFER_SIZE) for
+         fp in output_fps] for sample_id, barcode in barcodes]
+    else:
+        output_fs = [[open(fp, 'w', BUFFER_SIZE) for fp in output_fps]] * \
+         len(barcodes)
+
+    input_fs = [open(fp, 'U') for fp in input_fps]
+    counts = [0] * len(barcodes)
+    unmatched = 0
+    try:
+        for records in read_record_tuples(input_fs, input_fps):
+            sample_number = assign_barcode(table, records[0][1].rstrip('\n'))
+            if sample_number is None:
+                unmatched += 1
+                continue
+            counts[sample_number] += 1
+            for record, output_f in zip(records, output_fs[sample_number]):
+                write_fastq_record(output_f, record)
+    finally:
+        for f in input_fs:
+            f.close()
+        for sample_output_fs in output_fs:
+            for f in sample_output_fs:
+                f.close()
+
+    return counts, unmatched
+
+
+def main():
+    parser = ArgumentParser(description='Assigns reads to the samples of a '
+     'mapping file by the barcodes of their index reads, allowing '
+     'mismatches, and writes the matched reads to one file per input or per '
+     'sample.')
+    parser.add_argument('-m', '--mapping_fp', required=True,
+     help='QIIME mapping file with the barcodes in its second column')
+    parser.add_argument('-i', '--index', required=True,
+     help='Index fastq file, its reads beginning with the barcodes')
+    parser.add_argument('-r', '--reads', nargs='*', default=[],
+     help='Read fastq files, kept with their index reads')
+    parser.add_argument('-o', '--outputs', nargs='+', required=True,
+     help='Output files of the index file, then of the read files; "%%" is '
+     'replaced by the sample ID to write one file per sample')
+    parser.add_argument('-e', '--mismatches', type=int, default=1,
+     help='Mismatches allowed between an index read and a barcode '
+     '(default: 1)')
+    args = parser.parse_args()
+
+    if args.mismatches < 0:
+        parser.error('--mismatches must be at least 0')
+
+    try:
+        barcodes = read_barcodes(args.mapping_fp)
+        counts, unmatched = demultiplex(args.index, args.reads,
+         args.outputs, barcodes, args.mismatches)
+    except ValueError, e:
+        stderr.write('Error: %s\n' % e)
+        exit(1)
+
+    print 'Id\tCount'
+    for (sample_id, barcode), count in zip(barcodes, counts):
+        print '%s\t%d' % (sample_id, count)
+    print 'unmatched\t%d' % unmatched
+    print 'total\t%d' % (sum(counts) + unmatched)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+#!/usr/bin/env python
+#
+#  extract_amplicons_and_reads.py - Find primer sites and cut in silico amplicons and reads in one pass
+#
+#  Version 1.0.0 (October 16, 2026)
+#
+#  Copyright (c) 2026 Andrew Krohn
+#
+#  This software is provided 'as-is', without any express or implied
+#  warranty. In no event will the authors be held liable for any damages
+#  arising from the use of this software.
+#
+#  Permission is granted to anyone to use this software for any purpose,
+#  including commercial applications, and to alter it and redistribute it
+#  freely, subject to the following restrictions:
+#
+#  1. The origin of this software must not be misrepresented; you must not
+#     claim that you wrote the original software. If you use this software
+#     in a product, an acknowledgment in the product documentation would be
+#     appreciated but is not required.
+#  2. Altered source versions must be plainly marked as such, and must not be
+#     misrepresented as being the original software.
+#  3. This notice may not be removed or altered from any source distribution.
+#
+
+## Replaces analyze_primers.py followed by get_amplicons_and_reads.py runs on
+## its hits files.  The primers are scored against the reference sequences by
+## analyze_primers.py (which still writes its hits files), and each batch of
+## records is cut into amplicons and reads as soon as its hits are known, so
+## the reference fasta is read once.  A primer site is used if its weighted
+## score is at most the score threshold.  Amplicons exclude the primers, and
+## only amplicons of at least the minimum length are written, with reads cut
+## from them:
+##
+## With a forward and a reverse primer, three outputs are written:
+##   <f>_<r>_amplicons.fasta   sequence between the forward and reverse sites
+##   <f>_<length>_reads.fasta  first <length> bases after the forward site
+##   <r>_<length>_reads.fasta  first <length> bases of the reverse complement
+##                             before the reverse site
+## With a single primer <p>, its amplicons (after a forward site or before a
+## reverse site) and its reads:
+##   <p>_amplicons.fasta
+##   <p>_f_<length>_reads.fasta or <p>_r_<length>_reads.fasta
+
+from argparse import ArgumentParser
+from os import makedirs
+from os.path import expanduser, isdir, join
+
+from cogent import DNA
+
+from analyze_primers import get_primers, generate_hits_file_and_histogram
+
+__author__ = "Andrew Krohn"
+__copyright__ = "Copyright 2026"
+__license__ = "zlib"
+__version__ = "1.0.0"
+
+
+def is_forward_primer(primer):
+    """ Returns True for a forward primer, False for a reverse primer
+
+    Primer names are tested the same way analyze_primers.py tests them.
+    """
+
+    if primer.Name.split('_')[0].endswith('f'):
+        return True
+    elif primer.Name.split('_')[0].endswith('r'):
+        return False
+    raise ValueError('Primer name must end with f or r: %s' % primer.Name)
+
+
+def get_hit_site(hits_line,
+                 forward,
+                 score_threshold):
+    """ Returns the amplicon boundary of a hits line, or None
+
+    For a forward primer this is the first position after the primer site,
+    for a reverse primer the first position of the site (which is on the
+    plus strand in the hits file).  None is returned if the weighted score is
+    above score_threshold.
+
+    hits_line: line of an analyze_primers.py hits file
+    forward: True for a forward primer
+    score_threshold: largest weighted score of a site used
+    """
+
+    # seq id, target hit, primer hit, hit start, non 3' mismatches,
+    # 3' mismatches, last base mismatch, non 3' gaps, 3' gaps, weighted
+    # score, hits sequence end
+    fields = hits_line.rsplit(',', 10)
+    if float(fields[9]) > score_threshold:
+        return None
+
+    hit_start = int(fields[3])
+    if forward:
+        return hit_start + len(fields[1].replace('-', ''))
+    return hit_start
+
+
+class AmpliconWriter(object):
+    """ Cuts amplicons and reads from batches of records and primer hits
+
+    Called by analyze_primers.get_primers_hits_data with each batch of
+    records and the hits lines of each primer for them.
+    """
+
+    def __init__(self,
+                 primers,
+                 output_dir,
+                 read_len,
+                 score_threshold=2.0,
+                 min_seq_len=100):
+        """ Opens the output files of the primers (at most one per direction)
+
+        primers: list of primers (DNA.Sequence objects), in the order of
+         their hits lines
+        output_dir: directory of the output fasta files
+        read_len: length of the reads
+        score_threshold: largest weighted score of a primer site used
+        min_seq_len: minimum length of the amplicons written
+        """
+
+        self.ForwardIndex = None
+        self.ReverseIndex = None
+        for primer_index, primer in enumerate(primers):
+            if is_forward_primer(primer):
+                if self.ForwardIndex is not None:
+                    raise ValueError('More than one forward primer given.')
+                self.ForwardIndex = primer_index
+            else:
+                if self.ReverseIndex is not None:
+                    raise ValueError('More than one reverse primer given.')
+                self.ReverseIndex = primer_index
+
+        self.ReadLen = read_len
+        self.ScoreThreshold = score_threshold
+        self.MinSeqLen = min_seq_len
+        self.Counts = {'amplicons': 0, 'forward reads': 0,
+         'reverse reads': 0}
+
+        self.AmpliconsFile = self.SingleAmpliconsFile = None
+        self.ForwardReadsFile = self.ReverseReadsFile = None
+        if self.ForwardIndex is not None and self.ReverseIndex is not None:
+            forward_name = primers[self.ForwardIndex].Name
+            reverse_name = primers[self.ReverseIndex].Name
+            self.AmpliconsFile = open(join(output_dir, '%s_%s_amplicons.fasta'
+             % (forward_name, reverse_name)), 'w')
+            self.ForwardReadsFile = open(join(output_dir,
+             '%s_%d_reads.fasta' % (forward_name, read_len)), 'w')
+            self.ReverseReadsFile = open(join(output_dir,
+             '%s_%d_reads.fasta' % (reverse_name, read_len)), 'w')
+        elif self.ForwardIndex is not None:
+            forward_name = primers[self.ForwardIndex].Name
+            self.SingleAmpliconsFile = open(join(output_dir,
+             '%s_amplicons.fasta' % forward_name), 'w')
+            self.ForwardReadsFile = open(join(output_dir,
+             '%s_f_%d_reads.fasta' % (forward_name, read_len)), 'w')
+        elif self.ReverseIndex is not None:
+            reverse_name = primers[self.ReverseIndex].Name
+            self.SingleAmpliconsFile = open(join(output_dir,
+             '%s_amplicons.fasta' % reverse_name), 'w')
+            self.ReverseReadsFile = open(join(output_dir,
+             '%s_r_%d_reads.fasta' % (reverse_name, read_len)), 'w')
+        else:
+            raise ValueError('No primers given.')
+
+    def __call__(self,
+                 records,
+                 primers_hits_lines):
+        """ Writes the amplicons and reads of a batch of records
+
+        records: list of (label, seq) tuples
+        primers_hits_lines: list of the hits lines of each primer, one line
+         per record
+        """
+
+        paired = self.AmpliconsFile is not None
+        forward_sites = reverse_sites = [None] * len(records)
+        if self.ForwardIndex is not None:
+            forward_sites = [get_hit_site(hits_line, True,
+             self.ScoreThreshold) for hits_line in
+             primers_hits_lines[self.ForwardIndex]]
+        if self.ReverseIndex is not None:
+            reverse_sites = [get_hit_site(hits_line, False,
+             self.ScoreThreshold) for hits_line in
+             primers_hits_lines[self.ReverseIndex]]
+
+        for (label, seq), forward_site, reverse_site in zip(records,
+         forward_sites, reverse_sites):
+            seq_id = label.split()[0]
+            if forward_site is not None:
+                amplicon = seq[forward_site:]
+                if len(amplicon) >= self.MinSeqLen:
+                    if not paired:
+                        self.writeSeq(self.SingleAmpliconsFile, seq_id,
+                         amplicon, 'amplicons')
+                    self.writeSeq(self.ForwardReadsFile, seq_id,
+                     amplicon[:self.ReadLen], 'forward reads')
+            if reverse_site is not None:
+                amplicon = seq[:reverse_site]
+                if len(amplicon) >= self.MinSeqLen:
+                    if not paired:
+                        self.writeSeq(self.SingleAmpliconsFile, seq_id,
+                         amplicon, 'amplicons')
+                    self.writeSeq(self.ReverseReadsFile, seq_id,
+                     DNA.rc(amplicon[-self.ReadLen:]), 'reverse reads')
+            if paired and forward_site is not None and\
+             reverse_site is not None:
+                amplicon = seq[forward_site:reverse_site]
+                if len(amplicon) >= self.MinSeqLen:
+                    self.writeSeq(self.AmpliconsFile, seq_id, amplicon,
+                     'amplicons')
+
+    def writeSeq(self,
+                 out_f,
+                 seq_id,
+                 seq,
+                 count_key):
+        """ Writes an unwrapped fasta record and counts it """
+
+        out_f.write('>%s\n%s\n' % (seq_id, seq))
+        self.Counts[count_key] += 1
+
+    def close(self):
+        """ Closes the output files """
+
+        for out_f in (self.AmpliconsFile, self.SingleAmpliconsFile,
+         self.ForwardReadsFile, self.ReverseReadsFile):
+            if out_f is not None:
+                out_f.close()
+
+
+def extract_amplicons_and_reads(fasta_filepath,
+                                primers_filepath,
+                                output_dir,
+                                hits_dir,
+                                read_len,
+                                score_threshold=2.0,
+                                min_seq_len=100,
+                                workers=1,
+                                index_dir=None,
+                                cache_fp=None,
+                                graphs=True,
+                                verbose=False):
+    """ Scores the primers and writes amplicons and reads in one fasta pass
+
+    Returns the AmpliconWriter counts of the sequences written.
+
+    fasta_filepath: reference fasta file
+    primers_filepath: primers file, with a forward and/or a reverse primer
+    output_dir: directory of the amplicons and reads
+    hits_dir: directory of the analyze_primers.py hits files and graphs
+    read_len: length of the reads
+    score_threshold: largest weighted score of a primer site used
+    min_seq_len: minimum length of the amplicons written
+    workers: number of processes scoring the primers
+    index_dir: directory of the k-mer indices (see analyze_primers.py)
+    cache_fp: alignment cache file of analyze_primers.py, or None
+    graphs: write the analyze_primers.py graphs
+    verbose: print progress
+    """
+
+    primers = get_primers(open(primers_filepath, 'U'))
+    writer = AmpliconWriter(primers, output_dir, read_len, score_threshold,
+     min_seq_len)
+    try:
+        generate_hits_file_and_histogram(primers,
+         [p.Name for p in primers], [fasta_filepath], output_dir=hits_dir,
+         verbose=verbose, workers=workers, single_pass=True,
+         index_dir=index_dir, cache_fp=cache_fp, graphs=graphs,
+         batch_handler=writer)
+    finally:
+        writer.close()
+
+    return writer.Counts
+
+
+def main():
+    parser = ArgumentParser(description='Scores primers against reference '
+     'sequences with analyze_primers.py and writes in silico amplicons and '
+     'reads in the same pass over the references.  With a forward and a '
+     'reverse primer, the paired amplicons and the reads of each primer are '
+     'all written.')
+    parser.add_argument('-f', '--input_fasta', required=True,
+     help='The reference fasta file')
+    parser.add_argument('-P', '--primers_filepath', required=True,
+     help='The primers file, with one forward and/or one reverse primer')
+    parser.add_argument('-o', '--output_dir', required=True,
+     help='The directory the amplicons and reads are written to')
+    parser.add_argument('-R', '--read_len', type=int, default=250,
+     help='The length of the in silico reads (default: 250)')
+    parser.add_argument('-t', '--score_threshold', type=float, default=2.0,
+     help='The largest weighted score of a primer site used (default: 2.0)')
+    parser.add_argument('-m', '--min_seq_len', type=int, default=100,
+     help='The minimum length of the amplicons written (default: 100)')
+    parser.add_argument('--hits_dir', default=None,
+     help='The directory the analyze_primers.py hits files and graphs are '
+     'written to (default: the output directory)')
+    parser.add_argument('--no_graphs', action='store_true',
+     help='Save the analyze_primers.py histogram data instead of graphs')
+    parser.add_argument('--workers', type=int, default=1,
+     help='The number of processes scoring the primers (default: 1)')
+    parser.add_argument('--index_dir', default=None,
+     help='The directory of the k-mer indices of the reference (see '
+     'analyze_primers.py --index_dir)')
+    parser.add_argument('--cache_fp',
+     default=expanduser('~/.akutils/analyze_primers_cache.sqlite'),
+     help='The analyze_primers.py alignment cache (default: %(default)s)')
+    parser.add_argument('--no_cache', action='store_true',
+     help='Do not read or write the alignment cache')
+    parser.add_argument('-v', '--verbose', action='store_true',
+     help='Print progress and the number of sequences written')
+    args = parser.parse_args()
+
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+
+    hits_dir = args.hits_dir or args.output_dir
+    for out_dir in (args.output_dir, hits_dir):
+        if not isdir(out_dir):
+            makedirs(out_dir)
+
+    if args.no_cache:
+        cache_fp = None
+    else:
+        cache_fp = args.cache_fp
+
+    counts = extract_amplicons_and_reads(args.input_fasta,
+     args.primers_filepath, args.output_dir, hits_dir, args.read_len,
+     args.score_threshold, args.min_seq_len, args.workers, args.index_dir,
+     cache_fp, not args.no_graphs, args.verbose)
+
+    if args.verbose:
+        for count_key in sorted(counts):
+            print "%d %s written" % (counts[count_key], count_key)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+#
+#  fastq_concatenate.py - Concatenate index and read fastqs, and split them
+#
+#  Version 1.0.0 (October 16, 2026)
+#
+#  Copyright (c) 2026 Andrew Krohn
+#
+#  This software is provided 'as-is', without any express or implied
+#  warranty. In no event will the authors be held liable for any damages
+#  arising from the use of this software.
+#
+#  Permission is granted to anyone to use this software for any purpose,
+#  including commercial applications, and to alter it and redistribute it
+#  freely, subject to the following restrictions:
+#
+#  1. The origin of this software must not be misrepresented; you must not
+#     claim that you wrote the original software. If you use this software
+#     in a product, an acknowledgment in the product documentation would be
+#     appreciated but is not required.
+#  2. Altered source versions must be plainly marked as such, and must not be
+#     misrepresented as being the original software.
+#  3. This notice may not be removed or altered from any source distribution.
+#
+
+## Engine of concatenate_fastqs.sh and the fastq-join workflows, in place of
+## paste and sed for concatenating and of fastx_trimmer for splitting.
+##
+##   join   reads any number of fastq files in lockstep and writes records
+##          whose sequence and quality are those of the inputs concatenated
+##          in order, under the header of the last input (as the paste
+##          pipeline wrote them).  The records of each tuple must have the
+##          same ID.
+##   split  writes the first <index_length> bases of each record to one
+##          file and the rest to another, in one pass over the joined reads.
+##
+## Files ending in .gz are read and written gzipped.
+
+from argparse import ArgumentParser
+from gzip import open as gzip_open
+from sys import exit, stderr
+
+from fastq_length_filter import (get_record_id, read_fastq_records,
+                                 read_record_tuples)
+
+__author__ = "Andrew Krohn"
+__copyright__ = "Copyright 2026"
+__license__ = "zlib"
+__version__ = "1.0.0"
+
+BUFFER_SIZE = 1 << 20
+GZIP_LEVEL = 6
+
+
+def open_fastq(fp, mode='r'):
+    """ Opens a fastq file for reading ('r') or writing ('w'), gzipped if
+    it ends with .gz
+    """
+
+    if fp.endswith('.gz'):
+        return gzip_open(fp, mode + 'b', GZIP_LEVEL)
+    if mode == 'r':
+        return open(fp, 'U')
+    return open(fp, mode, BUFFER_SIZE)
+
+
+def concatenate_fastqs(input_fps, output_fp):
+    """ Writes the records of the inputs concatenated, returns their number
+
+    input_fps: fastq files whose sequences are concatenated in this order,
+     the header and plus lines being those of the last file
+    output_fp: the concatenated fastq file
+    """
+
+    input_fs = [open_fastq(fp) for fp in input_fps]
+    output_f = open_fastq(output_fp, 'w')
+    records_in = 0
+    try:
+        for records in read_record_tuples(input_fs, input_fps):
+            records_in += 1
+            output_f.write(''.join([records[-1][0],
+             ''.join(record[1].rstrip('\n') for record in records), '\n',
+             records[-1][2].rstrip('\n'), '\n',
+             ''.join(record[3].rstrip('\n') for record in records), '\n']))
+    finally:
+        for f in input_fs + [output_f]:
+            f.close()
+
+    return records_in
+
+
+def split_fastq(input_fp, index_length, index_fp, read_fp):
+    """ Writes the first index_length bases of each record to index_fp and
+    the rest to read_fp, returns the number of records
+    """
+
+    records_in = 0
+    with open_fastq(input_fp) as input_f:
+        index_f = open_fastq(index_fp, 'w')
+        read_f = open_fastq(read_fp, 'w')
+        try:
+            for header, sequence, plus, quality in \
+             read_fastq_records(input_f):
+                records_in += 1
+                sequence = sequence.rstrip('\n')
+                quality = quality.rstrip('\n')
+                if len(sequence) != len(quality):
+                    raise ValueError('The sequence and quality of record %d '
+                     'differ in length: %s' % (records_in,
+                     get_record_id(header)))
+                plus = plus.rstrip('\n') + '\n'
+                index_f.write(''.join([header, sequence[:index_length], '\n',
+                 plus, quality[:index_length], '\n']))
+                read_f.write(''.join([header, sequence[index_length:], '\n',
+                 plus, quality[index_length:], '\n']))
+        finally:
+            index_f.close()
+            read_f.close()
+
+    return records_in
+
+
+def main():
+    parser = ArgumentParser(description='Concatenates the records of fastq '
+     'files read in lockstep, or splits the records of a fastq file at an '
+     'index length, in one streaming pass.')
+    subparsers = parser.add_subparsers(dest='command')
+
+    join_parser = subparsers.add_parser('join', help='Concatenate the '
+     'sequences and qualities of fastq files')
+    join_parser.add_argument('-i', '--inputs', nargs='+', required=True,
+     help='fastq files, concatenated in this order under the headers of the '
+     'last file')
+    join_parser.add_argument('-o', '--output', required=True,
+     help='The concatenated fastq file')
+
+    split_parser = subparsers.add_parser('split', help='Split fastq records '
+     'into index and read records')
+    split_parser.add_argument('-i', '--input', required=True,
+     help='fastq file of index sequences followed by read sequences')
+    split_parser.add_argument('-l', '--index_length', type=int,
+     required=True, help='The length of the index sequences')
+    split_parser.add_argument('-x', '--index_output', required=True,
+     help='The fastq file of index sequences')
+    split_parser.add_argument('-r', '--read_output', required=True,
+     help='The fastq file of read sequences')
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'join':
+            if len(args.inputs) < 2:
+                parser.error('Give at least two fastq files to concatenate')
+            records = concatenate_fastqs(args.inputs, args.output)
+        else:
+            if args.index_length < 1:
+                parser.error('--index_length must be at least 1')
+            records = split_fastq(args.input, args.index_length,
+             args.index_output, args.read_output)
+    except ValueError, e:
+        stderr.write('Error: %s\n' % e)
+        exit(1)
+
+    print 'Wrote %d fastq records.' % records
+
+
+if __name__ == "__main__":
+    main()
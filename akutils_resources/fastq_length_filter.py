@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+#
+#  fastq_length_filter.py - Filter read files and their indexes by read length
+#
+#  Version 1.0.0 (October 16, 2026)
+#
+#  Copyright (c) 2026 Andrew Krohn
+#
+#  This software is provided 'as-is', without any express or implied
+#  warranty. In no event will the authors be held liable for any damages
+#  arising from the use of this software.
+#
+#  Permission is granted to anyone to use this software for any purpose,
+#  including commercial applications, and to alter it and redistribute it
+#  freely, subject to the following restrictions:
+#
+#  1. The origin of this software must not be misrepresented; you must not
+#     claim that you wrote the original software. If you use this software
+#     in a product, an acknowledgment in the product documentation would be
+#     appreciated but is not required.
+#  2. Altered source versions must be plainly marked as such, and must not be
+#     misrepresented as being the original software.
+#  3. This notice may not be removed or altered from any source distribution.
+#
+
+## Engine of filter_fastq_by_length.sh.  The read files (-r) and index files
+## (-x) are read in lockstep, one record of each at a time, and a record is
+## written to every output only if the sequences of all of its reads are
+## within the length range.  Index sequences are not length filtered.  The
+## outputs therefore stay in phase without matching their headers
+## afterwards, and every file is read once.  The records of each tuple must
+## have the same ID (the header up to the first whitespace, without any /1
+## or /2 suffix).
+
+from argparse import ArgumentParser
+from itertools import izip, izip_longest
+from sys import exit, stderr
+
+__author__ = "Andrew Krohn"
+__copyright__ = "Copyright 2026"
+__license__ = "zlib"
+__version__ = "1.0.0"
+
+BUFFER_SIZE = 1 << 20
+
+
+def read_fastq_records(fastq_f):
+    """ Yields the (header, sequence, plus, quality) lines of each record """
+
+    lines = iter(fastq_f)
+    return izip(lines, lines, lines, lines)
+
+
+def get_record_id(header):
+    """ Returns the ID of a record header, without any /1 or /2 read suffix
+    """
+
+    record_id = header.split(None, 1)[0]
+    if record_id[-2:-1] == '/' and record_id[-1:].isdigit():
+        return record_id[:-2]
+    return record_id
+
+
+def read_record_tuples(fastq_fs, fastq_fps):
+    """ Yields the tuples of records of open fastq files read in lockstep
+
+    fastq_fs: open fastq files
+    fastq_fps: their paths, named in errors
+
+    Raises ValueError if the records of a tuple do not have the same ID, or
+    if the files do not have the same number of records.
+    """
+
+    records_in = 0
+    for records in izip_longest(*[read_fastq_records(f) for f in fastq_fs]):
+        records_in += 1
+        # A file that ended leaves None in the tuple of the others' records
+        if None in records:
+            longer_fp = [fp for fp, record in zip(fastq_fps, records) if
+             record is not None][0]
+            raise ValueError('The files have different numbers of records, '
+             '%s has more than %d' % (longer_fp, records_in - 1))
+        record_id = get_record_id(records[0][0])
+        for record in records[1:]:
+            if get_record_id(record[0]) != record_id:
+                raise ValueError('Records out of phase at record %d: %s and '
+                 '%s' % (records_in, record_id, get_record_id(record[0])))
+        yield records
+
+
+def write_fastq_record(fastq_f, record):
+    """ Writes the lines of a record, ending the last one with a newline """
+
+    if record[3].endswith('\n'):
+        fastq_f.write(''.join(record))
+    else:
+        fastq_f.write(''.join(record) + '\n')
+
+
+def filter_fastq_by_length(read_fps,
+                           index_fps,
+                           output_fps,
+                           min_length,
+                           max_length):
+    """ Writes the record tuples whose reads are all within the length range
+
+    read_fps: fastq files whose sequence lengths are filtered
+    index_fps: fastq files whose records follow those of the reads
+    output_fps: output files of the read files, then of the index files
+    min_length, max_length: inclusive range of read sequence lengths
+
+    Returns (records read, records written), the same for every file.
+    """
+
+    input_fps = list(read_fps) + list(index_fps)
+    if len(output_fps) != len(input_fps):
+        raise ValueError('Give one output file for each read and index file')
+
+    input_fs = [open(fp, 'U') for fp in input_fps]
+    output_fs = [open(fp, 'w', BUFFER_SIZE) for fp in output_fps]
+    read_count = len(read_fps)
+    records_in = 0
+    records_out = 0
+    try:
+        for records in read_record_tuples(input_fs, input_fps):
+            records_in += 1
+            for record in records[:read_count]:
+                length = len(record[1].rstrip('\n'))
+                if length < min_length or length > max_length:
+                    break
+            else:
+                records_out += 1
+                for record, output_f in zip(records, output_fs):
+                    write_fastq_record(output_f, record)
+    finally:
+        for f in input_fs + output_fs:
+            f.close()
+
+    return records_in, records_out
+
+
+def main():
+    parser = ArgumentParser(description='Keeps the records of read and index '
+     'fastq files whose reads are all within a length range, reading the '
+     'files in lockstep.')
+    parser.add_argument('-m', '--min_length', type=int, required=True,
+     help='The minimum read length kept')
+    parser.add_argument('-M', '--max_length', type=int, required=True,
+     help='The maximum read length kept')
+    parser.add_argument('-r', '--reads', nargs='+', required=True,
+     help='Read fastq files, filtered by length')
+    parser.add_argument('-x', '--indexes', nargs='*', default=[],
+     help='Index fastq files, kept with their reads')
+    parser.add_argument('-o', '--outputs', nargs='+', required=True,
+     help='Output files of the read files, then of the index files')
+    args = parser.parse_args()
+
+    try:
+        records_in, records_out = filter_fastq_by_length(args.reads,
+         args.indexes, args.outputs, args.min_length, args.max_length)
+    except ValueError, e:
+        stderr.write('Error: %s\n' % e)
+        exit(1)
+
+    print 'Retained %d of %d reads from each file.' % (records_out,
+     records_in)
+
+
+if __name__ == "__main__":
+    main()
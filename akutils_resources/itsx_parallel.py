@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+#
+#  itsx_parallel.py - Run ITSx on batches of a fasta file from a work queue
+#
+#  Version 1.0.0 (October 16, 2026)
+#
+#  Copyright (c) 2026 Andrew Krohn
+#
+#  This software is provided 'as-is', without any express or implied
+#  warranty. In no event will the authors be held liable for any damages
+#  arising from the use of this software.
+#
+#  Permission is granted to anyone to use this software for any purpose,
+#  including commercial applications, and to alter it and redistribute it
+#  freely, subject to the following restrictions:
+#
+#  1. The origin of this software must not be misrepresented; you must not
+#     claim that you wrote the original software. If you use this software
+#     in a product, an acknowledgment in the product documentation would be
+#     appreciated but is not required.
+#  2. Altered source versions must be plainly marked as such, and must not be
+#     misrepresented as being the original software.
+#  3. This notice may not be removed or altered from any source distribution.
+#
+
+## Engine of ITSx_parallel.sh, in place of splitting the input into one part
+## per thread with fasta-splitter.pl.  The input is streamed into batches of
+## a few hundred sequences, each in its own directory under
+## <output_dir>/ITSx_batches, and the batches are handed to a pool of
+## workers one at a time, so a worker that finishes a fast batch takes the
+## next one instead of idling while a slow part finishes.  The ITS1, ITS2
+## and no detections outputs of the batches are then merged in input order.
+##
+## A batch is marked done with the md5 of its sequences once ITSx succeeds.
+## Rerun after an interruption, batches whose sequences are unchanged and
+## marked done are not run again.  The batch directories are removed after
+## the outputs are merged, unless --keep_batches is given.
+
+from argparse import ArgumentParser
+from hashlib import md5
+from multiprocessing import Pool
+from os import listdir, makedirs
+from os.path import basename, exists, isdir, join, splitext
+from shlex import split
+from shutil import rmtree
+from subprocess import call
+from sys import exit, stderr
+
+__author__ = "Andrew Krohn"
+__copyright__ = "Copyright 2026"
+__license__ = "zlib"
+__version__ = "1.0.0"
+
+BATCH_DIR = 'ITSx_batches'
+BATCH_NAME = 'batch'
+DONE_FILE = 'done.md5'
+# Merged output suffix of each ITSx output of a batch
+MERGED_OUTPUTS = [('.ITS1.fasta', '_ITS1only.fasta'),
+                  ('.ITS2.fasta', '_ITS2only.fasta'),
+                  ('_no_detections.txt', '_no_detections.txt')]
+
+
+def read_fasta_records(fasta_f):
+    """ Yields the lines of each record of an open fasta file """
+
+    record = []
+    for line in fasta_f:
+        if line.startswith('>') and record:
+            yield record
+            record = []
+        if line.strip():
+            record.append(line if line.endswith('\n') else line + '\n')
+    if record:
+        yield record
+
+
+def read_batches(fasta_fp, batch_size):
+    """ Yields the text of each batch of batch_size fasta records """
+
+    with open(fasta_fp, 'U') as fasta_f:
+        batch = []
+        for record in read_fasta_records(fasta_f):
+            batch.append(''.join(record))
+            if len(batch) == batch_size:
+                yield ''.join(batch)
+                batch = []
+        if batch:
+            yield ''.join(batch)
+
+
+def get_batch_dir(output_dir, batch_number):
+    return join(output_dir, BATCH_DIR, '%s_%06d' % (BATCH_NAME,
+     batch_number))
+
+
+def is_batch_done(batch_dir, checksum):
+    """ Returns True if ITSx completed on a batch of the same sequences """
+
+    done_fp = join(batch_dir, DONE_FILE)
+    if not exists(done_fp):
+        return False
+    with open(done_fp) as done_f:
+        return done_f.read().strip() == checksum
+
+
+def write_batches(fasta_fp, output_dir, batch_size):
+    """ Writes the batches of fasta_fp that are not done
+
+    Returns (batch numbers, numbers of the batches to run).
+    """
+
+    batch_numbers = []
+    pending = []
+    for batch_number, batch in enumerate(read_batches(fasta_fp,
+     batch_size)):
+        batch_numbers.append(batch_number)
+        batch_dir = get_batch_dir(output_dir, batch_number)
+        checksum = md5(batch).hexdigest()
+        if is_batch_done(batch_dir, checksum):
+            continue
+        # A batch interrupted or of changed sequences is run from scratch
+        if isdir(batch_dir):
+            rmtree(batch_dir)
+        makedirs(batch_dir)
+        with open(join(batch_dir, BATCH_NAME + '.fasta'), 'w') as batch_f:
+            batch_f.write(batch)
+        pending.append(batch_number)
+
+    # Batches beyond the end of a changed input are not merged
+    batches_dir = join(output_dir, BATCH_DIR)
+    for name in listdir(batches_dir):
+        if not name.startswith(BATCH_NAME + '_') or \
+         int(name[len(BATCH_NAME) + 1:]) >= len(batch_numbers):
+            rmtree(join(batches_dir, name))
+
+    return batch_numbers, pending
+
+
+def run_batch(args):
+    """ Runs ITSx in a batch directory, args is (batch dir, ITSx options);
+    returns (batch dir, ITSx exit status)
+    """
+
+    batch_dir, itsx_options = args
+    with open(join(batch_dir, BATCH_NAME + '.log'), 'w') as log_f:
+        status = call(['ITSx', '-i', BATCH_NAME + '.fasta', '-o', BATCH_NAME] +
+         itsx_options, cwd=batch_dir, stdout=log_f, stderr=log_f)
+    if status == 0:
+        with open(join(batch_dir, BATCH_NAME + '.fasta')) as batch_f:
+            checksum = md5(batch_f.read()).hexdigest()
+        with open(join(batch_dir, DONE_FILE), 'w') as done_f:
+            done_f.write(checksum + '\n')
+
+    return batch_dir, status
+
+
+def merge_outputs(output_dir, output_base, batch_numbers):
+    """ Concatenates the ITS1, ITS2 and no detections outputs of the batches
+    in batch order; an output ITSx did not write counts as empty
+    """
+
+    for suffix, merged_suffix in MERGED_OUTPUTS:
+        with open(join(output_dir, output_base + merged_suffix), 'w') as \
+         merged_f:
+            for batch_number in batch_numbers:
+                batch_fp = join(get_batch_dir(output_dir, batch_number),
+                 BATCH_NAME + suffix)
+                if exists(batch_fp):
+                    with open(batch_fp) as batch_f:
+                        for line in batch_f:
+                            merged_f.write(line)
+
+
+def itsx_parallel(fasta_fp,
+                  output_dir,
+                  output_base,
+                  itsx_options,
+                  workers=1,
+                  batch_size=500):
+    """ Runs ITSx on batches of fasta_fp from a work queue and merges them
+
+    fasta_fp: input fasta file
+    output_dir: directory of the batches and merged outputs
+    output_base: prefix of the merged outputs
+    itsx_options: list of ITSx options
+    workers: number of ITSx processes run at once
+    batch_size: number of sequences of a batch
+
+    Returns (number of batches, number of batches run).
+    """
+
+    batch_numbers, pending = write_batches(fasta_fp, output_dir, batch_size)
+    run_args = [(get_batch_dir(output_dir, batch_number), itsx_options) for
+     batch_number in pending]
+    if workers > 1 and len(run_args) > 1:
+        pool = Pool(min(workers, len(run_args)))
+        # chunksize 1: each worker takes the next batch when it is free
+        results = pool.imap_unordered(run_batch, run_args, 1)
+    else:
+        pool = None
+        results = (run_batch(a) for a in run_args)
+
+    failed = [batch_dir for batch_dir, status in results if status != 0]
+
+    if pool:
+        pool.close()
+        pool.join()
+
+    if failed:
+        raise ValueError('ITSx failed on %d batches, rerun to resume (see '
+         '%s)' % (len(failed), join(sorted(failed)[0], BATCH_NAME + '.log')))
+    merge_outputs(output_dir, output_base, batch_numbers)
+
+    return len(batch_numbers), len(pending)
+
+
+def main():
+    parser = ArgumentParser(description='Runs ITSx on small batches of a '
+     'fasta file, handed to a pool of workers as they become free, and '
+     'merges the outputs in input order.  Completed batches are skipped '
+     'when an interrupted run is repeated.')
+    parser.add_argument('-i', '--input_fasta', required=True,
+     help='The input fasta file')
+    parser.add_argument('-o', '--output_dir', required=True,
+     help='The output directory')
+    parser.add_argument('-b', '--output_base', default=None,
+     help='The prefix of the merged outputs (default: the input name '
+     'without its extension)')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+     help='The number of ITSx processes run at once (default: 1)')
+    parser.add_argument('-n', '--batch_size', type=int, default=500,
+     help='The number of sequences of a batch (default: 500)')
+    parser.add_argument('--itsx_options', default='',
+     help='Options passed to ITSx, as one quoted string')
+    parser.add_argument('--keep_batches', action='store_true',
+     help='Keep the batch directories after merging their outputs')
+    args = parser.parse_args()
+
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+    if args.batch_size < 1:
+        parser.error('--batch_size must be at least 1')
+    if not exists(args.input_fasta):
+        parser.error('%s does not exist' % args.input_fasta)
+    output_base = args.output_base or \
+     splitext(basename(args.input_fasta))[0]
+
+    batches_dir = join(args.output_dir, BATCH_DIR)
+    if not isdir(batches_dir):
+        makedirs(batches_dir)
+
+    try:
+        batches, batches_run = itsx_parallel(args.input_fasta,
+         args.output_dir, output_base, split(args.itsx_options),
+         args.workers, args.batch_size)
+    except ValueError, e:
+        stderr.write('Error: %s\n' % e)
+        exit(1)
+
+    if not args.keep_batches:
+        rmtree(batches_dir)
+
+    print 'Ran ITSx on %d of %d batches (%d already completed).' % (
+     batches_run, batches, batches - batches_run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+#
+#  phix_filter.py - Remove reads mapped to PhiX by smalt from reads and indexes
+#
+#  Version 1.0.0 (October 16, 2026)
+#
+#  Copyright (c) 2026 Andrew Krohn
+#
+#  This software is provided 'as-is', without any express or implied
+#  warranty. In no event will the authors be held liable for any damages
+#  arising from the use of this software.
+#
+#  Permission is granted to anyone to use this software for any purpose,
+#  including commercial applications, and to alter it and redistribute it
+#  freely, subject to the following restrictions:
+#
+#  1. The origin of this software must not be misrepresented; you must not
+#     claim that you wrote the original software. If you use this software
+#     in a product, an acknowledgment in the product documentation would be
+#     appreciated but is not required.
+#  2. Altered source versions must be plainly marked as such, and must not be
+#     misrepresented as being the original software.
+#  3. This notice may not be removed or altered from any source distribution.
+#
+
+## Used by PhiX_filtering_workflow.sh.  Reads the SAM output of
+## "smalt map -O", from a file or streamed from smalt's stdout, together with
+## the read and index fastq files.  smalt -O writes its mappings in the order
+## of the reads, so each record tuple is matched with the next SAM line (or
+## pair of lines) and kept only if it did not map to PhiX:
+##
+##   single reads  kept if the flag of their SAM line is 4 (unmapped)
+##   read pairs    kept if the flag of the SAM line of read 1 is 77 (neither
+##                 read mapped)
+##
+## The SAM is never written or read again, and every fastq is read once.
+## Prints the number of reads (or pairs) processed and kept.
+
+from argparse import ArgumentParser
+from itertools import izip
+from sys import exit, stderr, stdin
+
+from fastq_length_filter import (get_record_id, read_record_tuples,
+                                 write_fastq_record)
+
+__author__ = "Andrew Krohn"
+__copyright__ = "Copyright 2026"
+__license__ = "zlib"
+__version__ = "1.0.0"
+
+BUFFER_SIZE = 1 << 20
+UNMAPPED_FLAGS = {'single': '4', 'paired': '77'}
+
+
+def read_sam_flags(sam_f, lines_per_read):
+    """ Yields the (read name, flag) of the first SAM line of each read
+
+    sam_f: open SAM file, header lines are skipped
+    lines_per_read: 1 for single reads, 2 for read pairs
+    """
+
+    alignments = (line for line in sam_f if not line.startswith('@'))
+    for lines in izip(*[alignments] * lines_per_read):
+        fields = lines[0].split('\t', 2)
+        yield get_record_id(fields[0]), fields[1]
+
+
+def filter_phix_reads(sam_f,
+                      mode,
+                      read_fps,
+                      index_fps,
+                      output_fps):
+    """ Writes the record tuples whose reads did not map to PhiX
+
+    sam_f: open SAM output of smalt map -O
+    mode: 'single' or 'paired'
+    read_fps: the read fastq files mapped by smalt
+    index_fps: index fastq files whose records follow those of the reads
+    output_fps: output files of the read files, then of the index files
+
+    Returns (reads or pairs processed, reads or pairs kept).
+    """
+
+    input_fps = list(read_fps) + list(index_fps)
+    if len(output_fps) != len(input_fps):
+        raise ValueError('Give one output file for each read and index file')
+    unmapped_flag = UNMAPPED_FLAGS[mode]
+
+    input_fs = [open(fp, 'U') for fp in input_fps]
+    output_fs = [open(fp, 'w', BUFFER_SIZE) for fp in output_fps]
+    records_in = 0
+    records_out = 0
+    try:
+        sam_flags = read_sam_flags(sam_f, 2 if mode == 'paired' else 1)
+        for records in read_record_tuples(input_fs, input_fps):
+            records_in += 1
+            # SAM read names are the fastq IDs without the "@"
+            record_id = get_record_id(records[0][0][1:])
+            try:
+                sam_id, flag = sam_flags.next()
+            except StopIteration:
+                raise ValueError('The SAM file ends before record %d' %
+                 records_in)
+            if sam_id != record_id:
+                raise ValueError('The SAM file is not in the order of the '
+                 'reads (map with smalt -O) at record %d: %s and %s' %
+                 (records_in, record_id, sam_id))
+            if flag == unmapped_flag:
+                records_out += 1
+                for record, output_f in zip(records, output_fs):
+                    write_fastq_record(output_f, record)
+        for sam_id, flag in sam_flags:
+            raise ValueError('The SAM file has more reads than the fastq '
+             'files (%d)' % records_in)
+    finally:
+        for f in input_fs + output_fs:
+            f.close()
+
+    return records_in, records_out
+
+
+def main():
+    parser = ArgumentParser(description='Removes the reads smalt mapped to '
+     'PhiX from read and index fastq files, reading the smalt SAM output '
+     'and the fastq files in lockstep.')
+    parser.add_argument('-s', '--sam', default='-',
+     help='SAM output of smalt map -O, - for stdin (default: -)')
+    parser.add_argument('-m', '--mode', choices=['single', 'paired'],
+     required=True, help='Whether smalt mapped single reads or read pairs')
+    parser.add_argument('-r', '--reads', nargs='+', required=True,
+     help='The read fastq files mapped by smalt')
+    parser.add_argument('-x', '--indexes', nargs='*', default=[],
+     help='Index fastq files, kept with their reads')
+    parser.add_argument('-o', '--outputs', nargs='+', required=True,
+     help='Output files of the read files, then of the index files')
+    args = parser.parse_args()
+
+    if len(args.reads) != (2 if args.mode == 'paired' else 1):
+        parser.error('Give one read file for single mode, two for paired')
+
+    try:
+        if args.sam == '-':
+            records_in, records_out = filter_phix_reads(stdin, args.mode,
+             args.reads, args.indexes, args.outputs)
+        else:
+            with open(args.sam, 'U') as sam_f:
+                records_in, records_out = filter_phix_reads(sam_f,
+                 args.mode, args.reads, args.indexes, args.outputs)
+    except ValueError, e:
+        stderr.write('Error: %s\n' % e)
+        exit(1)
+
+    print '%d %d' % (records_in, records_out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+#
+#  read_length_histogram.py - Count the read lengths of fastq and fasta files
+#
+#  Version 1.0.0 (October 16, 2026)
+#
+#  Copyright (c) 2026 Andrew Krohn
+#
+#  This software is provided 'as-is', without any express or implied
+#  warranty. In no event will the authors be held liable for any damages
+#  arising from the use of this software.
+#
+#  Permission is granted to anyone to use this software for any purpose,
+#  including commercial applications, and to alter it and redistribute it
+#  freely, subject to the following restrictions:
+#
+#  1. The origin of this software must not be misrepresented; you must not
+#     claim that you wrote the original software. If you use this software
+#     in a product, an acknowledgment in the product documentation would be
+#     appreciated but is not required.
+#  2. Altered source versions must be plainly marked as such, and must not be
+#     misrepresented as being the original software.
+#  3. This notice may not be removed or altered from any source distribution.
+#
+
+## Engine of fastq_length_histogram.sh, fasta_length_histogram.sh and the
+## histograms of strip_primers.sh.  Each file, plain or gzipped, is read once
+## and the reads of each length are counted in a list indexed by length, with
+## the number of reads and bases, in place of sorting a line per read.  Files
+## are counted in parallel.  For each input two files are written:
+##
+##   <output>       "<count> <length>" lines in length order, as
+##                  "sort -V | uniq -c" writes them
+##   <output>.json  reads, bases and the {length: count} histogram
+##
+## The length of a fastq read, or of an unwrapped fasta sequence, is that of
+## the first word of its sequence line, as awk's length($1).  Wrapped fasta
+## sequences are counted whole.
+
+from argparse import ArgumentParser
+from gzip import open as gzip_open
+from itertools import islice
+from multiprocessing import Pool
+import json
+
+__author__ = "Andrew Krohn"
+__copyright__ = "Copyright 2026"
+__license__ = "zlib"
+__version__ = "1.0.0"
+
+FASTQ_EXTENSIONS = ('fastq', 'fq')
+FASTA_EXTENSIONS = ('fasta', 'fa', 'fas', 'fna')
+
+
+def get_file_format(fp):
+    """ Returns 'fastq' or 'fasta' from the extension of a (gzipped) file """
+
+    extensions = fp.split('.')
+    if extensions[-1] == 'gz':
+        extensions.pop()
+    if extensions[-1] in FASTQ_EXTENSIONS:
+        return 'fastq'
+    elif extensions[-1] in FASTA_EXTENSIONS:
+        return 'fasta'
+    raise ValueError('%s is not a fastq (%s) or fasta (%s) file' % (fp,
+     ', '.join(FASTQ_EXTENSIONS), ', '.join(FASTA_EXTENSIONS)))
+
+
+def open_reads(fp):
+    if fp.endswith('.gz'):
+        return gzip_open(fp, 'rb')
+    return open(fp, 'U')
+
+
+def get_sequence_length(line):
+    """ Returns the length of the first word of a sequence line """
+
+    sequence = line.rstrip('\n')
+    if ' ' in sequence or '\t' in sequence:
+        words = [word for word in sequence.replace('\t', ' ').split(' ') if
+         word]
+        return len(words[0]) if words else 0
+    return len(sequence)
+
+
+def get_sequence_lengths(reads_f, file_format):
+    """ Yields the length of each sequence of an open fastq or fasta file """
+
+    if file_format == 'fastq':
+        for line in islice(reads_f, 1, None, 4):
+            yield get_sequence_length(line)
+    else:
+        length = None
+        for line in reads_f:
+            if line.startswith('>'):
+                if length is not None:
+                    yield length
+                length = 0
+            elif length is not None:
+                length += get_sequence_length(line)
+        if length is not None:
+            yield length
+
+
+def count_read_lengths(fp, file_format=None):
+    """ Returns (reads, bases, counts), counts[length] is a number of reads
+
+    fp: fastq or fasta file, gzipped if it ends with .gz
+    file_format: 'fastq' or 'fasta', from the file extension if None
+    """
+
+    if file_format is None:
+        file_format = get_file_format(fp)
+
+    counts = []
+    with open_reads(fp) as reads_f:
+        for length in get_sequence_lengths(reads_f, file_format):
+            if length >= len(counts):
+                counts.extend([0] * (length + 1 - len(counts)))
+            counts[length] += 1
+    reads = sum(counts)
+    bases = sum(length * count for length, count in enumerate(counts))
+
+    return reads, bases, counts
+
+
+def format_histogram(counts, header=False):
+    """ Returns the "<count> <length>" lines of the nonzero counts """
+
+    lines = ['Count Length'] if header else []
+    lines.extend('%7d %d' % (count, length) for length, count in
+     enumerate(counts) if count)
+    return ''.join(line + '\n' for line in lines)
+
+
+def write_histogram(args):
+    """ Counts a file and writes its histograms, args is (input fp, output
+    fp, file format, header); returns (input fp, reads, bases)
+    """
+
+    input_fp, output_fp, file_format, header = args
+    reads, bases, counts = count_read_lengths(input_fp, file_format)
+
+    with open(output_fp, 'w') as output_f:
+        output_f.write(format_histogram(counts, header))
+    with open(output_fp + '.json', 'w') as output_f:
+        json.dump({'input': input_fp, 'reads': reads, 'bases': bases,
+         'lengths': dict((str(length), count) for length, count in
+         enumerate(counts) if count)}, output_f, indent=1, sort_keys=True)
+
+    return input_fp, reads, bases
+
+
+def main():
+    parser = ArgumentParser(description='Writes the read-length histograms '
+     'of fastq and fasta files, plain or gzipped, reading each file once.')
+    parser.add_argument('-i', '--inputs', nargs='+', required=True,
+     help='fastq or fasta files')
+    parser.add_argument('-o', '--outputs', nargs='+', required=True,
+     help='Histogram files, one for each input')
+    parser.add_argument('-f', '--format', choices=['fastq', 'fasta'],
+     default=None, help='The format of the inputs (default: from their '
+     'extensions)')
+    parser.add_argument('--header', action='store_true',
+     help='Begin histograms with a "Count Length" line')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+     help='The number of files counted at once (default: 1)')
+    args = parser.parse_args()
+
+    if len(args.inputs) != len(args.outputs):
+        parser.error('Give one output file for each input')
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+    if args.format is None:
+        try:
+            for input_fp in args.inputs:
+                get_file_format(input_fp)
+        except ValueError, e:
+            parser.error(str(e))
+
+    histogram_args = [(input_fp, output_fp, args.format, args.header) for
+     input_fp, output_fp in zip(args.inputs, args.outputs)]
+    if args.workers > 1 and len(histogram_args) > 1:
+        pool = Pool(min(args.workers, len(histogram_args)))
+        results = pool.imap(write_histogram, histogram_args)
+    else:
+        pool = None
+        results = (write_histogram(a) for a in histogram_args)
+
+    for input_fp, reads, bases in results:
+        print '%s: %d reads, %d bases' % (input_fp, reads, bases)
+
+    if pool:
+        pool.close()
+        pool.join()
+
+
+if __name__ == "__main__":
+    main()
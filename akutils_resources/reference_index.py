@@ -0,0 +1,495 @@
+#!/usr/bin/env python
+#
+#  reference_index.py - Build a k-mer index of a reference fasta file for analyze_primers.py
+#
+#  Version 1.0.0 (October 16, 2026)
+#
+#  Copyright (c) 2026 Andrew Krohn
+#
+#  This software is provided 'as-is', without any express or implied
+#  warranty. In no event will the authors be held liable for any damages
+#  arising from the use of this software.
+#
+#  Permission is granted to anyone to use this software for any purpose,
+#  including commercial applications, and to alter it and redistribute it
+#  freely, subject to the following restrictions:
+#
+#  1. The origin of this software must not be misrepresented; you must not
+#     claim that you wrote the original software. If you use this software
+#     in a product, an acknowledgment in the product documentation would be
+#     appreciated but is not required.
+#  2. Altered source versions must be plainly marked as such, and must not be
+#     misrepresented as being the original software.
+#  3. This notice may not be removed or altered from any source distribution.
+#
+
+## The index of a fasta file is a directory of numpy arrays that are memory
+## mapped when used, so it is built once and shared by every later run:
+##   labels.txt              record labels, one per line
+##   record_offsets.npy      start of each record in the concatenated sequences
+##   packed_seqs.npy         concatenated sequences, 2 bits per base
+##   exception_positions.npy positions of characters other than A, C, G, T
+##   exception_chars.npy     the characters at those positions
+##   kmers.npy               sorted codes of every A/C/G/T k-mer
+##   kmer_records.npy        record of each k-mer
+##   kmer_offsets.npy        position of each k-mer in its record
+##   index_info.txt          k-mer length and sha1 of the fasta file, written
+##                           last so that an incomplete index is never used
+
+from argparse import ArgumentParser
+from hashlib import sha1
+from os import makedirs, remove
+from os.path import basename, exists, isdir, join
+from numpy import array, arange, zeros, empty, concatenate, cumsum,\
+ searchsorted, bincount, load, save, frombuffer, uint8, uint32, int64
+from numpy.lib.format import open_memmap
+
+from cogent.parse.fasta import MinimalFastaParser
+
+__author__ = "Andrew Krohn"
+__copyright__ = "Copyright 2026"
+__license__ = "zlib"
+__version__ = "1.0.0"
+
+# Bases are coded 0-3 in this order, in k-mers and packed sequences
+BASES = 'ACGT'
+# Largest k-mer length whose codes fit in a uint32
+MAX_KMER_LEN = 16
+# K-mers are counted by their leading bits in up to 2**BUCKET_BITS buckets
+# while the index is built
+BUCKET_BITS = 20
+INFO_FILE = 'index_info.txt'
+
+
+def get_fasta_hash(fasta_filepath,
+                   chunk_size=2**20):
+    """ Returns the sha1 hex digest of the contents of a fasta file
+
+    fasta_filepath: path of the fasta file
+    chunk_size: number of bytes read at a time
+    """
+
+    digest = sha1()
+    fasta_f = open(fasta_filepath, 'rb')
+    chunk = fasta_f.read(chunk_size)
+    while chunk:
+        digest.update(chunk)
+        chunk = fasta_f.read(chunk_size)
+    fasta_f.close()
+
+    return digest.hexdigest()
+
+
+def get_base_codes():
+    """ Returns an array of the code of each byte value, 255 if not a base """
+
+    base_codes = zeros(256, uint8) + 255
+    for code, base in enumerate(BASES):
+        base_codes[ord(base)] = code
+
+    return base_codes
+
+
+def iter_record_batches(fasta_filepath,
+                        batch_bases):
+    """ Yields lists of (label, seq) records of about batch_bases bases """
+
+    batch = []
+    batch_len = 0
+    fasta_f = open(fasta_filepath, 'U')
+    for label, seq in MinimalFastaParser(fasta_f):
+        batch.append((label, seq))
+        batch_len += len(seq)
+        if batch_len >= batch_bases:
+            yield batch
+            batch = []
+            batch_len = 0
+    fasta_f.close()
+    if batch:
+        yield batch
+
+
+def get_batch_kmers(codes,
+                    is_base,
+                    seq_lens,
+                    kmer_len):
+    """ Returns (k-mers, starts, records) of the k-mers of a batch of records
+
+    Only k-mers made of bases and within a single record are returned, with
+    their start in the concatenated batch and the number of their record in
+    the batch, in position order.
+
+    codes: base codes of the concatenated sequences of the batch
+    is_base: boolean array, False where the character is not a base
+    seq_lens: lengths of the sequences of the batch
+    kmer_len: length of the k-mers
+    """
+
+    batch_offsets = zeros(len(seq_lens) + 1, int64)
+    batch_offsets[1:] = cumsum(seq_lens)
+    kmers_len = max(len(codes) - kmer_len + 1, 0)
+    kmers = zeros(kmers_len, uint32)
+    for n in range(kmer_len):
+        kmers <<= 2
+        kmers |= codes[n:n+kmers_len]
+    non_bases = zeros(len(codes) + 1, int64)
+    non_bases[1:] = cumsum(~is_base)
+    starts = arange(kmers_len)
+    kmer_records = searchsorted(batch_offsets, starts, 'right') - 1
+    keep = (non_bases[starts + kmer_len] == non_bases[starts]) &\
+     (starts + kmer_len <= batch_offsets[kmer_records + 1])
+
+    return kmers[keep], starts[keep], kmer_records[keep]
+
+
+def get_batch_codes(seqs):
+    """ Returns (codes, is_base, characters) of the concatenated seqs
+
+    Characters other than A, C, G and T are coded as A.
+    """
+
+    seq_chars = frombuffer(''.join(seqs), uint8)
+    codes = get_base_codes()[seq_chars]
+    is_base = codes != 255
+    codes[~is_base] = 0
+
+    return codes, is_base, seq_chars
+
+
+def create_array(filepath,
+                 length,
+                 dtype):
+    """ Returns a writable array saved in a .npy file, memory mapped unless
+    empty
+    """
+
+    if not length:
+        save(filepath, zeros(0, dtype))
+        return zeros(0, dtype)
+    return open_memmap(filepath, 'w+', dtype, (length,))
+
+
+def build_reference_index(fasta_filepath,
+                          index_dir,
+                          kmer_len=8,
+                          batch_bases=2**22):
+    """ Builds the k-mer index of a fasta file in index_dir
+
+    Records are stored exactly as MinimalFastaParser returns them.  Only k-mers
+    made of uppercase A, C, G and T are indexed.
+
+    The fasta file is read twice, in batches of records, so memory use
+    depends on batch_bases and not on the size of the file.  The first pass
+    counts the arrays' lengths and the k-mers of each bucket (their leading
+    bits), the second writes every array directly to its memory mapped file,
+    the k-mer hits in bucket order.  Each bucket is then sorted by k-mer, so
+    the hits of a k-mer stay in sequence order.
+
+    fasta_filepath: path of the fasta file to index
+    index_dir: directory the index files are written to
+    kmer_len: length of the indexed k-mers
+    batch_bases: approximate number of bases read at a time
+    """
+
+    if not 0 < kmer_len <= MAX_KMER_LEN:
+        raise ValueError("k-mer length must be between 1 and %d" %
+         MAX_KMER_LEN)
+
+    if not isdir(index_dir):
+        makedirs(index_dir)
+    # An index being rebuilt must not look complete if the build fails
+    if exists(join(index_dir, INFO_FILE)):
+        remove(join(index_dir, INFO_FILE))
+
+    fasta_hash = get_fasta_hash(fasta_filepath)
+    bucket_shift = max(2 * kmer_len - BUCKET_BITS, 0)
+    buckets_len = 1 << (2 * kmer_len - bucket_shift)
+
+    # First pass: labels, lengths and k-mer counts of each bucket
+    records = 0
+    total_len = 0
+    exceptions = 0
+    bucket_counts = zeros(buckets_len, int64)
+    labels_f = open(join(index_dir, 'labels.txt'), 'w')
+    for batch in iter_record_batches(fasta_filepath, batch_bases):
+        labels_f.write(''.join([label + '\n' for label, seq in batch]))
+        seqs = [seq for label, seq in batch]
+        codes, is_base, seq_chars = get_batch_codes(seqs)
+        kmers = get_batch_kmers(codes, is_base, map(len, seqs), kmer_len)[0]
+        bucket_counts += bincount(kmers >> bucket_shift,
+         minlength=buckets_len)
+        records += len(batch)
+        total_len += len(codes)
+        exceptions += len(codes) - int(is_base.sum())
+    labels_f.close()
+
+    # Positions are uint32 unless the sequences are too long for it
+    position_dtype = uint32 if total_len < 2**32 else int64
+    record_offsets = create_array(join(index_dir, 'record_offsets.npy'),
+     records + 1, position_dtype)
+    packed_seqs = create_array(join(index_dir, 'packed_seqs.npy'),
+     -(-total_len // 4), uint8)
+    exception_positions = create_array(join(index_dir,
+     'exception_positions.npy'), exceptions, position_dtype)
+    exception_chars = create_array(join(index_dir, 'exception_chars.npy'),
+     exceptions, uint8)
+    kmers_total = int(bucket_counts.sum())
+    sorted_kmers = create_array(join(index_dir, 'kmers.npy'), kmers_total,
+     uint32)
+    sorted_records = create_array(join(index_dir, 'kmer_records.npy'),
+     kmers_total, uint32)
+    sorted_offsets = create_array(join(index_dir, 'kmer_offsets.npy'),
+     kmers_total, uint32)
+    bucket_ends = cumsum(bucket_counts)
+    bucket_cursors = bucket_ends - bucket_counts
+
+    # Second pass: write the arrays, the k-mers of each bucket in sequence
+    # order
+    record_start = 0
+    seq_start = 0
+    exception_start = 0
+    # Codes left over from packing the previous batch 4 bases to a byte
+    carried_codes = zeros(0, uint8)
+    for batch in iter_record_batches(fasta_filepath, batch_bases):
+        seqs = [seq for label, seq in batch]
+        seq_lens = map(len, seqs)
+        codes, is_base, seq_chars = get_batch_codes(seqs)
+
+        record_offsets[record_start + 1:record_start + len(batch) + 1] =\
+         seq_start + cumsum(seq_lens)
+
+        batch_exceptions = (~is_base).nonzero()[0]
+        exception_stop = exception_start + len(batch_exceptions)
+        exception_positions[exception_start:exception_stop] =\
+         seq_start + batch_exceptions
+        exception_chars[exception_start:exception_stop] =\
+         seq_chars[batch_exceptions]
+        exception_start = exception_stop
+
+        pack_codes = concatenate([carried_codes, codes])
+        packed_len = len(pack_codes) // 4
+        quads = pack_codes[:packed_len * 4].reshape(-1, 4)
+        packed_start = (seq_start - len(carried_codes)) // 4
+        packed_seqs[packed_start:packed_start + packed_len] =\
+         (quads[:, 0] << 6) | (quads[:, 1] << 4) | (quads[:, 2] << 2) |\
+         quads[:, 3]
+        carried_codes = pack_codes[packed_len * 4:]
+
+        kmers, starts, kmer_records = get_batch_kmers(codes, is_base,
+         seq_lens, kmer_len)
+        kmer_offsets = starts - (cumsum([0] + seq_lens)[kmer_records])
+        buckets = kmers >> bucket_shift
+        order = buckets.argsort(kind='mergesort')
+        buckets = buckets[order]
+        batch_counts = bincount(buckets, minlength=buckets_len)
+        ranks = arange(len(buckets)) - (cumsum(batch_counts) -
+         batch_counts)[buckets]
+        destinations = bucket_cursors[buckets] + ranks
+        sorted_kmers[destinations] = kmers[order]
+        sorted_records[destinations] = record_start + kmer_records[order]
+        sorted_offsets[destinations] = kmer_offsets[order]
+        bucket_cursors += batch_counts
+
+        record_start += len(batch)
+        seq_start += len(codes)
+
+    if len(carried_codes):
+        last_quad = zeros(4, uint8)
+        last_quad[:len(carried_codes)] = carried_codes
+        packed_seqs[-1] = (last_quad[0] << 6) | (last_quad[1] << 4) |\
+         (last_quad[2] << 2) | last_quad[3]
+
+    # Sort the k-mers within their buckets, in blocks of whole buckets.
+    # The sort is stable, so the hits of a k-mer stay in sequence order.
+    if bucket_shift:
+        block_start = 0
+        while block_start < kmers_total:
+            # The last bucket ending within batch_bases k-mers, or the
+            # next bucket if it is larger
+            block_stop = max(bucket_ends[searchsorted(bucket_ends,
+             block_start + batch_bases, 'right') - 1],
+             bucket_ends[searchsorted(bucket_ends, block_start, 'right')])
+            block = slice(block_start, block_stop)
+            order = array(sorted_kmers[block]).argsort(kind='mergesort')
+            for sorted_array in (sorted_kmers, sorted_records,
+             sorted_offsets):
+                sorted_array[block] = array(sorted_array[block])[order]
+            block_start = block_stop
+
+    for created_array in (record_offsets, packed_seqs, exception_positions,
+     exception_chars, sorted_kmers, sorted_records, sorted_offsets):
+        if hasattr(created_array, 'flush'):
+            created_array.flush()
+    del record_offsets, packed_seqs, exception_positions, exception_chars,\
+     sorted_kmers, sorted_records, sorted_offsets
+
+    info_f = open(join(index_dir, INFO_FILE), 'w')
+    info_f.write('fasta_file\t%s\nfasta_sha1\t%s\nkmer_len\t%d\nrecords\t%d\n' %
+     (basename(fasta_filepath), fasta_hash, kmer_len, records))
+    info_f.close()
+
+
+def read_index_info(index_dir):
+    """ Returns the index_info.txt values of an index as a dict, or None """
+
+    info_filepath = join(index_dir, INFO_FILE)
+    if not exists(info_filepath):
+        return None
+
+    info = {}
+    for line in open(info_filepath, 'U'):
+        key, value = line.rstrip('\n').split('\t')
+        info[key] = value
+
+    return info
+
+
+class ReferenceIndex(object):
+    """ Memory mapped k-mer index of a fasta file """
+
+    def __init__(self, index_dir):
+        """ Opens the index in index_dir, see build_reference_index """
+
+        info = read_index_info(index_dir)
+        if info is None:
+            raise ValueError("No complete reference index in %s" % index_dir)
+        self.IndexDir = index_dir
+        self.FastaHash = info['fasta_sha1']
+        self.KmerLen = int(info['kmer_len'])
+
+        self.Labels = [line.rstrip('\n') for line in
+         open(join(index_dir, 'labels.txt'), 'U')]
+        self.RecordOffsets = load(join(index_dir, 'record_offsets.npy'))
+        self.ExceptionPositions = load(join(index_dir,
+         'exception_positions.npy'))
+        self.ExceptionChars = load(join(index_dir, 'exception_chars.npy'))
+        # The large arrays are paged in as they are used
+        self.PackedSeqs = load(join(index_dir, 'packed_seqs.npy'),
+         mmap_mode='r')
+        self.Kmers = load(join(index_dir, 'kmers.npy'), mmap_mode='r')
+        self.KmerRecords = load(join(index_dir, 'kmer_records.npy'),
+         mmap_mode='r')
+        self.KmerOffsets = load(join(index_dir, 'kmer_offsets.npy'),
+         mmap_mode='r')
+
+    def __len__(self):
+        return len(self.Labels)
+
+    def getSeqs(self, start, stop):
+        """ Returns the sequences of records start to stop (excluded) """
+
+        # Offsets may be uint32, which must not be negated
+        seq_start = int(self.RecordOffsets[start])
+        seq_stop = int(self.RecordOffsets[stop])
+        packed_start = seq_start // 4
+        packed = array(self.PackedSeqs[packed_start:-(-seq_stop // 4)])
+        codes = empty([len(packed), 4], uint8)
+        for n, shift in enumerate([6, 4, 2, 0]):
+            codes[:, n] = (packed >> shift) & 3
+        codes = codes.ravel()[seq_start - packed_start*4:
+         seq_stop - packed_start*4]
+        seq_chars = frombuffer(BASES, uint8)[codes]
+
+        exceptions = slice(*searchsorted(self.ExceptionPositions,
+         [seq_start, seq_stop]))
+        seq_chars[self.ExceptionPositions[exceptions] - seq_start] =\
+         self.ExceptionChars[exceptions]
+
+        seqs = seq_chars.tostring()
+        offsets = self.RecordOffsets[start:stop+1] - seq_start
+        return [seqs[offsets[n]:offsets[n+1]] for n in range(stop - start)]
+
+    def iterBatches(self, batch_size=512):
+        """ Yields lists of (label, seq) tuples of the records, in order """
+
+        for start in range(0, len(self), batch_size):
+            stop = min(start + batch_size, len(self))
+            yield zip(self.Labels[start:stop], self.getSeqs(start, stop))
+
+    def findKmers(self, kmers, start=0, stop=None):
+        """ Returns the records and offsets of the hits of a list of k-mers
+
+        kmers: array of k-mer codes (see get_kmer_codes)
+        start, stop: only hits in records start to stop (excluded) are
+         returned, all records by default
+        """
+
+        if stop is None:
+            stop = len(self)
+
+        # The hits of each k-mer are sorted by record
+        kmer_starts = searchsorted(self.Kmers, kmers, 'left')
+        kmer_stops = searchsorted(self.Kmers, kmers, 'right')
+        hits = []
+        for kmer_start, kmer_stop in zip(kmer_starts, kmer_stops):
+            if kmer_stop == kmer_start:
+                continue
+            hits_start, hits_stop = kmer_start + searchsorted(\
+             self.KmerRecords[kmer_start:kmer_stop], [start, stop])
+            if hits_stop > hits_start:
+                hits.append(arange(hits_start, hits_stop))
+        if not hits:
+            return zeros(0, uint32), zeros(0, uint32)
+        hits = concatenate(hits)
+
+        return array(self.KmerRecords[hits]), array(self.KmerOffsets[hits])
+
+
+def get_kmer_codes(kmers):
+    """ Returns an array of the codes of a list of A/C/G/T k-mer strings """
+
+    codes = zeros(len(kmers), uint32)
+    base_codes = get_base_codes()
+    for kmer_index, kmer in enumerate(kmers):
+        code = 0
+        for base in kmer:
+            code = (code << 2) | int(base_codes[ord(base)])
+        codes[kmer_index] = code
+
+    return codes
+
+
+def get_reference_index(fasta_filepath,
+                        index_dir,
+                        kmer_len=8,
+                        verbose=False):
+    """ Returns the ReferenceIndex of a fasta file, building it if needed
+
+    The index is rebuilt if it is missing, was built from a different fasta
+    file content (compared by sha1), or with another k-mer length.
+
+    fasta_filepath: path of the indexed fasta file
+    index_dir: directory of the index
+    kmer_len: length of the indexed k-mers
+    verbose: print when an index is (re)built
+    """
+
+    info = read_index_info(index_dir)
+    if info is None or int(info['kmer_len']) != kmer_len or\
+     info['fasta_sha1'] != get_fasta_hash(fasta_filepath):
+        if verbose:
+            print "Building k-mer index of %s in %s" % (fasta_filepath,
+             index_dir)
+        build_reference_index(fasta_filepath, index_dir, kmer_len)
+
+    return ReferenceIndex(index_dir)
+
+
+def main():
+    parser = ArgumentParser(description='Builds the k-mer index of a '
+     'reference fasta file used by analyze_primers.py --index_dir.  The '
+     'index is rebuilt only if the fasta file has changed.')
+    parser.add_argument('-i', '--input_fasta', required=True,
+     help='The reference fasta file to index')
+    parser.add_argument('-o', '--index_dir', required=True,
+     help='The directory the index is written to')
+    parser.add_argument('-k', '--kmer_len', type=int, default=8,
+     help='The length of the indexed k-mers (default: 8)')
+    args = parser.parse_args()
+
+    get_reference_index(args.input_fasta, args.index_dir, args.kmer_len,
+     verbose=True)
+
+
+if __name__ == "__main__":
+    main()
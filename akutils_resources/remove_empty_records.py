@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+#
+#  remove_empty_records.py - Remove reads left empty by trimming, with their mates
+#
+#  Version 1.0.0 (October 16, 2026)
+#
+#  Copyright (c) 2026 Andrew Krohn
+#
+#  This software is provided 'as-is', without any express or implied
+#  warranty. In no event will the authors be held liable for any damages
+#  arising from the use of this software.
+#
+#  Permission is granted to anyone to use this software for any purpose,
+#  including commercial applications, and to alter it and redistribute it
+#  freely, subject to the following restrictions:
+#
+#  1. The origin of this software must not be misrepresented; you must not
+#     claim that you wrote the original software. If you use this software
+#     in a product, an acknowledgment in the product documentation would be
+#     appreciated but is not required.
+#  2. Altered source versions must be plainly marked as such, and must not be
+#     misrepresented as being the original software.
+#  3. This notice may not be removed or altered from any source distribution.
+#
+
+## Used by strip_primers.sh after fastq-mcf.  The trimmed read files (-r) and
+## the index files (-x) are read in lockstep, as by fastq_length_filter.py,
+## and a record is written to every output unless one of its reads has an
+## empty sequence.  The headers (without "@") of the first read of the
+## removed records are written to the report file, if any are removed.
+
+from argparse import ArgumentParser
+from sys import exit, stderr
+
+from fastq_length_filter import read_record_tuples, write_fastq_record
+
+__author__ = "Andrew Krohn"
+__copyright__ = "Copyright 2026"
+__license__ = "zlib"
+__version__ = "1.0.0"
+
+BUFFER_SIZE = 1 << 20
+
+
+def remove_empty_records(read_fps,
+                         index_fps,
+                         output_fps,
+                         report_fp):
+    """ Writes the record tuples none of whose reads are empty
+
+    read_fps: trimmed fastq files whose records are removed if empty
+    index_fps: fastq files whose records follow those of the reads
+    output_fps: output files of the read files, then of the index files
+    report_fp: file listing the headers of the removed records
+
+    Returns (records read, records removed).
+    """
+
+    input_fps = list(read_fps) + list(index_fps)
+    if len(output_fps) != len(input_fps):
+        raise ValueError('Give one output file for each read and index file')
+
+    input_fs = [open(fp, 'U') for fp in input_fps]
+    output_fs = [open(fp, 'w', BUFFER_SIZE) for fp in output_fps]
+    read_count = len(read_fps)
+    records_in = 0
+    empty_headers = []
+    try:
+        for records in read_record_tuples(input_fs, input_fps):
+            records_in += 1
+            for record in records[:read_count]:
+                if not record[1].strip():
+                    empty_headers.append(records[0][0][1:].rstrip('\n'))
+                    break
+            else:
+                for record, output_f in zip(records, output_fs):
+                    write_fastq_record(output_f, record)
+    finally:
+        for f in input_fs + output_fs:
+            f.close()
+
+    if empty_headers:
+        with open(report_fp, 'w') as report_f:
+            report_f.write(''.join(header + '\n' for header in
+             empty_headers))
+
+    return records_in, len(empty_headers)
+
+
+def main():
+    parser = ArgumentParser(description='Removes the records of trimmed read '
+     'fastq files, and of their index files, where a read is empty, reading '
+     'the files in lockstep.')
+    parser.add_argument('-r', '--reads', nargs='+', required=True,
+     help='Trimmed read fastq files')
+    parser.add_argument('-x', '--indexes', nargs='*', default=[],
+     help='Index fastq files, kept with their reads')
+    parser.add_argument('-o', '--outputs', nargs='+', required=True,
+     help='Output files of the read files, then of the index files')
+    parser.add_argument('-e', '--report', required=True,
+     help='File listing the headers of the removed records, written if '
+     'any are removed')
+    args = parser.parse_args()
+
+    try:
+        records_in, records_removed = remove_empty_records(args.reads,
+         args.indexes, args.outputs, args.report)
+    except ValueError, e:
+        stderr.write('Error: %s\n' % e)
+        exit(1)
+
+    print 'Found %d empty fastq records.' % records_removed
+
+
+if __name__ == "__main__":
+    main()
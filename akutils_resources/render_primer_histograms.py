@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+#
+#  render_primer_histograms.py - Draw analyze_primers.py graphs from saved histogram data
+#
+#  Version 1.0.0 (October 16, 2026)
+#
+#  Copyright (c) 2026 Andrew Krohn
+#
+#  This software is provided 'as-is', without any express or implied
+#  warranty. In no event will the authors be held liable for any damages
+#  arising from the use of this software.
+#
+#  Permission is granted to anyone to use this software for any purpose,
+#  including commercial applications, and to alter it and redistribute it
+#  freely, subject to the following restrictions:
+#
+#  1. The origin of this software must not be misrepresented; you must not
+#     claim that you wrote the original software. If you use this software
+#     in a product, an acknowledgment in the product documentation would be
+#     appreciated but is not required.
+#  2. Altered source versions must be plainly marked as such, and must not be
+#     misrepresented as being the original software.
+#  3. This notice may not be removed or altered from any source distribution.
+#
+
+## analyze_primers.py --no_graphs saves the histogram data of each primer and
+## fasta file as <primer>_<fasta>_hist.npz in place of the <primer>_<fasta>.ps
+## graph.  This draws the graphs of any of these files, in parallel, as
+## analyze_primers.py would have drawn them.
+
+from argparse import ArgumentParser
+from glob import glob
+from multiprocessing import Pool
+from os import makedirs
+from os.path import basename, isdir, join
+
+from analyze_primers import read_histogram_data, write_primer_histogram
+
+__author__ = "Andrew Krohn"
+__copyright__ = "Copyright 2026"
+__license__ = "zlib"
+__version__ = "1.0.0"
+
+HIST_DATA_SUFFIX = '_hist.npz'
+
+
+def get_hist_data_filepaths(inputs):
+    """ Returns the histogram data files given, or found in given directories
+
+    inputs: list of _hist.npz files and directories
+    """
+
+    hist_data_filepaths = []
+    for input_path in inputs:
+        if isdir(input_path):
+            hist_data_filepaths.extend(sorted(glob(join(input_path,
+             '*' + HIST_DATA_SUFFIX))))
+        elif input_path.endswith(HIST_DATA_SUFFIX):
+            hist_data_filepaths.append(input_path)
+        else:
+            raise ValueError('Not a histogram data file (%s): %s' %
+             (HIST_DATA_SUFFIX, input_path))
+
+    return hist_data_filepaths
+
+
+def get_graph_filepath(hist_data_filepath,
+                       output_dir=None):
+    """ Returns the .ps graph filepath of a histogram data file
+
+    hist_data_filepath: _hist.npz file written by analyze_primers.py
+    output_dir: directory of the graph, the directory of the histogram data
+     file if None
+    """
+
+    graph_filepath = hist_data_filepath[:-len(HIST_DATA_SUFFIX)] + '.ps'
+    if output_dir is None:
+        return graph_filepath
+    return join(output_dir, basename(graph_filepath))
+
+
+def render_histogram(args):
+    """ Draws the graph of a histogram data file, args is (data fp, graph fp)
+    """
+
+    hist_data_filepath, graph_filepath = args
+    write_primer_histogram(read_histogram_data(hist_data_filepath),
+     graph_filepath)
+
+    return graph_filepath
+
+
+def render_primer_histograms(hist_data_filepaths,
+                             output_dir=None,
+                             workers=1,
+                             verbose=False):
+    """ Draws the graphs of histogram data files in worker processes
+
+    hist_data_filepaths: list of _hist.npz files written by analyze_primers.py
+    output_dir: directory of the graphs, by default next to the data files
+    workers: number of processes drawing graphs
+    verbose: print each graph written
+    """
+
+    render_args = [(hist_data_filepath, get_graph_filepath(hist_data_filepath,
+     output_dir)) for hist_data_filepath in hist_data_filepaths]
+
+    if workers > 1 and len(render_args) > 1:
+        pool = Pool(min(workers, len(render_args)))
+        graph_filepaths = pool.imap_unordered(render_histogram, render_args)
+    else:
+        pool = None
+        graph_filepaths = map(render_histogram, render_args)
+
+    for graph_filepath in graph_filepaths:
+        if verbose:
+            print "Wrote %s" % graph_filepath
+
+    if pool:
+        pool.close()
+        pool.join()
+
+
+def main():
+    parser = ArgumentParser(description='Draws the analyze_primers.py graphs '
+     'of histogram data saved with analyze_primers.py --no_graphs.')
+    parser.add_argument('-i', '--input', required=True, nargs='+',
+     help='_hist.npz files, or directories whose _hist.npz files are all '
+     'drawn')
+    parser.add_argument('-o', '--output_dir', default=None,
+     help='The directory the graphs are written to (default: next to the '
+     'histogram data files)')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+     help='The number of processes drawing graphs (default: 1)')
+    parser.add_argument('-v', '--verbose', action='store_true',
+     help='Print each graph written')
+    args = parser.parse_args()
+
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+
+    try:
+        hist_data_filepaths = get_hist_data_filepaths(args.input)
+    except ValueError, e:
+        parser.error(str(e))
+
+    if args.output_dir and not isdir(args.output_dir):
+        makedirs(args.output_dir)
+
+    render_primer_histograms(hist_data_filepaths, args.output_dir,
+     args.workers, args.verbose)
+
+
+if __name__ == "__main__":
+    main()
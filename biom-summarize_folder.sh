@@ -36,11 +36,11 @@ set -e
 
 # if more or less than one arguments supplied, display usage 
 
-	if [  "$#" -ne 1 ] ;
+	if [  "$#" -ne 1 ] && [  "$#" -ne 2 ] ;
 	then 
 		echo "
 Usage:
-biom-summarize_folder.sh <folder path>
+biom-summarize_folder.sh <folder path> <cores (optional, default 1)>
 
 biom-summarize_folder.sh --help for more details.
 		"
@@ -72,19 +72,29 @@ correct directory to the command.
 		$sumdir
 		"
 
-#Summarize biom files loop
+#Collect tables without current summaries, then summarize them in parallel
+#Tables rewritten with unchanged contents are skipped by their cached md5,
+#and their summaries touched, so only the summaries written are reported
 
+		if [[ -z "$2" ]]; then
+			cores=1
+		else
+			cores=($2)
+		fi
+		tosummarize=()
 		for biomfile in $sumdir/*.biom; do
    		biombase=$(basename $biomfile .biom)
 
-#check if summary already exists
-			if [[ -f $1/$biombase.summary ]]; then
+#check if summary already exists and is newer than the table
+			if [[ $sumdir/$biombase.summary -nt $biomfile ]]; then
 				echo "Skipping $biombase.biom as this table has already been summarized."
 			else
-   				echo "Summarizing $biombase.biom"
-				`biom summarize-table -i $sumdir/$biombase.biom -o $sumdir/$biombase.summary`
+				tosummarize+=($biomfile)
 			fi		
 		done
+		if [[ ${#tosummarize[@]} -gt 0 ]]; then
+			biom_toolkit.py -i ${tosummarize[@]} -p summarize -u --cache_fp $sumdir/.biom_summary_cache -w $cores -v
+		fi
 		echo "
 		Done
 		"
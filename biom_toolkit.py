@@ -0,0 +1,429 @@
+#!/usr/bin/env python
+#
+#  biom_toolkit.py - Run a chain of operations on biom tables loaded once
+#
+#  Version 1.0.0 (October 16, 2026)
+#
+#  Copyright (c) 2026 Andrew Krohn
+#
+#  This software is provided 'as-is', without any express or implied
+#  warranty. In no event will the authors be held liable for any damages
+#  arising from the use of this software.
+#
+#  Permission is granted to anyone to use this software for any purpose,
+#  including commercial applications, and to alter it and redistribute it
+#  freely, subject to the following restrictions:
+#
+#  1. The origin of this software must not be misrepresented; you must not
+#     claim that you wrote the original software. If you use this software
+#     in a product, an acknowledgment in the product documentation would be
+#     appreciated but is not required.
+#  2. Altered source versions must be plainly marked as such, and must not be
+#     misrepresented as being the original software.
+#  3. This notice may not be removed or altered from any source distribution.
+#
+
+## Loads each input table once and runs a pipeline of operations on it in
+## memory, in place of a chain of biomtotxt.sh, txttobiom.sh,
+## biom-summarize_folder.sh, sort_otu_table.py, relativize_otu_table.py and
+## filter_observations_by_sample.py runs that each import biom and parse the
+## table again.  Operations run in the order given:
+##
+##   filter:RULE[,RULE...]  filter observations, with the rules of
+##                          filter_observations_by_sample.py --sweep
+##                          (n, f, mc, mf) and s, the minimum number of
+##                          samples an observation must be in
+##   relativize             divide the values of each sample by its total
+##   sort                   sort the samples by their IDs, in natural order,
+##                          as sort_otu_table.py does
+##   summarize[:NAME]       write a biom summarize-table summary
+##                          (default NAME: {name}.summary)
+##   tsv[:NAME]             write a tab-delimited table, as biomtotxt.sh does
+##                          (default NAME: {name}.txt)
+##   hdf5[:NAME]            write an HDF5 biom table (default: {name}.biom)
+##   json[:NAME]            write a json biom table (default: {name}.json)
+##
+## In output names, {name} is the input table name without its extension.
+## Outputs are written next to their input table unless -o is given.
+## Tab-delimited (.txt) input tables are read as txttobiom.sh reads them, with
+## their taxonomy split into levels.
+##
+## With -u, a table is skipped when all of its outputs are newer than it, or
+## when the md5 of its contents and the pipeline match those recorded in the
+## --cache_fp file when its outputs were last written, so that only changed
+## tables of a large result tree are run again.
+
+from argparse import ArgumentParser
+from hashlib import md5
+from multiprocessing import Pool
+from os import makedirs, utime, walk
+from os.path import (abspath, basename, dirname, exists, getmtime, isdir,
+                     join, splitext)
+import json
+import locale
+import re
+
+from numpy import bincount, median, std
+from biom import load_table
+from biom.util import biom_open
+
+from filter_observations_by_sample import (parse_sweep_variant,
+                                           sweep_filter_table)
+from relativize_otu_table import relativize_table
+
+__author__ = "Andrew Krohn"
+__copyright__ = "Copyright 2026"
+__license__ = "zlib"
+__version__ = "1.0.0"
+
+TABLE_OPERATIONS = ('filter', 'relativize', 'sort')
+OUTPUT_OPERATIONS = {'summarize': '{name}.summary',
+                     'tsv': '{name}.txt',
+                     'hdf5': '{name}.biom',
+                     'json': '{name}.json'}
+TABLE_EXTENSIONS = ('.biom', '.txt')
+
+
+def parse_operation(operation):
+    """ Returns (operation name, argument) of a pipeline operation
+
+    The argument is a (rules, min samples) pair for filter, the output name
+    for output operations and None for the others.
+    """
+
+    name, _, argument = operation.partition(':')
+    if name == 'filter':
+        if not argument:
+            raise ValueError('filter needs rules, as filter:RULE[,RULE...]: '
+             '%s' % operation)
+        rules = argument.split(',')
+        min_samples = 0
+        for rule in [rule for rule in rules if rule.startswith('s=')]:
+            try:
+                min_samples = int(rule[2:])
+            except ValueError:
+                raise ValueError('Filter rule s must be an integer: %s' %
+                 operation)
+            rules.remove(rule)
+        if rules:
+            rules = parse_sweep_variant('filter:' + ','.join(rules))[1]
+        else:
+            rules = {}
+        return name, (rules, min_samples)
+    elif name in OUTPUT_OPERATIONS:
+        return name, argument or OUTPUT_OPERATIONS[name]
+    elif name in TABLE_OPERATIONS:
+        if argument:
+            raise ValueError('%s takes no argument: %s' % (name, operation))
+        return name, None
+    raise ValueError('Unknown operation %s (operations are %s): %s' % (name,
+     ', '.join(TABLE_OPERATIONS + tuple(sorted(OUTPUT_OPERATIONS))),
+     operation))
+
+
+def find_tables(input_dirs):
+    """ Returns the biom and tab-delimited tables under input_dirs """
+
+    tables = []
+    for input_dir in input_dirs:
+        for dirpath, dirnames, filenames in walk(input_dir):
+            dirnames.sort()
+            tables.extend(join(dirpath, filename) for filename in
+             sorted(filenames) if splitext(filename)[1] in TABLE_EXTENSIONS)
+    return tables
+
+
+def read_table(table_fp):
+    """ Loads a table, splitting the taxonomy of tab-delimited tables """
+
+    table = load_table(table_fp)
+    observation_metadata = table.metadata(axis='observation')
+    if table_fp.endswith('.txt') and observation_metadata is not None and \
+     'taxonomy' in observation_metadata[0]:
+        table.add_metadata(dict((observation_id, {'taxonomy':
+         [level.strip() for level in metadata['taxonomy'].split(';')]})
+         for observation_id, metadata in zip(table.ids('observation'),
+         observation_metadata)), 'observation')
+        table.type = 'OTU table'
+    return table
+
+
+def natural_key(sample_id):
+    """ Returns a case-insensitive natural sort key of a sample ID """
+
+    return [int(part) if part.isdigit() else part for part in
+     re.split(r'(\d+)', sample_id.lower())]
+
+
+def sort_table(table):
+    """ Returns table with its samples sorted by ID in natural order """
+
+    return table.sort_order(sorted(table.ids(), key=natural_key))
+
+
+def summarize_table(table):
+    """ Returns the biom summarize-table summary of a table
+
+    The sample totals are summed from the nonzero values of the sparse
+    matrix in one pass, in place of the per sample vectors biom iterates.
+    Samples are listed by increasing count as biom does, those of equal
+    counts by sample ID in place of biom's dict order.
+    """
+
+    def format_count(format_str, value):
+        return locale.format(format_str, value, grouping=True)
+
+    matrix = table.matrix_data.tocsr()
+    sample_ids = table.ids()
+    sample_counts = bincount(matrix.indices, weights=matrix.data,
+     minlength=len(sample_ids))
+
+    sample_metadata = table.metadata()
+    observation_metadata = table.metadata(axis='observation')
+    if sample_metadata is None:
+        sample_metadata_keys = ["None provided"]
+    else:
+        sample_metadata_keys = sample_metadata[0].keys()
+    if observation_metadata is None:
+        observation_metadata_keys = ["None provided"]
+    else:
+        observation_metadata_keys = observation_metadata[0].keys()
+
+    lines = ['Num samples: ' + format_count('%d', len(sample_ids)),
+             'Num observations: ' + format_count('%d', matrix.shape[0]),
+             'Total count: ' + format_count('%d', sample_counts.sum()),
+             'Table density (fraction of non-zero values): %1.3f' %
+              table.get_table_density(),
+             '',
+             'Counts/sample summary:',
+             ' Min: ' + format_count('%1.3f', sample_counts.min()),
+             ' Max: ' + format_count('%1.3f', sample_counts.max()),
+             ' Median: ' + format_count('%1.3f', median(sample_counts)),
+             ' Mean: ' + format_count('%1.3f', sample_counts.mean()),
+             ' Std. dev.: ' + format_count('%1.3f', std(sample_counts)),
+             ' Sample Metadata Categories: %s' %
+              '; '.join(sample_metadata_keys),
+             ' Observation Metadata Categories: %s' %
+              '; '.join(observation_metadata_keys),
+             '',
+             'Counts/sample detail:']
+    for count, sample_id in sorted(zip(sample_counts, sample_ids)):
+        lines.append('%s: ' % sample_id + format_count('%1.3f', count))
+
+    return "\n".join(lines)
+
+
+def write_output(table, operation, output_fp):
+    """ Writes table, or its summary, as given by an output operation """
+
+    if operation == 'summarize':
+        with open(output_fp, 'w') as output_fd:
+            output_fd.write(summarize_table(table))
+    elif operation == 'tsv':
+        observation_metadata = table.metadata(axis='observation')
+        if observation_metadata is not None and \
+         'taxonomy' in observation_metadata[0]:
+            header_key = 'taxonomy'
+        else:
+            header_key = None
+        with open(output_fp, 'w') as output_fd:
+            output_fd.write(table.to_tsv(header_key=header_key,
+             header_value=header_key, metadata_formatter=lambda levels:
+             '; '.join(levels)).replace('# Constructed from biom '
+             'file\n', '', 1))
+    elif operation == 'hdf5':
+        with biom_open(output_fp, 'w') as output_fd:
+            table.to_hdf5(output_fd, 'biom_toolkit.py')
+    else:
+        with open(output_fp, 'w') as output_fd:
+            table.to_json('biom_toolkit.py', output_fd)
+
+
+def get_output_filepath(table_fp,
+                        output_name,
+                        output_dir=None):
+    """ Returns the path of an output of a table
+
+    table_fp: path of the input table
+    output_name: output name, where {name} is replaced by the table name
+    output_dir: directory of the output, the directory of the table if None
+    """
+
+    if output_dir is None:
+        output_dir = dirname(table_fp)
+    name = splitext(basename(table_fp))[0]
+
+    return join(output_dir, output_name.format(name=name))
+
+
+def get_table_md5(table_fp):
+    """ Returns the md5 hex digest of the contents of a table file """
+
+    table_md5 = md5()
+    with open(table_fp, 'rb') as table_fd:
+        for block in iter(lambda: table_fd.read(1 << 20), ''):
+            table_md5.update(block)
+    return table_md5.hexdigest()
+
+
+def read_cache(cache_fp):
+    """ Returns the {table path: [md5, pipeline]} dict of a cache file """
+
+    if cache_fp is None or not exists(cache_fp):
+        return {}
+    with open(cache_fp) as cache_fd:
+        return json.load(cache_fd)
+
+
+def write_cache(cache, cache_fp):
+    with open(cache_fp, 'w') as cache_fd:
+        json.dump(cache, cache_fd, indent=1, sort_keys=True)
+
+
+def is_up_to_date(table_fp,
+                  output_fps,
+                  pipeline,
+                  cache):
+    """ Returns whether the outputs of a table need not be written again
+
+    They are up to date if they are all newer than the table, or if the
+    cache records the current md5 of the table for the same pipeline.  In
+    the latter case the outputs are touched, so that a table rewritten with
+    the same contents is found up to date by mtime from then on.
+    """
+
+    if not all(exists(output_fp) for output_fp in output_fps):
+        return False
+    table_mtime = getmtime(table_fp)
+    if all(getmtime(output_fp) > table_mtime for output_fp in output_fps):
+        return True
+    if cache.get(abspath(table_fp)) != [get_table_md5(table_fp), pipeline]:
+        return False
+    for output_fp in output_fps:
+        utime(output_fp, None)
+    return True
+
+
+def run_pipeline(table_fp,
+                 operations,
+                 output_dir=None):
+    """ Runs operations on a table loaded once, returns the files written
+
+    table_fp: path of a biom or tab-delimited table
+    operations: list of (operation name, argument) from parse_operation
+    output_dir: directory of the outputs, the directory of the table if None
+    """
+
+    table = read_table(table_fp)
+    output_fps = []
+    for operation, argument in operations:
+        if operation == 'filter':
+            rules, min_samples = argument
+            table = list(sweep_filter_table(table, [(table_fp, rules)],
+             min_samples))[0][1]
+        elif operation == 'relativize':
+            table = relativize_table(table)
+        elif operation == 'sort':
+            table = sort_table(table)
+        else:
+            output_fp = get_output_filepath(table_fp, argument, output_dir)
+            write_output(table, operation, output_fp)
+            output_fps.append(output_fp)
+
+    return output_fps
+
+
+def run_pipeline_args(args):
+    """ run_pipeline for Pool.imap, args is (table fp, operations, dir) """
+
+    return run_pipeline(*args)
+
+
+def main():
+    parser = ArgumentParser(description='Loads each biom table once and runs '
+     'a pipeline of operations on it: filter:RULES, relativize, sort, '
+     'summarize[:NAME], tsv[:NAME], hdf5[:NAME] and json[:NAME], in the '
+     'order given.')
+    parser.add_argument('-i', '--input', nargs='+', default=[],
+     help='Biom or tab-delimited (.txt) tables')
+    parser.add_argument('-d', '--input_dir', nargs='+', default=[],
+     help='Directories whose .biom and .txt tables are all run, with those '
+     'of their subdirectories')
+    parser.add_argument('-p', '--pipeline', nargs='+', required=True,
+     help='The operations run on each table, in order')
+    parser.add_argument('-o', '--output_dir', default=None,
+     help='The directory outputs are written to (default: next to each '
+     'table)')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+     help='The number of tables run at once (default: 1)')
+    parser.add_argument('-u', '--update', action='store_true',
+     help='Skip tables whose outputs are newer than them, or whose contents '
+     'have not changed according to --cache_fp')
+    parser.add_argument('--cache_fp', default=None,
+     help='File recording the md5 of each table run, checked by -u')
+    parser.add_argument('-v', '--verbose', action='store_true',
+     help='Print each file written')
+    args = parser.parse_args()
+
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+    if not args.input and not args.input_dir:
+        parser.error('give input tables with -i and/or directories with -d')
+
+    # Summaries group thousands as biom summarize-table does
+    locale.setlocale(locale.LC_ALL, '')
+
+    try:
+        operations = [parse_operation(operation) for operation in
+         args.pipeline]
+    except ValueError, e:
+        parser.error(str(e))
+
+    table_fps = args.input + find_tables(args.input_dir)
+    if not table_fps:
+        parser.error('No .biom or .txt tables found')
+
+    for table_fp in table_fps:
+        for operation, argument in operations:
+            if operation in OUTPUT_OPERATIONS and abspath(get_output_filepath(
+             table_fp, argument, args.output_dir)) == abspath(table_fp):
+                parser.error('%s would overwrite its input table: %s' %
+                 (operation, table_fp))
+
+    if args.output_dir and not isdir(args.output_dir):
+        makedirs(args.output_dir)
+
+    pipeline = ' '.join(args.pipeline)
+    cache = read_cache(args.cache_fp)
+    if args.update:
+        table_fps = [table_fp for table_fp in table_fps if not
+         is_up_to_date(table_fp, [get_output_filepath(table_fp, argument,
+         args.output_dir) for operation, argument in operations if
+         operation in OUTPUT_OPERATIONS], pipeline, cache)]
+
+    pipeline_args = [(table_fp, operations, args.output_dir) for table_fp in
+     table_fps]
+    if args.workers > 1 and len(pipeline_args) > 1:
+        pool = Pool(min(args.workers, len(pipeline_args)))
+        results = pool.imap(run_pipeline_args, pipeline_args)
+    else:
+        pool = None
+        results = (run_pipeline_args(a) for a in pipeline_args)
+
+    for table_fp, output_fps in zip(table_fps, results):
+        if args.cache_fp:
+            cache[abspath(table_fp)] = [get_table_md5(table_fp), pipeline]
+        if args.verbose:
+            for output_fp in output_fps:
+                print "Wrote %s" % output_fp
+
+    if pool:
+        pool.close()
+        pool.join()
+
+    if args.cache_fp:
+        write_cache(cache, args.cache_fp)
+
+
+if __name__ == "__main__":
+    main()
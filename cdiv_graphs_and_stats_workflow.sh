@@ -262,7 +262,7 @@ wait
 
 	## Summarize input table(s) if necessary and extract rarefaction depth from shallowest sample or set depth according to config file
 	if [[ ! -f $biomdir/$biombase.summary ]]; then
-	biom-summarize_folder.sh $biomdir &>/dev/null
+	biom-summarize_folder.sh $biomdir $cores &>/dev/null
 	fi
 	if [[ $adepth =~ ^[0-9]+$ ]]; then
 	depth=($adepth)
@@ -383,7 +383,7 @@ Exiting.
 	fi	
 	## Summarize input table(s) if necessary and extract rarefaction depth from shallowest sample
 	if [[ ! -f $biomdir/$biombase.summary ]]; then
-	biom-summarize_folder.sh $biomdir &>/dev/null
+	biom-summarize_folder.sh $biomdir $cores &>/dev/null
 	fi
 	if [[ $adepth =~ ^[0-9]+$ ]]; then
 	depth=($adepth)
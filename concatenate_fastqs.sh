@@ -27,13 +27,14 @@
 ## This is useful for keeping reads in phase while performing some other function
 ##
 ## Example command:
-## paste -d '' <(echo; sed -n '1,${n;p;}' $1 | sed G) $2 | sed '/^$/d' > $1$2.fq
+## python akutils_resources/fastq_concatenate.py join -i $1 $2 -o $1$2.fq
 
 
 # check whether user had supplied -h or --help. If yes display help 
 
-	if [[ "$1" == "--help" ]] || [[ "$1" == "-h" ]]; then
 	scriptdir="$( cd "$( dirname "$0" )" && pwd )"
+
+	if [[ "$1" == "--help" ]] || [[ "$1" == "-h" ]]; then
 	less $scriptdir/docs/concatenate_fastqs.help
 		exit 0
 	fi 
@@ -66,8 +67,7 @@ concatenate_fastqs.sh fastq1 fastq2
 Concatenating $1 in front of $2
 	"
 
-	paste -d '' <(echo; sed -n '1,${n;p;}' $1 | sed G) $2 | sed '/^$/d' > $base1\_$base2.$fqextension1
-	wait
+	python $scriptdir/akutils_resources/fastq_concatenate.py join -i $1 $2 -o $base1\_$base2.$fqextension1 >/dev/null || exit 1
 
 	echo "Concatenation completed.
 fastq1: $1
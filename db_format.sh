@@ -47,6 +47,7 @@ db_format.sh <input_fasta> <input_taxonomy> <input_primers> <read_length> <outpu
 
 ## Define variables
 
+scriptdir="$( cd "$( dirname "$0" )" && pwd )"
 inrefs=($1)
 intax=($2)
 primers=($3)
@@ -70,6 +71,17 @@ refscount=`cat $intax | wc -l`
 date0=`date +%Y%m%d_%I%M%p`
 log=$outdir/log_$date0.txt
 
+## Read CPU cores from global config file (analyze primers is run in parallel)
+
+	global_config_count=(`ls $scriptdir/akutils_resources/akutils*.config 2>/dev/null | wc -w`)
+	if [[ $global_config_count -ge 1 ]]; then
+	config=`ls $scriptdir/akutils_resources/akutils*.config`
+	CPU_cores=(`grep "CPU_cores" $config | grep -v "#" | cut -f 2`)
+	fi
+	if [[ -z $CPU_cores ]]; then
+	CPU_cores=1
+	fi
+
 ## Make output directory
 
 	if [[ ! -d $outdir ]]; then
@@ -112,21 +124,16 @@ echo "Input phylogeny: $intree" >> $log
 
 	echo "Parsing nonstandard characters from inputs.
 	"
-	echo "
-Parsing nonstandard characters from inputs:
-	( parse_nonstandard_chars.py $inrefs > $outdir/temp/${refsname}_clean0.$refsextension ) &
-	( parse_nonstandard_chars.py $intax > $outdir/temp/${taxname}_clean.$taxextension ) &
 	if [[ ! -z $intree ]]; then
-	( parse_nonstandard_chars.py $intree > $outdir/temp/${refsname}_tree_clean.tre ) &
+	treepair="$intree $outdir/temp/${refsname}_tree_clean.tre"
+	else
+	treepair=""
 	fi
-	wait
+	echo "
+Parsing nonstandard characters from inputs:
+	parse_nonstandard_chars.py $inrefs $outdir/temp/${refsname}_clean0.$refsextension $intax $outdir/temp/${taxname}_clean.$taxextension $treepair
 " >> $log
-	( parse_nonstandard_chars.py $inrefs > $outdir/temp/$refsname\_clean0.$refsextension ) &
-	( parse_nonstandard_chars.py $intax > $outdir/temp/$taxname\_clean.$taxextension ) &
-	if [[ ! -z $intree ]]; then
-	( parse_nonstandard_chars.py $intree > $outdir/temp/$refsname\_tree_clean.tre ) &
-	fi
-	wait
+	parse_nonstandard_chars.py $inrefs $outdir/temp/${refsname}_clean0.$refsextension $intax $outdir/temp/${taxname}_clean.$taxextension $treepair
 
 ## Remove square brackets and quotes from taxonomy strings, and remove any text wrapping in the fasta input
 
@@ -209,27 +216,41 @@ Removing any leading or trailing whitespaces from inputs.
 #	tax=$cleansortedtax
 #	fi
 
-## Analyze primers
+## Analyze primers, get amplicons and reads
+## Primer hits are found and amplicons and reads cut in a single pass over
+## the references
+
+	ampout=$outdir/get_amplicons_and_reads_out
 
-	if [[ ! -d $outdir/analyze_primers_out ]]; then
+	if [[ ! -d $ampout ]]; then
 	mkdir -p $outdir/analyze_primers_out
-	echo "Generating primer hits files.
+	mkdir -p $ampout
+
+	if [[ $primercount == 2 ]]; then
+	threshold=100
+	minlength=75
+	else
+	threshold=75
+	minlength=100
+	fi
+
+	echo "Generating primer hits files, in silico reads and amplicons.
 Forward primer: $forward
 Reverse primer: $reverse
 	"
 	echo "
-Generating primer hits files.
+Generating primer hits files, in silico reads and amplicons.
 Forward primer: $forward
 Reverse primer: $reverse
 
-Analyze primers command:
-	analyze_primers.py -f $refs -P $primers -o $outdir/analyze_primers_out" >> $log
-	analyze_primers.py -f $refs -P $primers -o $outdir/analyze_primers_out
+Extract amplicons and reads command:
+	python $scriptdir/akutils_resources/extract_amplicons_and_reads.py -f $refs -P $primers -o $ampout --hits_dir $outdir/analyze_primers_out -t $threshold -m $minlength -R $length --workers $CPU_cores" >> $log
+	python $scriptdir/akutils_resources/extract_amplicons_and_reads.py -f $refs -P $primers -o $ampout --hits_dir $outdir/analyze_primers_out -t $threshold -m $minlength -R $length --workers $CPU_cores
 
 	else
-	echo "	Primer hits files previously generated."
+	echo "	Primer hits files, in silico reads and amplicons previously generated."
 	echo "
-Primer hits files previously generated." >> $log
+Primer hits files, in silico reads and amplicons previously generated." >> $log
 	if [[ $forcount == 1 ]]; then
 	echo "	Forward primer: $forward"
 	echo "Forward primer: $forward" >> $log
@@ -241,60 +262,6 @@ Primer hits files previously generated." >> $log
 	echo ""
 	fi
 
-## Get amplicons and reads
-
-	ampout=$outdir/get_amplicons_and_reads_out
-
-	if [[ ! -d $ampout ]]; then
-	fhitsfile=`ls $outdir/analyze_primers_out/*f_*_hits.txt`
-	rhitsfile=`ls $outdir/analyze_primers_out/*r_*_hits.txt`
-
-	if [[ $primercount == 2 ]]; then
-	
-	echo "Generating in silico reads and amplicons.
-	"
-	echo "
-Generating in silico reads and amplicons.
-
-Get amplicons and reads command (both primers):
-	get_amplicons_and_reads.py -f $refs -i $fhitsfile:$rhitsfile -o $ampout -t 100 -d p -R $length" >> $log
-	get_amplicons_and_reads.py -f $refs -i $fhitsfile:$rhitsfile -o $ampout -t 100 -d p -R $length -m 75
-
-	## Remove reads from paired analysis
-	rm $ampout/${forname}_${revname}_f_${length}_reads.fasta
-	rm $ampout/${forname}_${revname}_r_${length}_reads.fasta
-
-	## Produce DBs for each primer separately (more complete this way)
-
-	echo "
-Get amplicons and reads command (primer $forname):
-	get_amplicons_and_reads.py -f $refs -i $fhitsfile -o $ampout -t 100 -d p -R $length -m 75" >> $log
-	get_amplicons_and_reads.py -f $refs -i $fhitsfile -o $ampout -t 100 -d p -R $length -m 75
-	rm $ampout/${forname}_amplicons.fasta
-	rm $ampout/${forname}_r_${length}_reads.fasta
-	mv $ampout/${forname}_f_${length}_reads.fasta $ampout/${forname}_${length}_reads.fasta
-
-	echo "
-Get amplicons and reads command (primer $revname):
-	get_amplicons_and_reads.py -f $refs -i $rhitsfile -o $ampout -t 100 -d p -R $length -m 75" >> $log
-	get_amplicons_and_reads.py -f $refs -i $rhitsfile -o $ampout -t 100 -d p -R $length -m 75
-	rm $ampout/${revname}_amplicons.fasta
-	rm $ampout/${revname}_f_${length}_reads.fasta
-	mv $ampout/${revname}_r_${length}_reads.fasta $ampout/${revname}_${length}_reads.fasta
-
-	elif [[ $forcount == 1 ]]; then
-
-	echo "	get_amplicons_and_reads.py -f $refs -i $fhitsfile -o $ampout -t 100 -d f -R $length" >> $log
-	get_amplicons_and_reads.py -f $refs -i $fhitsfile -o $ampout -t 75 -d f -R $length
-
-	elif [[ $revcount == 1 ]]; then
-
-	echo "	get_amplicons_and_reads.py -f $refs -i $rhitsfile -t 100 -d r -R $length" >> $log
-	get_amplicons_and_reads.py -f $refs -i $rhitsfile -o $ampout -t 75 -d r -R $length
-
-	fi
-	fi
-
 ## Format taxonomy according to each new fasta
 
 	echo "Formatting new taxononmy files according to in silico results.
@@ -40,7 +40,8 @@ input=($1)
 Usage:
 fasta_length_histogram.sh <fasta_file>
 
-Input fasta must have valid extension (.fasta, .fa, .fas, .fna).
+Input fasta must have valid extension (.fasta, .fa, .fas, .fna), gzipped
+input may add .gz.
 		"`
 	if [[ "$#" -ne 1 ]]; then
 		echo "$usage"
@@ -51,12 +52,14 @@ Input fasta must have valid extension (.fasta, .fa, .fas, .fna).
 		exit 1
 	fi
 
-## Parse input filename and count reads
+## Parse input filename
 
 	fastaext="${input##*.}"
-	inputlines=$(cat $input | wc -l)
-	inputseqs=$(echo "$inputlines/2" | bc)
-	inputbase=$(basename $input .$fastaext)
+	if [[ "$fastaext" == "gz" ]]; then
+	gzinput="${input%.gz}"
+	fastaext="${gzinput##*.}"
+	fi
+	inputbase=$(basename ${input%.gz} .$fastaext)
 
 ## If other than fastq supplied as input, display usage
 
@@ -71,16 +74,16 @@ File supplied as input: $input
 		exit 1
 	fi
 
-## Build histogram with awk and bash
+## Build histogram in one pass, counting reads and bases
 
 	indir=$(dirname $input)
 	output=($indir/histogram.$inputbase.$fastaext.txt)
 	echo "
 Generating read-length histogram.
-Input: $input ($inputseqs reads)
+Input: $input
 Output: $output
 "
-	cat $input | awk '{if(NR%2==0) print length($1)}' | sort -V | uniq -c > $output
+	python $scriptdir/akutils_resources/read_length_histogram.py -i $input -o $output -f fasta
 	if [[ -s $output ]]; then
 	echo "Histogram successfully produced.
 	"
@@ -40,7 +40,8 @@ input=($1)
 Usage:
 fastq_length_histogram.sh <fastq_file>
 
-Input fastq must have \".fastq\" or \".fq\" extension.
+Input fastq must have \".fastq\" or \".fq\" extension (gzipped input may
+add \".gz\").
 		"`
 	if [[ "$#" -ne 1 ]]; then
 		echo "$usage"
@@ -51,12 +52,14 @@ Input fastq must have \".fastq\" or \".fq\" extension.
 		exit 1
 	fi
 
-## Parse input filename and count reads
+## Parse input filename
 
 	fastqext="${input##*.}"
-	inputlines=$(cat $input | wc -l)
-	inputseqs=$(echo "$inputlines/4" | bc)
-	inputbase=$(basename $input .$fastqext)
+	if [[ "$fastqext" == "gz" ]]; then
+	gzinput="${input%.gz}"
+	fastqext="${gzinput##*.}"
+	fi
+	inputbase=$(basename ${input%.gz} .$fastqext)
 
 ## If other than fastq supplied as input, display usage
 
@@ -70,16 +73,16 @@ File supplied as input: $input
 		exit 1
 	fi
 
-## Build histogram with awk and bash
+## Build histogram in one pass, counting reads and bases
 
 	indir=$(dirname $input)
 	output=($indir/histogram.$inputbase.$fastqext.txt)
 	echo "
 Generating read-length histogram.
-Input: $input ($inputseqs reads)
+Input: $input
 Output: $output
 "
-	cat $input | awk '{if(NR%4==2) print length($1)}' | sort -V | uniq -c > $output
+	python $scriptdir/akutils_resources/read_length_histogram.py -i $input -o $output -f fastq
 	if [[ -s $output ]]; then
 	echo "Histogram successfully produced.
 	"
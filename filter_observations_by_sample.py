@@ -24,7 +24,11 @@
 #
 
 from argparse import ArgumentParser
-from numpy import array
+from datetime import datetime
+from os import makedirs
+from os.path import isdir, join
+from numpy import arange, asarray, bincount, cumsum, diff, repeat, zeros
+from scipy.sparse import csc_matrix
 from biom import load_table, Table
 
 __author__ = "Adam Robbins-Pianka"
@@ -40,13 +44,258 @@ parser = ArgumentParser()
 parser.add_argument('-i', '--input_biom', help='The path to the input biom '
     'file to be filtered.', required=True)
 parser.add_argument('-n', '--abundance_threshold', help='The minimum '
-    'abundance of an OTU in a sample in order to be retained.', type=float,
-    required=True)
-parser.add_argument('-o', '--output_biom', help='The path to the output file.',
-    required=True)
+    'abundance of an OTU in a sample in order to be retained. Required '
+    'unless --sweep is used.', type=float, required=False, default=None)
+parser.add_argument('-o', '--output_biom', help='The path to the output file, '
+    'or the output directory with --sweep.', required=True)
 parser.add_argument('-f', '--abundance_as_fraction', help='Treat the value '
     'passed for -n (--abundance_threshold) as a fraction rather than an '
     'absolute count.', action='store_true', required=False, default=False)
+parser.add_argument('--output_format', help='The format of the output file, '
+    'json or hdf5 (default: json, or hdf5 with -b).', choices=['json', 'hdf5'],
+    required=False, default=None)
+parser.add_argument('-b', '--block_size', help='Filter an HDF5 input table '
+    'out of core, reading and writing this many samples (and observations) '
+    'at a time, so that the table is never loaded whole. The output is '
+    'written as HDF5.', type=int, required=False, default=None)
+parser.add_argument('--sweep', help='Write several filtered tables from one '
+    'load of the input table, each given as OUTPUT_NAME:RULE[,RULE...], '
+    'where the rules are n=COUNT or f=FRACTION (as -n, and -n with -f), '
+    'mc=COUNT (minimum total count of an OTU) and mf=FRACTION (minimum total '
+    'count of an OTU as a fraction of the table total), applied in this '
+    'order. Example: n2_table.biom:n=1,mc=1 mc2_table.biom:mc=2. The tables '
+    'are written to the -o directory, as HDF5 by default.', nargs='+',
+    required=False, default=None)
+parser.add_argument('-s', '--min_samples', help='With --sweep, the minimum '
+    'number of samples an OTU must be in to be retained (default: 0).',
+    type=int, required=False, default=0)
+
+# Rules of a --sweep variant, in the order they are applied
+SWEEP_RULES = ('n', 'f', 'mc', 'mf')
+
+
+def filter_table(input_table, threshold, as_fraction=False):
+    """Zeroes the abundances at or below threshold within each sample
+
+    The threshold is applied to the nonzero values of the table's sparse
+    matrix, by sample column, so the table is never made dense.  Returns a new
+    sparse Table with the same ids and metadata.
+    """
+    matrix = input_table.matrix_data.tocsc(copy=True)
+
+    if as_fraction:
+        sample_sums = asarray(matrix.sum(axis=0), dtype=float).ravel()
+        value_samples = repeat(arange(matrix.shape[1]), diff(matrix.indptr))
+        keep = matrix.data.astype(float) / sample_sums[value_samples] > \
+            threshold
+    else:
+        keep = matrix.data > threshold
+
+    matrix.data[~keep] = 0
+    matrix.eliminate_zeros()
+
+    return Table(matrix,
+                 input_table.ids('observation'),
+                 input_table.ids(),
+                 input_table.metadata(axis='observation'),
+                 input_table.metadata())
+
+
+def filter_hdf5_matrix(input_matrix, output_matrix, threshold, block_size,
+                       sample_sums=None, sample_major=True):
+    """Filters a compressed sparse matrix group of a BIOM HDF5 file by blocks
+
+    Reads block_size rows of input_matrix (the data, indices and indptr
+    datasets of the sample or observation matrix) at a time, zeroes the
+    values at or below threshold, and appends the kept values to
+    output_matrix. If sample_sums is given, threshold is a fraction of the
+    sample totals. Returns the number of values kept.
+    """
+    indptr = input_matrix['indptr'][:]
+    input_data = input_matrix['data']
+    input_indices = input_matrix['indices']
+
+    output_data = output_matrix.create_dataset('data', shape=(0,),
+        maxshape=(None,), dtype=input_data.dtype, chunks=True,
+        compression='gzip')
+    output_indices = output_matrix.create_dataset('indices', shape=(0,),
+        maxshape=(None,), dtype=input_indices.dtype, chunks=True,
+        compression='gzip')
+    new_indptr = zeros(len(indptr), dtype=indptr.dtype)
+
+    nnz = 0
+    for start in range(0, len(indptr) - 1, block_size):
+        stop = min(start + block_size, len(indptr) - 1)
+        data = input_data[indptr[start]:indptr[stop]]
+        indices = input_indices[indptr[start]:indptr[stop]]
+        value_rows = repeat(arange(stop - start), diff(indptr[start:stop+1]))
+
+        if sample_sums is None:
+            keep = data > threshold
+        elif sample_major:
+            keep = data.astype(float) / sample_sums[start + value_rows] > \
+                threshold
+        else:
+            keep = data.astype(float) / sample_sums[indices] > threshold
+
+        new_indptr[start+1:stop+1] = nnz + cumsum(bincount(value_rows[keep],
+            minlength=stop - start))
+        kept = keep.sum()
+        output_data.resize((nnz + kept,))
+        output_data[nnz:] = data[keep]
+        output_indices.resize((nnz + kept,))
+        output_indices[nnz:] = indices[keep]
+        nnz += kept
+
+    output_matrix.create_dataset('indptr', data=new_indptr,
+        compression='gzip')
+
+    return nnz
+
+
+def filter_hdf5_table(input_fp, output_fp, threshold, as_fraction=False,
+                      block_size=1000):
+    """Filters a BIOM HDF5 table into a new one, block_size rows at a time
+
+    The sample matrix is filtered in blocks of samples, and the observation
+    matrix in blocks of observations, so that memory use is bounded by the
+    block size rather than the table size. Ids and metadata are copied as
+    they are.
+    """
+    import h5py
+
+    with h5py.File(input_fp, 'r') as input_fd:
+        with h5py.File(output_fp, 'w') as output_fd:
+            for name, value in input_fd.attrs.items():
+                output_fd.attrs[name] = value
+            output_fd.attrs['generated-by'] = 'one-time generation'
+            output_fd.attrs['creation-date'] = datetime.now().isoformat()
+
+            sample_sums = None
+            if as_fraction:
+                indptr = input_fd['sample/matrix/indptr'][:]
+                sample_sums = zeros(len(indptr) - 1, dtype=float)
+                for start in range(0, len(indptr) - 1, block_size):
+                    stop = min(start + block_size, len(indptr) - 1)
+                    sample_sums[start:stop] = bincount(repeat(
+                        arange(stop - start), diff(indptr[start:stop+1])),
+                        weights=input_fd['sample/matrix/data'][
+                            indptr[start]:indptr[stop]],
+                        minlength=stop - start)
+
+            for axis in ('observation', 'sample'):
+                output_group = output_fd.create_group(axis)
+                for name in input_fd[axis]:
+                    if name != 'matrix':
+                        input_fd.copy('%s/%s' % (axis, name), output_group)
+                nnz = filter_hdf5_matrix(input_fd[axis]['matrix'],
+                    output_group.create_group('matrix'), threshold,
+                    block_size, sample_sums, axis == 'sample')
+
+            output_fd.attrs['nnz'] = nnz
+
+
+def parse_sweep_variant(variant):
+    """Returns the output name and dict of rules of a --sweep variant"""
+    try:
+        output_name, rules_str = variant.rsplit(':', 1)
+        rules = {}
+        for rule in rules_str.split(','):
+            name, value = rule.split('=')
+            rules[name] = float(value)
+    except ValueError:
+        raise ValueError("Sweep variants must be given as "
+                         "OUTPUT_NAME:RULE[,RULE...], where each rule is "
+                         "name=value: %s" % variant)
+
+    for name, value in rules.items():
+        if name not in SWEEP_RULES:
+            raise ValueError("Unknown sweep rule %s (rules are %s): %s" %
+                             (name, ', '.join(SWEEP_RULES), variant))
+        if name in ('f', 'mf') and not 0 <= value <= 1:
+            raise ValueError("Sweep rule %s must be in the interval [0, 1]: "
+                             "%s" % (name, variant))
+        if name == 'n':
+            if value != int(value) or value < 0:
+                raise ValueError("Sweep rule n must be an integer: %s" %
+                                 variant)
+            rules[name] = int(value)
+
+    return output_name, rules
+
+
+def sweep_filter_table(input_table, variants, min_samples=0):
+    """Yields (output name, filtered Table) for each sweep variant
+
+    The table is loaded and indexed once: the sparse matrix, the sample of
+    each value, the sample totals and the fractions of the totals are shared
+    by all variants. Per sample thresholds (n, f) zero the values at or
+    below them, as filter_table does. Then OTUs with a total below mc, below
+    mf of the table total, or in fewer than min_samples samples are removed.
+
+    variants: list of (output name, rules) from parse_sweep_variant
+    """
+    matrix = input_table.matrix_data.tocsc()
+    data = matrix.data
+    value_samples = repeat(arange(matrix.shape[1]), diff(matrix.indptr))
+    sample_sums = asarray(matrix.sum(axis=0), dtype=float).ravel()
+    fractions = None
+
+    observation_ids = input_table.ids('observation')
+    observation_metadata = input_table.metadata(axis='observation')
+
+    for output_name, rules in variants:
+        keep = data != 0
+        if 'n' in rules:
+            keep &= data > rules['n']
+        if 'f' in rules:
+            if fractions is None:
+                fractions = data.astype(float) / sample_sums[value_samples]
+            keep &= fractions > rules['f']
+
+        kept_data = data[keep]
+        kept_indices = matrix.indices[keep]
+        kept_indptr = zeros(len(matrix.indptr), dtype=matrix.indptr.dtype)
+        kept_indptr[1:] = cumsum(bincount(value_samples[keep],
+            minlength=matrix.shape[1]))
+        kept_matrix = csc_matrix((kept_data, kept_indices, kept_indptr),
+            shape=matrix.shape)
+
+        observation_sums = bincount(kept_indices, weights=kept_data,
+            minlength=matrix.shape[0])
+        observation_keep = bincount(kept_indices,
+            minlength=matrix.shape[0]) >= min_samples
+        if 'mc' in rules:
+            observation_keep &= observation_sums >= rules['mc']
+        if 'mf' in rules:
+            observation_keep &= observation_sums >= \
+                kept_data.sum() * rules['mf']
+
+        observations = observation_keep.nonzero()[0]
+        if observation_metadata is None:
+            new_observation_metadata = None
+        else:
+            new_observation_metadata = [observation_metadata[i] for i in
+                observations]
+
+        yield output_name, Table(kept_matrix[observations, :],
+                                 observation_ids[observations],
+                                 input_table.ids(),
+                                 new_observation_metadata,
+                                 input_table.metadata(),
+                                 type=input_table.type)
+
+
+def write_table(table, output_fp, output_format='json'):
+    """Writes table as BIOM json or hdf5"""
+    if output_format == 'hdf5':
+        from biom.util import biom_open
+        with biom_open(output_fp, 'w') as output_fd:
+            table.to_hdf5(output_fd, 'one-time generation')
+    else:
+        with open(output_fp, 'w') as output_fd:
+            table.to_json('one-time generation', output_fd)
+
 
 def main():
     args = parser.parse_args()
@@ -55,6 +304,23 @@ def main():
     threshold = args.abundance_threshold
     as_fraction = args.abundance_as_fraction
 
+    if args.sweep:
+        variants = [parse_sweep_variant(variant) for variant in args.sweep]
+        if not isdir(output_fp):
+            makedirs(output_fp)
+
+        input_table = load_table(input_fp)
+
+        for output_name, new_table in sweep_filter_table(input_table,
+                variants, args.min_samples):
+            write_table(new_table, join(output_fp, output_name),
+                        args.output_format or 'hdf5')
+        return
+
+    if threshold is None:
+        raise ValueError("The value for -n (--abundance_threshold) is "
+                         "required unless --sweep is used.")
+
     if as_fraction:
         if not 0 <= threshold <= 1:
             raise ValueError("The value passed for -n "
@@ -72,36 +338,23 @@ def main():
 
         threshold = int(threshold)
 
-    input_table = load_table(input_fp)
-
-    new_data = []
-    append_new_data = new_data.append
-    for abundances in input_table.iter_data():
-        if as_fraction:
-            abundance_fractions = abundances.astype(float)/sum(abundances)
-            indices = [i for (i, j) in enumerate(abundance_fractions>threshold)
-                if not j]
+    if args.block_size is not None:
+        if args.block_size < 1:
+            raise ValueError("The value passed for -b (--block_size) must be "
+                             "at least 1.")
+        if args.output_format == 'json':
+            raise ValueError("Tables filtered with -b (--block_size) are "
+                             "written as HDF5 only.")
 
-        else:
-            indices = [i for (i, j) in enumerate(abundances>threshold)
-                       if not j]
-
-        item_set = abundances.itemset
-        for index in indices:
-            item_set(index, 0)
+        filter_hdf5_table(input_fp, output_fp, threshold, as_fraction,
+                          args.block_size)
+        return
 
-        append_new_data(abundances)
+    input_table = load_table(input_fp)
 
-    new_data = array(new_data).transpose()
+    new_table = filter_table(input_table, threshold, as_fraction)
 
-    new_table = Table(new_data,
-                      input_table.ids('observation'),
-                      input_table.ids(),
-                      input_table.metadata(axis='observation'),
-                      input_table.metadata())
-    
-    with open(output_fp, 'w') as output_fd:
-        new_table.to_json('one-time generation', output_fd)
+    write_table(new_table, output_fp, args.output_format or 'json')
 
 
 if __name__ == '__main__':
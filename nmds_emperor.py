@@ -0,0 +1,298 @@
+#!/usr/bin/env python
+#
+#  nmds_emperor.py - NMDS of a distance matrix, written for emperor
+#
+#  Version 1.0.0 (October 16, 2026)
+#
+#  Copyright (c) 2026 Andrew Krohn
+#
+#  This software is provided 'as-is', without any express or implied
+#  warranty. In no event will the authors be held liable for any damages
+#  arising from the use of this software.
+#
+#  Permission is granted to anyone to use this software for any purpose,
+#  including commercial applications, and to alter it and redistribute it
+#  freely, subject to the following restrictions:
+#
+#  1. The origin of this software must not be misrepresented; you must not
+#     claim that you wrote the original software. If you use this software
+#     in a product, an acknowledgment in the product documentation would be
+#     appreciated but is not required.
+#  2. Altered source versions must be plainly marked as such, and must not be
+#     misrepresented as being the original software.
+#  3. This notice may not be removed or altered from any source distribution.
+#
+
+## Replaces nmds.py followed by convert_nmds_coords.py.  Nonmetric
+## multidimensional scaling is fit by SMACOF from several starts (the
+## classical scaling of the distances, then random configurations), run in
+## parallel, and the solution of lowest stress (Kruskal's stress-1) is kept.
+## The distance matrix is read once, and two files are written:
+##
+##   -o  coordinates as nmds.py writes them, with the stress of the solution
+##   -e  the same coordinates with the header, eigenvalue and variation lines
+##       emperor expects, as convert_nmds_coords.py writes them
+
+from argparse import ArgumentParser
+from multiprocessing import Pool
+
+from numpy import (argsort, asarray, cumsum, dot, eye, lexsort, ones,
+                   sqrt, triu_indices, zeros)
+from numpy.linalg import eigh
+from numpy.random import RandomState
+
+__author__ = "Andrew Krohn"
+__copyright__ = "Copyright 2026"
+__license__ = "zlib"
+__version__ = "1.0.0"
+
+
+def read_distance_matrix(dm_fp):
+    """ Returns (sample ids, distances) of a QIIME distance matrix file """
+
+    with open(dm_fp) as dm_fd:
+        lines = [line.rstrip('\n') for line in dm_fd if line.strip()]
+    sample_ids = lines[0].split('\t')[1:]
+    row_ids = []
+    distances = []
+    for line in lines[1:]:
+        fields = line.split('\t')
+        row_ids.append(fields[0])
+        distances.append([float(value) for value in fields[1:]])
+    if row_ids != sample_ids:
+        raise ValueError('The rows and columns of the distance matrix are not '
+         'the same samples: %s' % dm_fp)
+
+    return sample_ids, asarray(distances)
+
+
+def get_pair_distances(points):
+    """ Returns the distances between the points of each pair i < j """
+
+    rows, cols = triu_indices(len(points), 1)
+    differences = points[rows] - points[cols]
+    return sqrt((differences ** 2).sum(axis=1))
+
+
+def fit_disparities(distances, order):
+    """ Returns the isotonic regression of distances in the given order
+
+    Pool adjacent violators: the disparities are the distances averaged over
+    blocks so that they do not decrease along the order of the
+    dissimilarities.
+    """
+
+    ordered = distances[order]
+    block_sums = []
+    block_sizes = []
+    for value in ordered:
+        block_sum = value
+        block_size = 1
+        while block_sums and \
+         block_sums[-1] * block_size > block_sum * block_sizes[-1]:
+            block_sum += block_sums.pop()
+            block_size += block_sizes.pop()
+        block_sums.append(block_sum)
+        block_sizes.append(block_size)
+
+    block_sizes = asarray(block_sizes)
+    block_means = asarray(block_sums) / block_sizes
+    disparities = zeros(len(ordered))
+    ends = cumsum(block_sizes)
+    for mean, start, end in zip(block_means, ends - block_sizes, ends):
+        disparities[start:end] = mean
+    fitted = zeros(len(ordered))
+    fitted[order] = disparities
+
+    return fitted
+
+
+def classical_scaling(distances, dimensions):
+    """ Returns the principal coordinates of a distance matrix """
+
+    n = len(distances)
+    centering = eye(n) - ones((n, n)) / n
+    inner_products = -0.5 * dot(dot(centering, distances ** 2), centering)
+    eigvals, eigvecs = eigh(inner_products)
+    top = argsort(eigvals)[::-1][:dimensions]
+
+    return eigvecs[:, top] * sqrt(abs(eigvals[top]))
+
+
+def smacof(dissimilarities,
+           initial_points,
+           max_iterations=300,
+           tolerance=1e-5):
+    """ Returns (points, stress) of nonmetric SMACOF from initial points
+
+    dissimilarities: square distance matrix
+    initial_points: n x dimensions starting configuration
+    max_iterations: maximum number of Guttman transforms
+    tolerance: the fit stops when the stress improves by less than this
+    """
+
+    n = len(dissimilarities)
+    rows, cols = triu_indices(n, 1)
+    pair_dissimilarities = dissimilarities[rows, cols]
+    points = initial_points - initial_points.mean(axis=0)
+    stress = None
+    # The points whose stress is stress, returned with it
+    best_points = points
+
+    for iteration in xrange(max_iterations):
+        distances = get_pair_distances(points)
+        # Ties of the dissimilarities are broken by the current distances
+        # (the primary approach to ties)
+        order = lexsort((distances, pair_dissimilarities))
+        disparities = fit_disparities(distances, order)
+        new_stress = sqrt(((distances - disparities) ** 2).sum() /
+         (distances ** 2).sum())
+        disparities *= sqrt(len(disparities) / (disparities ** 2).sum())
+        converged = stress is not None and stress - new_stress < tolerance
+        if stress is None or new_stress < stress:
+            stress = new_stress
+            best_points = points
+        if converged:
+            break
+
+        # Guttman transform
+        ratios = zeros((n, n))
+        nonzero = distances > 0
+        ratios[rows[nonzero], cols[nonzero]] = \
+         disparities[nonzero] / distances[nonzero]
+        ratios += ratios.T
+        b_matrix = -ratios
+        b_matrix[range(n), range(n)] = ratios.sum(axis=1)
+        points = dot(b_matrix, points) / n
+
+    return best_points, stress
+
+
+def run_start(args):
+    """ smacof for Pool.map, args is (dissimilarities, dimensions,
+    start, seed, max iterations, tolerance); start 0 is classical scaling
+    """
+
+    dissimilarities, dimensions, start, seed, max_iterations, tolerance = args
+    if start == 0:
+        initial_points = classical_scaling(dissimilarities, dimensions)
+    else:
+        initial_points = RandomState(seed + start).uniform(size=(
+         len(dissimilarities), dimensions))
+
+    return smacof(dissimilarities, initial_points, max_iterations, tolerance)
+
+
+def nmds(dissimilarities,
+         dimensions=3,
+         starts=10,
+         workers=1,
+         seed=0,
+         max_iterations=300,
+         tolerance=1e-5):
+    """ Returns (points, stress) of the lowest stress of several NMDS fits
+
+    dissimilarities: square distance matrix
+    dimensions: number of NMDS axes
+    starts: number of starting configurations fit
+    workers: number of processes fitting them
+    seed: seed of the random starting configurations
+    """
+
+    start_args = [(dissimilarities, dimensions, start, seed, max_iterations,
+     tolerance) for start in range(starts)]
+    if workers > 1 and starts > 1:
+        pool = Pool(min(workers, starts))
+        fits = pool.map(run_start, start_args)
+        pool.close()
+        pool.join()
+    else:
+        fits = map(run_start, start_args)
+
+    return min(fits, key=lambda fit: fit[1])
+
+
+def format_nmds_coords(sample_ids,
+                       points,
+                       stress,
+                       emperor=False):
+    """ Returns coordinates as nmds.py writes them, or as emperor reads them
+
+    With emperor, the samples header is "pc vector number" and the stress
+    and variation explained lines are replaced by eigenvalues and variation
+    explained of 1, which emperor needs to be nonzero.
+    """
+
+    dimensions = points.shape[1]
+    axes = ['NMDS axis ' + str(i + 1) for i in range(dimensions)]
+    if emperor:
+        lines = ['pc vector number\t' + '\t'.join(axes)]
+    else:
+        lines = ['samples\t' + '\t'.join(axes)]
+    for sample_id, row in zip(sample_ids, points):
+        lines.append('\t'.join([sample_id] + map(str, row)))
+    lines.append('')
+    if emperor:
+        lines.append('eigvals\t' + '\t'.join(['1'] * dimensions))
+        lines.append('% variation explained\t' + '\t'.join(['1'] *
+         dimensions))
+    else:
+        lines.append('stress\t' + '\t'.join([str(stress)] + ['0'] *
+         (dimensions - 1)))
+        lines.append('% variation explained\t' + '\t'.join(['0'] *
+         dimensions))
+
+    return '\n'.join(lines) + '\n'
+
+
+def main():
+    parser = ArgumentParser(description='Fits NMDS to a distance matrix from '
+     'several starts in parallel and writes the lowest stress coordinates, '
+     'as nmds.py and for make_emperor.py.')
+    parser.add_argument('-i', '--input_dm', required=True,
+     help='The distance matrix (output of beta_diversity.py)')
+    parser.add_argument('-o', '--output', required=True,
+     help='The coordinates as nmds.py writes them')
+    parser.add_argument('-e', '--emperor_output', default=None,
+     help='The coordinates for make_emperor.py, as convert_nmds_coords.py '
+     'writes them')
+    parser.add_argument('-d', '--dimensions', type=int, default=3,
+     help='The number of NMDS axes (default: 3)')
+    parser.add_argument('-n', '--starts', type=int, default=10,
+     help='The number of starting configurations fit (default: 10)')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+     help='The number of processes fitting starts (default: 1)')
+    parser.add_argument('-s', '--seed', type=int, default=0,
+     help='The seed of the random starting configurations (default: 0)')
+    parser.add_argument('--max_iterations', type=int, default=300,
+     help='The maximum number of iterations of each fit (default: 300)')
+    args = parser.parse_args()
+
+    if args.dimensions < 1:
+        parser.error('--dimensions must be at least 1')
+    if args.starts < 1:
+        parser.error('--starts must be at least 1')
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+
+    try:
+        sample_ids, dissimilarities = read_distance_matrix(args.input_dm)
+    except ValueError, e:
+        parser.error(str(e))
+    if len(sample_ids) <= args.dimensions:
+        parser.error('NMDS of %d samples needs fewer than %d dimensions' %
+         (len(sample_ids), len(sample_ids)))
+
+    points, stress = nmds(dissimilarities, args.dimensions, args.starts,
+     args.workers, args.seed, args.max_iterations)
+
+    with open(args.output, 'w') as output_fd:
+        output_fd.write(format_nmds_coords(sample_ids, points, stress))
+    if args.emperor_output:
+        with open(args.emperor_output, 'w') as output_fd:
+            output_fd.write(format_nmds_coords(sample_ids, points, stress,
+             emperor=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -151,10 +151,9 @@ Principal coordinates and NMDS commands:" >> $log
 	for dm in $outdir/bdiv/*_dm.txt; do
 	dmbase=$( basename $dm _dm.txt )
 	echo "	principal_coordinates.py -i $dm -o $outdir/bdiv/$dmbase\_pc.txt
-	nmds.py -i $dm -o $outdir/bdiv/$dmbase\_nmds.txt" >> $log
+	python $scriptdir/nmds_emperor.py -i $dm -o $outdir/bdiv/$dmbase\_nmds.txt -e $outdir/bdiv/$dmbase\_nmds_converted.txt -w $cores" >> $log
 	principal_coordinates.py -i $dm -o $outdir/bdiv/$dmbase\_pc.txt >/dev/null 2>&1 || true
-	nmds.py -i $dm -o $outdir/bdiv/$dmbase\_nmds.txt >/dev/null 2>&1 || true
-	python $scriptdir/convert_nmds_coords.py -i $outdir/bdiv/$dmbase\_nmds.txt -o $outdir/bdiv/$dmbase\_nmds_converted.txt
+	python $scriptdir/nmds_emperor.py -i $dm -o $outdir/bdiv/$dmbase\_nmds.txt -e $outdir/bdiv/$dmbase\_nmds_converted.txt -w $cores >/dev/null 2>&1 || true
 	done
 
 ## Make 3D emperor plots (PCoA)
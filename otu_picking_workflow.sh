@@ -985,54 +985,45 @@ wait
 
 if [[ ! -f $otutable_dir/n2_table_hdf5.biom ]] && [[ ! -f $otutable_dir/n2_table_CSS.biom ]] && [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]] && [[ ! -f $otutable_dir/mc2_table_CSS.biom ]] && [[ ! -f $otutable_dir/005_table_hdf5.biom ]] && [[ ! -f $otutable_dir/005_table_CSS.biom ]] && [[ ! -f $otutable_dir/03_table_hdf5.biom ]] && [[ ! -f $otutable_dir/03_table_CSS.biom ]]; then
 
+	## filter singletons by sample (n2), singletons by table (mc2), table by
+	## 0.005 percent (005) and at 0.3% by sample (03) from one table load
+	sweep=""
 	if [[ ! -f $otutable_dir/n2_table_hdf5.biom ]]; then
-	## filter singletons by sample and normalize
-	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir/n2_table0.biom -n 1
-	filter_otus_from_otu_table.py -i $otutable_dir/n2_table0.biom -o $otutable_dir/n2_table.biom -n 1 -s 2
-	biom convert -i $otutable_dir/n2_table.biom -o $otutable_dir/n2_table_hdf5.biom --table-type="OTU table" --to-hdf5
+	sweep="$sweep n2_table_hdf5.biom:n=1,mc=1"
+	fi
+	if [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]]; then
+	sweep="$sweep mc2_table_hdf5.biom:mc=2"
+	fi
+	if [[ ! -f $otutable_dir/005_table_hdf5.biom ]]; then
+	sweep="$sweep 005_table_hdf5.biom:mf=0.00005"
+	fi
+	if [[ ! -f $otutable_dir/03_table_hdf5.biom ]]; then
+	sweep="$sweep 03_table_hdf5.biom:f=0.003,mc=1"
+	fi
+	if [[ ! -z $sweep ]]; then
+	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir -s 2 --sweep $sweep
 	fi
 wait
+	## normalize
 	if [[ ! -f $otutable_dir/n2_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/n2_table_hdf5.biom -o $otutable_dir/n2_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter singletons by table and normalize
-	if [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]]; then
-	filter_otus_from_otu_table.py -i $otutable_dir/min100_table.biom -o $otutable_dir/mc2_table_hdf5.biom -n 2 -s 2
-	fi
 wait
 	if [[ ! -f $otutable_dir/mc2_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/mc2_table_hdf5.biom -o $otutable_dir/mc2_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter table by 0.005 percent and normalize
-	if [[ ! -f $otutable_dir/005_table_hdf5.biom ]]; then
-	filter_otus_from_otu_table.py -i $otutable_dir/min100_table.biom -o $otutable_dir/005_table_hdf5.biom --min_count_fraction 0.00005 -s 2
-	fi
 wait
 	if [[ ! -f $otutable_dir/005_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/005_table_hdf5.biom -o $otutable_dir/005_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter at 0.3% by sample and normalize
-	if [[ ! -f $otutable_dir/03_table_hdf5.biom ]]; then
-	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir/03_table0.biom -f -n 0.003
-	filter_otus_from_otu_table.py -i $otutable_dir/03_table0.biom -o $otutable_dir/03_table.biom -n 1 -s 2
-	biom convert -i $otutable_dir/03_table.biom -o $otutable_dir/03_table_hdf5.biom --table-type="OTU table" --to-hdf5
-	fi
 wait
 	if [[ ! -f $otutable_dir/03_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/03_table_hdf5.biom -o $otutable_dir/03_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	rm $otutable_dir/03_table0.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/03_table.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/n2_table0.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/n2_table.biom >/dev/null 2>&1 || true
 wait
 ## Summarize raw otu tables
 
-	biom-summarize_folder.sh $otutable_dir >/dev/null
+	biom-summarize_folder.sh $otutable_dir $CPU_cores >/dev/null
 	written_seqs=`grep "Total count:" $otutable_dir/n2_table_hdf5.summary | cut -d" " -f3`
 	input_seqs=`grep "Total number seqs written" split_libraries/split_library_log.txt | cut -f2`
 	echo "$written_seqs out of $input_seqs input sequences written.
@@ -1181,54 +1172,46 @@ wait
 
 if [[ ! -f $otutable_dir/n2_table_hdf5.biom ]] && [[ ! -f $otutable_dir/n2_table_CSS.biom ]] && [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]] && [[ ! -f $otutable_dir/mc2_table_CSS.biom ]] && [[ ! -f $otutable_dir/005_table_hdf5.biom ]] && [[ ! -f $otutable_dir/005_table_CSS.biom ]] && [[ ! -f $otutable_dir/03_table_hdf5.biom ]] && [[ ! -f $otutable_dir/03_table_CSS.biom ]]; then
 
+	## filter singletons by sample (n2), singletons by table (mc2), table by
+	## 0.005 percent (005) and at 0.3% by sample (03) from one table load
+	sweep=""
 	if [[ ! -f $otutable_dir/n2_table_hdf5.biom ]]; then
-	## filter singletons by sample and normalize
-	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir/n2_table0.biom -n 1
-	filter_otus_from_otu_table.py -i $otutable_dir/n2_table0.biom -o $otutable_dir/n2_table.biom -n 1 -s 2
-	biom convert -i $otutable_dir/n2_table.biom -o $otutable_dir/n2_table_hdf5.biom --table-type="OTU table" --to-hdf5
+	sweep="$sweep n2_table_hdf5.biom:n=1,mc=1"
+	fi
+	if [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]]; then
+	sweep="$sweep mc2_table_hdf5.biom:mc=2"
+	fi
+	if [[ ! -f $otutable_dir/005_table_hdf5.biom ]]; then
+	sweep="$sweep 005_table_hdf5.biom:mf=0.00005"
+	fi
+	if [[ ! -f $otutable_dir/03_table_hdf5.biom ]]; then
+	sweep="$sweep 03_table_hdf5.biom:f=0.003,mc=1"
+	fi
+	if [[ ! -z $sweep ]]; then
+	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir -s 2 --sweep $sweep
 	fi
 wait
+	## normalize
 	if [[ ! -f $otutable_dir/n2_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/n2_table_hdf5.biom -o $otutable_dir/n2_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter singletons by table and normalize
-	if [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]]; then
-	filter_otus_from_otu_table.py -i $otutable_dir/min100_table.biom -o $otutable_dir/mc2_table_hdf5.biom -n 2 -s 2
-	fi
 wait
 	if [[ ! -f $otutable_dir/mc2_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/mc2_table_hdf5.biom -o $otutable_dir/mc2_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter table by 0.005 percent and normalize
-	if [[ ! -f $otutable_dir/005_table_hdf5.biom ]]; then
-	filter_otus_from_otu_table.py -i $otutable_dir/min100_table.biom -o $otutable_dir/005_table_hdf5.biom --min_count_fraction 0.00005 -s 2
-	fi
 wait
 	if [[ ! -f $otutable_dir/005_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/005_table_hdf5.biom -o $otutable_dir/005_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter at 0.3% by sample and normalize
-	if [[ ! -f $otutable_dir/03_table_hdf5.biom ]]; then
-	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir/03_table0.biom -f -n 0.003
-	filter_otus_from_otu_table.py -i $otutable_dir/03_table0.biom -o $otutable_dir/03_table.biom -n 1 -s 2
-	biom convert -i $otutable_dir/03_table.biom -o $otutable_dir/03_table_hdf5.biom --table-type="OTU table" --to-hdf5
-	fi
 wait
 	if [[ ! -f $otutable_dir/03_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/03_table_hdf5.biom -o $otutable_dir/03_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
 wait
-	rm $otutable_dir/03_table0.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/03_table.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/n2_table0.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/n2_table.biom >/dev/null 2>&1 || true
 
 ## Summarize raw otu tables
 
-	biom-summarize_folder.sh $otutable_dir >/dev/null
+	biom-summarize_folder.sh $otutable_dir $CPU_cores >/dev/null
 	written_seqs=`grep "Total count:" $otutable_dir/n2_table_hdf5.summary | cut -d" " -f3`
 	input_seqs=`grep "Total number seqs written" split_libraries/split_library_log.txt | cut -f2`
 	echo "$written_seqs out of $input_seqs input sequences written.
@@ -1371,54 +1354,46 @@ wait
 
 if [[ ! -f $otutable_dir/n2_table_hdf5.biom ]] && [[ ! -f $otutable_dir/n2_table_CSS.biom ]] && [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]] && [[ ! -f $otutable_dir/mc2_table_CSS.biom ]] && [[ ! -f $otutable_dir/005_table_hdf5.biom ]] && [[ ! -f $otutable_dir/005_table_CSS.biom ]] && [[ ! -f $otutable_dir/03_table_hdf5.biom ]] && [[ ! -f $otutable_dir/03_table_CSS.biom ]]; then
 
+	## filter singletons by sample (n2), singletons by table (mc2), table by
+	## 0.005 percent (005) and at 0.3% by sample (03) from one table load
+	sweep=""
 	if [[ ! -f $otutable_dir/n2_table_hdf5.biom ]]; then
-	## filter singletons by sample and normalize
-	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir/n2_table0.biom -n 1
-	filter_otus_from_otu_table.py -i $otutable_dir/n2_table0.biom -o $otutable_dir/n2_table.biom -n 1 -s 2
-	biom convert -i $otutable_dir/n2_table.biom -o $otutable_dir/n2_table_hdf5.biom --table-type="OTU table" --to-hdf5
+	sweep="$sweep n2_table_hdf5.biom:n=1,mc=1"
+	fi
+	if [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]]; then
+	sweep="$sweep mc2_table_hdf5.biom:mc=2"
+	fi
+	if [[ ! -f $otutable_dir/005_table_hdf5.biom ]]; then
+	sweep="$sweep 005_table_hdf5.biom:mf=0.00005"
+	fi
+	if [[ ! -f $otutable_dir/03_table_hdf5.biom ]]; then
+	sweep="$sweep 03_table_hdf5.biom:f=0.003,mc=1"
+	fi
+	if [[ ! -z $sweep ]]; then
+	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir -s 2 --sweep $sweep
 	fi
 wait
+	## normalize
 	if [[ ! -f $otutable_dir/n2_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/n2_table_hdf5.biom -o $otutable_dir/n2_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter singletons by table and normalize
-	if [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]]; then
-	filter_otus_from_otu_table.py -i $otutable_dir/min100_table.biom -o $otutable_dir/mc2_table_hdf5.biom -n 2 -s 2
-	fi
 wait
 	if [[ ! -f $otutable_dir/mc2_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/mc2_table_hdf5.biom -o $otutable_dir/mc2_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter table by 0.005 percent and normalize
-	if [[ ! -f $otutable_dir/005_table_hdf5.biom ]]; then
-	filter_otus_from_otu_table.py -i $otutable_dir/min100_table.biom -o $otutable_dir/005_table_hdf5.biom --min_count_fraction 0.00005 -s 2
-	fi
 wait
 	if [[ ! -f $otutable_dir/005_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/005_table_hdf5.biom -o $otutable_dir/005_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter at 0.3% by sample and normalize
-	if [[ ! -f $otutable_dir/03_table_hdf5.biom ]]; then
-	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir/03_table0.biom -f -n 0.003
-	filter_otus_from_otu_table.py -i $otutable_dir/03_table0.biom -o $otutable_dir/03_table.biom -n 1 -s 2
-	biom convert -i $otutable_dir/03_table.biom -o $otutable_dir/03_table_hdf5.biom --table-type="OTU table" --to-hdf5
-	fi
 wait
 	if [[ ! -f $otutable_dir/03_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/03_table_hdf5.biom -o $otutable_dir/03_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
 wait
-	rm $otutable_dir/03_table0.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/03_table.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/n2_table0.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/n2_table.biom >/dev/null 2>&1 || true
 
 ## Summarize raw otu tables
 
-	biom-summarize_folder.sh $otutable_dir >/dev/null
+	biom-summarize_folder.sh $otutable_dir $CPU_cores >/dev/null
 	written_seqs=`grep "Total count:" $otutable_dir/n2_table_hdf5.summary | cut -d" " -f3`
 	input_seqs=`grep "Total number seqs written" split_libraries/split_library_log.txt | cut -f2`
 	echo "$written_seqs out of $input_seqs input sequences written.
@@ -1727,54 +1702,46 @@ wait
 
 if [[ ! -f $otutable_dir/n2_table_hdf5.biom ]] && [[ ! -f $otutable_dir/n2_table_CSS.biom ]] && [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]] && [[ ! -f $otutable_dir/mc2_table_CSS.biom ]] && [[ ! -f $otutable_dir/005_table_hdf5.biom ]] && [[ ! -f $otutable_dir/005_table_CSS.biom ]] && [[ ! -f $otutable_dir/03_table_hdf5.biom ]] && [[ ! -f $otutable_dir/03_table_CSS.biom ]]; then
 
+	## filter singletons by sample (n2), singletons by table (mc2), table by
+	## 0.005 percent (005) and at 0.3% by sample (03) from one table load
+	sweep=""
 	if [[ ! -f $otutable_dir/n2_table_hdf5.biom ]]; then
-	## filter singletons by sample and normalize
-	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir/n2_table0.biom -n 1
-	filter_otus_from_otu_table.py -i $otutable_dir/n2_table0.biom -o $otutable_dir/n2_table.biom -n 1 -s 2
-	biom convert -i $otutable_dir/n2_table.biom -o $otutable_dir/n2_table_hdf5.biom --table-type="OTU table" --to-hdf5
+	sweep="$sweep n2_table_hdf5.biom:n=1,mc=1"
+	fi
+	if [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]]; then
+	sweep="$sweep mc2_table_hdf5.biom:mc=2"
+	fi
+	if [[ ! -f $otutable_dir/005_table_hdf5.biom ]]; then
+	sweep="$sweep 005_table_hdf5.biom:mf=0.00005"
+	fi
+	if [[ ! -f $otutable_dir/03_table_hdf5.biom ]]; then
+	sweep="$sweep 03_table_hdf5.biom:f=0.003,mc=1"
+	fi
+	if [[ ! -z $sweep ]]; then
+	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir -s 2 --sweep $sweep
 	fi
 wait
+	## normalize
 	if [[ ! -f $otutable_dir/n2_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/n2_table_hdf5.biom -o $otutable_dir/n2_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter singletons by table and normalize
-	if [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]]; then
-	filter_otus_from_otu_table.py -i $otutable_dir/min100_table.biom -o $otutable_dir/mc2_table_hdf5.biom -n 2 -s 2
-	fi
 wait
 	if [[ ! -f $otutable_dir/mc2_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/mc2_table_hdf5.biom -o $otutable_dir/mc2_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter table by 0.005 percent and normalize
-	if [[ ! -f $otutable_dir/005_table_hdf5.biom ]]; then
-	filter_otus_from_otu_table.py -i $otutable_dir/min100_table.biom -o $otutable_dir/005_table_hdf5.biom --min_count_fraction 0.00005 -s 2
-	fi
 wait
 	if [[ ! -f $otutable_dir/005_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/005_table_hdf5.biom -o $otutable_dir/005_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter at 0.3% by sample and normalize
-	if [[ ! -f $otutable_dir/03_table_hdf5.biom ]]; then
-	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir/03_table0.biom -f -n 0.003
-	filter_otus_from_otu_table.py -i $otutable_dir/03_table0.biom -o $otutable_dir/03_table.biom -n 1 -s 2
-	biom convert -i $otutable_dir/03_table.biom -o $otutable_dir/03_table_hdf5.biom --table-type="OTU table" --to-hdf5
-	fi
 wait
 	if [[ ! -f $otutable_dir/03_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/03_table_hdf5.biom -o $otutable_dir/03_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
 wait
-	rm $otutable_dir/03_table0.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/03_table.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/n2_table0.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/n2_table.biom >/dev/null 2>&1 || true
 
 ## Summarize raw otu tables
 
-	biom-summarize_folder.sh $otutable_dir >/dev/null
+	biom-summarize_folder.sh $otutable_dir $CPU_cores >/dev/null
 	written_seqs=`grep "Total count:" $otutable_dir/n2_table_hdf5.summary | cut -d" " -f3`
 	input_seqs=`grep "Total number seqs written" split_libraries/split_library_log.txt | cut -f2`
 	echo "$written_seqs out of $input_seqs input sequences written.
@@ -1924,54 +1891,46 @@ wait
 
 if [[ ! -f $otutable_dir/n2_table_hdf5.biom ]] && [[ ! -f $otutable_dir/n2_table_CSS.biom ]] && [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]] && [[ ! -f $otutable_dir/mc2_table_CSS.biom ]] && [[ ! -f $otutable_dir/005_table_hdf5.biom ]] && [[ ! -f $otutable_dir/005_table_CSS.biom ]] && [[ ! -f $otutable_dir/03_table_hdf5.biom ]] && [[ ! -f $otutable_dir/03_table_CSS.biom ]]; then
 
+	## filter singletons by sample (n2), singletons by table (mc2), table by
+	## 0.005 percent (005) and at 0.3% by sample (03) from one table load
+	sweep=""
 	if [[ ! -f $otutable_dir/n2_table_hdf5.biom ]]; then
-	## filter singletons by sample and normalize
-	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir/n2_table0.biom -n 1
-	filter_otus_from_otu_table.py -i $otutable_dir/n2_table0.biom -o $otutable_dir/n2_table.biom -n 1 -s 2
-	biom convert -i $otutable_dir/n2_table.biom -o $otutable_dir/n2_table_hdf5.biom --table-type="OTU table" --to-hdf5
+	sweep="$sweep n2_table_hdf5.biom:n=1,mc=1"
+	fi
+	if [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]]; then
+	sweep="$sweep mc2_table_hdf5.biom:mc=2"
+	fi
+	if [[ ! -f $otutable_dir/005_table_hdf5.biom ]]; then
+	sweep="$sweep 005_table_hdf5.biom:mf=0.00005"
+	fi
+	if [[ ! -f $otutable_dir/03_table_hdf5.biom ]]; then
+	sweep="$sweep 03_table_hdf5.biom:f=0.003,mc=1"
+	fi
+	if [[ ! -z $sweep ]]; then
+	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir -s 2 --sweep $sweep
 	fi
 wait
+	## normalize
 	if [[ ! -f $otutable_dir/n2_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/n2_table_hdf5.biom -o $otutable_dir/n2_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter singletons by table and normalize
-	if [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]]; then
-	filter_otus_from_otu_table.py -i $otutable_dir/min100_table.biom -o $otutable_dir/mc2_table_hdf5.biom -n 2 -s 2
-	fi
 wait
 	if [[ ! -f $otutable_dir/mc2_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/mc2_table_hdf5.biom -o $otutable_dir/mc2_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter table by 0.005 percent and normalize
-	if [[ ! -f $otutable_dir/005_table_hdf5.biom ]]; then
-	filter_otus_from_otu_table.py -i $otutable_dir/min100_table.biom -o $otutable_dir/005_table_hdf5.biom --min_count_fraction 0.00005 -s 2
-	fi
 wait
 	if [[ ! -f $otutable_dir/005_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/005_table_hdf5.biom -o $otutable_dir/005_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter at 0.3% by sample and normalize
-	if [[ ! -f $otutable_dir/03_table_hdf5.biom ]]; then
-	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir/03_table0.biom -f -n 0.003
-	filter_otus_from_otu_table.py -i $otutable_dir/03_table0.biom -o $otutable_dir/03_table.biom -n 1 -s 2
-	biom convert -i $otutable_dir/03_table.biom -o $otutable_dir/03_table_hdf5.biom --table-type="OTU table" --to-hdf5
-	fi
 wait
 	if [[ ! -f $otutable_dir/03_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/03_table_hdf5.biom -o $otutable_dir/03_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
 wait
-	rm $otutable_dir/03_table0.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/03_table.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/n2_table0.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/n2_table.biom >/dev/null 2>&1 || true
 
 ## Summarize raw otu tables
 
-	biom-summarize_folder.sh $otutable_dir >/dev/null
+	biom-summarize_folder.sh $otutable_dir $CPU_cores >/dev/null
 	written_seqs=`grep "Total count:" $otutable_dir/n2_table_hdf5.summary | cut -d" " -f3`
 	input_seqs=`grep "Total number seqs written" split_libraries/split_library_log.txt | cut -f2`
 	echo "$written_seqs out of $input_seqs input sequences written.
@@ -2112,54 +2071,46 @@ wait
 
 if [[ ! -f $otutable_dir/n2_table_hdf5.biom ]] && [[ ! -f $otutable_dir/n2_table_CSS.biom ]] && [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]] && [[ ! -f $otutable_dir/mc2_table_CSS.biom ]] && [[ ! -f $otutable_dir/005_table_hdf5.biom ]] && [[ ! -f $otutable_dir/005_table_CSS.biom ]] && [[ ! -f $otutable_dir/03_table_hdf5.biom ]] && [[ ! -f $otutable_dir/03_table_CSS.biom ]]; then
 
+	## filter singletons by sample (n2), singletons by table (mc2), table by
+	## 0.005 percent (005) and at 0.3% by sample (03) from one table load
+	sweep=""
 	if [[ ! -f $otutable_dir/n2_table_hdf5.biom ]]; then
-	## filter singletons by sample and normalize
-	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir/n2_table0.biom -n 1
-	filter_otus_from_otu_table.py -i $otutable_dir/n2_table0.biom -o $otutable_dir/n2_table.biom -n 1 -s 2
-	biom convert -i $otutable_dir/n2_table.biom -o $otutable_dir/n2_table_hdf5.biom --table-type="OTU table" --to-hdf5
+	sweep="$sweep n2_table_hdf5.biom:n=1,mc=1"
+	fi
+	if [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]]; then
+	sweep="$sweep mc2_table_hdf5.biom:mc=2"
+	fi
+	if [[ ! -f $otutable_dir/005_table_hdf5.biom ]]; then
+	sweep="$sweep 005_table_hdf5.biom:mf=0.00005"
+	fi
+	if [[ ! -f $otutable_dir/03_table_hdf5.biom ]]; then
+	sweep="$sweep 03_table_hdf5.biom:f=0.003,mc=1"
+	fi
+	if [[ ! -z $sweep ]]; then
+	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir -s 2 --sweep $sweep
 	fi
 wait
+	## normalize
 	if [[ ! -f $otutable_dir/n2_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/n2_table_hdf5.biom -o $otutable_dir/n2_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter singletons by table and normalize
-	if [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]]; then
-	filter_otus_from_otu_table.py -i $otutable_dir/min100_table.biom -o $otutable_dir/mc2_table_hdf5.biom -n 2 -s 2
-	fi
 wait
 	if [[ ! -f $otutable_dir/mc2_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/mc2_table_hdf5.biom -o $otutable_dir/mc2_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter table by 0.005 percent and normalize
-	if [[ ! -f $otutable_dir/005_table_hdf5.biom ]]; then
-	filter_otus_from_otu_table.py -i $otutable_dir/min100_table.biom -o $otutable_dir/005_table_hdf5.biom --min_count_fraction 0.00005 -s 2
-	fi
 wait
 	if [[ ! -f $otutable_dir/005_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/005_table_hdf5.biom -o $otutable_dir/005_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter at 0.3% by sample and normalize
-	if [[ ! -f $otutable_dir/03_table_hdf5.biom ]]; then
-	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir/03_table0.biom -f -n 0.003
-	filter_otus_from_otu_table.py -i $otutable_dir/03_table0.biom -o $otutable_dir/03_table.biom -n 1 -s 2
-	biom convert -i $otutable_dir/03_table.biom -o $otutable_dir/03_table_hdf5.biom --table-type="OTU table" --to-hdf5
-	fi
 wait
 	if [[ ! -f $otutable_dir/03_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/03_table_hdf5.biom -o $otutable_dir/03_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
 wait
-	rm $otutable_dir/03_table0.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/03_table.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/n2_table0.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/n2_table.biom >/dev/null 2>&1 || true
 
 ## Summarize raw otu tables
 
-	biom-summarize_folder.sh $otutable_dir >/dev/null
+	biom-summarize_folder.sh $otutable_dir $CPU_cores >/dev/null
 	written_seqs=`grep "Total count:" $otutable_dir/n2_table_hdf5.summary | cut -d" " -f3`
 	input_seqs=`grep "Total number seqs written" split_libraries/split_library_log.txt | cut -f2`
 	echo "$written_seqs out of $input_seqs input sequences written.
@@ -2471,54 +2422,46 @@ wait
 
 if [[ ! -f $otutable_dir/n2_table_hdf5.biom ]] && [[ ! -f $otutable_dir/n2_table_CSS.biom ]] && [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]] && [[ ! -f $otutable_dir/mc2_table_CSS.biom ]] && [[ ! -f $otutable_dir/005_table_hdf5.biom ]] && [[ ! -f $otutable_dir/005_table_CSS.biom ]] && [[ ! -f $otutable_dir/03_table_hdf5.biom ]] && [[ ! -f $otutable_dir/03_table_CSS.biom ]]; then
 
+	## filter singletons by sample (n2), singletons by table (mc2), table by
+	## 0.005 percent (005) and at 0.3% by sample (03) from one table load
+	sweep=""
 	if [[ ! -f $otutable_dir/n2_table_hdf5.biom ]]; then
-	## filter singletons by sample and normalize
-	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir/n2_table0.biom -n 1
-	filter_otus_from_otu_table.py -i $otutable_dir/n2_table0.biom -o $otutable_dir/n2_table.biom -n 1 -s 2
-	biom convert -i $otutable_dir/n2_table.biom -o $otutable_dir/n2_table_hdf5.biom --table-type="OTU table" --to-hdf5
+	sweep="$sweep n2_table_hdf5.biom:n=1,mc=1"
+	fi
+	if [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]]; then
+	sweep="$sweep mc2_table_hdf5.biom:mc=2"
+	fi
+	if [[ ! -f $otutable_dir/005_table_hdf5.biom ]]; then
+	sweep="$sweep 005_table_hdf5.biom:mf=0.00005"
+	fi
+	if [[ ! -f $otutable_dir/03_table_hdf5.biom ]]; then
+	sweep="$sweep 03_table_hdf5.biom:f=0.003,mc=1"
+	fi
+	if [[ ! -z $sweep ]]; then
+	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir -s 2 --sweep $sweep
 	fi
 wait
+	## normalize
 	if [[ ! -f $otutable_dir/n2_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/n2_table_hdf5.biom -o $otutable_dir/n2_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter singletons by table and normalize
-	if [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]]; then
-	filter_otus_from_otu_table.py -i $otutable_dir/min100_table.biom -o $otutable_dir/mc2_table_hdf5.biom -n 2 -s 2
-	fi
 wait
 	if [[ ! -f $otutable_dir/mc2_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/mc2_table_hdf5.biom -o $otutable_dir/mc2_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter table by 0.005 percent and normalize
-	if [[ ! -f $otutable_dir/005_table_hdf5.biom ]]; then
-	filter_otus_from_otu_table.py -i $otutable_dir/min100_table.biom -o $otutable_dir/005_table_hdf5.biom --min_count_fraction 0.00005 -s 2
-	fi
 wait
 	if [[ ! -f $otutable_dir/005_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/005_table_hdf5.biom -o $otutable_dir/005_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter at 0.3% by sample and normalize
-	if [[ ! -f $otutable_dir/03_table_hdf5.biom ]]; then
-	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir/03_table0.biom -f -n 0.003
-	filter_otus_from_otu_table.py -i $otutable_dir/03_table0.biom -o $otutable_dir/03_table.biom -n 1 -s 2
-	biom convert -i $otutable_dir/03_table.biom -o $otutable_dir/03_table_hdf5.biom --table-type="OTU table" --to-hdf5
-	fi
 wait
 	if [[ ! -f $otutable_dir/03_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/03_table_hdf5.biom -o $otutable_dir/03_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
 wait
-	rm $otutable_dir/03_table0.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/03_table.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/n2_table0.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/n2_table.biom >/dev/null 2>&1 || true
 
 ## Summarize raw otu tables
 
-	biom-summarize_folder.sh $otutable_dir >/dev/null
+	biom-summarize_folder.sh $otutable_dir $CPU_cores >/dev/null
 	written_seqs=`grep "Total count:" $otutable_dir/n2_table_hdf5.summary | cut -d" " -f3`
 	input_seqs=`grep "Total number seqs written" split_libraries/split_library_log.txt | cut -f2`
 	echo "$written_seqs out of $input_seqs input sequences written.
@@ -2668,54 +2611,46 @@ wait
 
 if [[ ! -f $otutable_dir/n2_table_hdf5.biom ]] && [[ ! -f $otutable_dir/n2_table_CSS.biom ]] && [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]] && [[ ! -f $otutable_dir/mc2_table_CSS.biom ]] && [[ ! -f $otutable_dir/005_table_hdf5.biom ]] && [[ ! -f $otutable_dir/005_table_CSS.biom ]] && [[ ! -f $otutable_dir/03_table_hdf5.biom ]] && [[ ! -f $otutable_dir/03_table_CSS.biom ]]; then
 
+	## filter singletons by sample (n2), singletons by table (mc2), table by
+	## 0.005 percent (005) and at 0.3% by sample (03) from one table load
+	sweep=""
 	if [[ ! -f $otutable_dir/n2_table_hdf5.biom ]]; then
-	## filter singletons by sample and normalize
-	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir/n2_table0.biom -n 1
-	filter_otus_from_otu_table.py -i $otutable_dir/n2_table0.biom -o $otutable_dir/n2_table.biom -n 1 -s 2
-	biom convert -i $otutable_dir/n2_table.biom -o $otutable_dir/n2_table_hdf5.biom --table-type="OTU table" --to-hdf5
+	sweep="$sweep n2_table_hdf5.biom:n=1,mc=1"
+	fi
+	if [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]]; then
+	sweep="$sweep mc2_table_hdf5.biom:mc=2"
+	fi
+	if [[ ! -f $otutable_dir/005_table_hdf5.biom ]]; then
+	sweep="$sweep 005_table_hdf5.biom:mf=0.00005"
+	fi
+	if [[ ! -f $otutable_dir/03_table_hdf5.biom ]]; then
+	sweep="$sweep 03_table_hdf5.biom:f=0.003,mc=1"
+	fi
+	if [[ ! -z $sweep ]]; then
+	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir -s 2 --sweep $sweep
 	fi
 wait
+	## normalize
 	if [[ ! -f $otutable_dir/n2_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/n2_table_hdf5.biom -o $otutable_dir/n2_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter singletons by table and normalize
-	if [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]]; then
-	filter_otus_from_otu_table.py -i $otutable_dir/min100_table.biom -o $otutable_dir/mc2_table_hdf5.biom -n 2 -s 2
-	fi
 wait
 	if [[ ! -f $otutable_dir/mc2_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/mc2_table_hdf5.biom -o $otutable_dir/mc2_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter table by 0.005 percent and normalize
-	if [[ ! -f $otutable_dir/005_table_hdf5.biom ]]; then
-	filter_otus_from_otu_table.py -i $otutable_dir/min100_table.biom -o $otutable_dir/005_table_hdf5.biom --min_count_fraction 0.00005 -s 2
-	fi
 wait
 	if [[ ! -f $otutable_dir/005_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/005_table_hdf5.biom -o $otutable_dir/005_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter at 0.3% by sample and normalize
-	if [[ ! -f $otutable_dir/03_table_hdf5.biom ]]; then
-	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir/03_table0.biom -f -n 0.003
-	filter_otus_from_otu_table.py -i $otutable_dir/03_table0.biom -o $otutable_dir/03_table.biom -n 1 -s 2
-	biom convert -i $otutable_dir/03_table.biom -o $otutable_dir/03_table_hdf5.biom --table-type="OTU table" --to-hdf5
-	fi
 wait
 	if [[ ! -f $otutable_dir/03_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/03_table_hdf5.biom -o $otutable_dir/03_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
 wait
-	rm $otutable_dir/03_table0.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/03_table.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/n2_table0.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/n2_table.biom >/dev/null 2>&1 || true
 
 ## Summarize raw otu tables
 
-	biom-summarize_folder.sh $otutable_dir >/dev/null
+	biom-summarize_folder.sh $otutable_dir $CPU_cores >/dev/null
 	written_seqs=`grep "Total count:" $otutable_dir/n2_table_hdf5.summary | cut -d" " -f3`
 	input_seqs=`grep "Total number seqs written" split_libraries/split_library_log.txt | cut -f2`
 	echo "$written_seqs out of $input_seqs input sequences written.
@@ -2856,54 +2791,46 @@ wait
 
 if [[ ! -f $otutable_dir/n2_table_hdf5.biom ]] && [[ ! -f $otutable_dir/n2_table_CSS.biom ]] && [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]] && [[ ! -f $otutable_dir/mc2_table_CSS.biom ]] && [[ ! -f $otutable_dir/005_table_hdf5.biom ]] && [[ ! -f $otutable_dir/005_table_CSS.biom ]] && [[ ! -f $otutable_dir/03_table_hdf5.biom ]] && [[ ! -f $otutable_dir/03_table_CSS.biom ]]; then
 
+	## filter singletons by sample (n2), singletons by table (mc2), table by
+	## 0.005 percent (005) and at 0.3% by sample (03) from one table load
+	sweep=""
 	if [[ ! -f $otutable_dir/n2_table_hdf5.biom ]]; then
-	## filter singletons by sample and normalize
-	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir/n2_table0.biom -n 1
-	filter_otus_from_otu_table.py -i $otutable_dir/n2_table0.biom -o $otutable_dir/n2_table.biom -n 1 -s 2
-	biom convert -i $otutable_dir/n2_table.biom -o $otutable_dir/n2_table_hdf5.biom --table-type="OTU table" --to-hdf5
+	sweep="$sweep n2_table_hdf5.biom:n=1,mc=1"
+	fi
+	if [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]]; then
+	sweep="$sweep mc2_table_hdf5.biom:mc=2"
+	fi
+	if [[ ! -f $otutable_dir/005_table_hdf5.biom ]]; then
+	sweep="$sweep 005_table_hdf5.biom:mf=0.00005"
+	fi
+	if [[ ! -f $otutable_dir/03_table_hdf5.biom ]]; then
+	sweep="$sweep 03_table_hdf5.biom:f=0.003,mc=1"
+	fi
+	if [[ ! -z $sweep ]]; then
+	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir -s 2 --sweep $sweep
 	fi
 wait
+	## normalize
 	if [[ ! -f $otutable_dir/n2_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/n2_table_hdf5.biom -o $otutable_dir/n2_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter singletons by table and normalize
-	if [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]]; then
-	filter_otus_from_otu_table.py -i $otutable_dir/min100_table.biom -o $otutable_dir/mc2_table_hdf5.biom -n 2 -s 2
-	fi
 wait
 	if [[ ! -f $otutable_dir/mc2_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/mc2_table_hdf5.biom -o $otutable_dir/mc2_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter table by 0.005 percent and normalize
-	if [[ ! -f $otutable_dir/005_table_hdf5.biom ]]; then
-	filter_otus_from_otu_table.py -i $otutable_dir/min100_table.biom -o $otutable_dir/005_table_hdf5.biom --min_count_fraction 0.00005 -s 2
-	fi
 wait
 	if [[ ! -f $otutable_dir/005_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/005_table_hdf5.biom -o $otutable_dir/005_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter at 0.3% by sample and normalize
-	if [[ ! -f $otutable_dir/03_table_hdf5.biom ]]; then
-	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir/03_table0.biom -f -n 0.003
-	filter_otus_from_otu_table.py -i $otutable_dir/03_table0.biom -o $otutable_dir/03_table.biom -n 1 -s 2
-	biom convert -i $otutable_dir/03_table.biom -o $otutable_dir/03_table_hdf5.biom --table-type="OTU table" --to-hdf5
-	fi
 wait
 	if [[ ! -f $otutable_dir/03_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/03_table_hdf5.biom -o $otutable_dir/03_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
 wait
-	rm $otutable_dir/03_table0.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/03_table.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/n2_table0.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/n2_table.biom >/dev/null 2>&1 || true
 
 ## Summarize raw otu tables
 
-	biom-summarize_folder.sh $otutable_dir >/dev/null
+	biom-summarize_folder.sh $otutable_dir $CPU_cores >/dev/null
 	written_seqs=`grep "Total count:" $otutable_dir/n2_table_hdf5.summary | cut -d" " -f3`
 	input_seqs=`grep "Total number seqs written" split_libraries/split_library_log.txt | cut -f2`
 	echo "$written_seqs out of $input_seqs input sequences written.
@@ -3248,54 +3175,46 @@ wait
 
 if [[ ! -f $otutable_dir/n2_table_hdf5.biom ]] && [[ ! -f $otutable_dir/n2_table_CSS.biom ]] && [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]] && [[ ! -f $otutable_dir/mc2_table_CSS.biom ]] && [[ ! -f $otutable_dir/005_table_hdf5.biom ]] && [[ ! -f $otutable_dir/005_table_CSS.biom ]] && [[ ! -f $otutable_dir/03_table_hdf5.biom ]] && [[ ! -f $otutable_dir/03_table_CSS.biom ]]; then
 
+	## filter singletons by sample (n2), singletons by table (mc2), table by
+	## 0.005 percent (005) and at 0.3% by sample (03) from one table load
+	sweep=""
 	if [[ ! -f $otutable_dir/n2_table_hdf5.biom ]]; then
-	## filter singletons by sample and normalize
-	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir/n2_table0.biom -n 1
-	filter_otus_from_otu_table.py -i $otutable_dir/n2_table0.biom -o $otutable_dir/n2_table.biom -n 1 -s 2
-	biom convert -i $otutable_dir/n2_table.biom -o $otutable_dir/n2_table_hdf5.biom --table-type="OTU table" --to-hdf5
+	sweep="$sweep n2_table_hdf5.biom:n=1,mc=1"
+	fi
+	if [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]]; then
+	sweep="$sweep mc2_table_hdf5.biom:mc=2"
+	fi
+	if [[ ! -f $otutable_dir/005_table_hdf5.biom ]]; then
+	sweep="$sweep 005_table_hdf5.biom:mf=0.00005"
+	fi
+	if [[ ! -f $otutable_dir/03_table_hdf5.biom ]]; then
+	sweep="$sweep 03_table_hdf5.biom:f=0.003,mc=1"
+	fi
+	if [[ ! -z $sweep ]]; then
+	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir -s 2 --sweep $sweep
 	fi
 wait
+	## normalize
 	if [[ ! -f $otutable_dir/n2_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/n2_table_hdf5.biom -o $otutable_dir/n2_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter singletons by table and normalize
-	if [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]]; then
-	filter_otus_from_otu_table.py -i $otutable_dir/min100_table.biom -o $otutable_dir/mc2_table_hdf5.biom -n 2 -s 2
-	fi
 wait
 	if [[ ! -f $otutable_dir/mc2_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/mc2_table_hdf5.biom -o $otutable_dir/mc2_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter table by 0.005 percent and normalize
-	if [[ ! -f $otutable_dir/005_table_hdf5.biom ]]; then
-	filter_otus_from_otu_table.py -i $otutable_dir/min100_table.biom -o $otutable_dir/005_table_hdf5.biom --min_count_fraction 0.00005 -s 2
-	fi
 wait
 	if [[ ! -f $otutable_dir/005_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/005_table_hdf5.biom -o $otutable_dir/005_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter at 0.3% by sample and normalize
-	if [[ ! -f $otutable_dir/03_table_hdf5.biom ]]; then
-	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir/03_table0.biom -f -n 0.003
-	filter_otus_from_otu_table.py -i $otutable_dir/03_table0.biom -o $otutable_dir/03_table.biom -n 1 -s 2
-	biom convert -i $otutable_dir/03_table.biom -o $otutable_dir/03_table_hdf5.biom --table-type="OTU table" --to-hdf5
-	fi
 wait
 	if [[ ! -f $otutable_dir/03_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/03_table_hdf5.biom -o $otutable_dir/03_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
 wait
-	rm $otutable_dir/03_table0.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/03_table.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/n2_table0.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/n2_table.biom >/dev/null 2>&1 || true
 
 ## Summarize raw otu tables
 
-	biom-summarize_folder.sh $otutable_dir >/dev/null
+	biom-summarize_folder.sh $otutable_dir $CPU_cores >/dev/null
 	written_seqs=`grep "Total count:" $otutable_dir/n2_table_hdf5.summary | cut -d" " -f3`
 	input_seqs=`grep "Total number seqs written" split_libraries/split_library_log.txt | cut -f2`
 	echo "$written_seqs out of $input_seqs input sequences written.
@@ -3445,54 +3364,46 @@ wait
 
 if [[ ! -f $otutable_dir/n2_table_hdf5.biom ]] && [[ ! -f $otutable_dir/n2_table_CSS.biom ]] && [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]] && [[ ! -f $otutable_dir/mc2_table_CSS.biom ]] && [[ ! -f $otutable_dir/005_table_hdf5.biom ]] && [[ ! -f $otutable_dir/005_table_CSS.biom ]] && [[ ! -f $otutable_dir/03_table_hdf5.biom ]] && [[ ! -f $otutable_dir/03_table_CSS.biom ]]; then
 
+	## filter singletons by sample (n2), singletons by table (mc2), table by
+	## 0.005 percent (005) and at 0.3% by sample (03) from one table load
+	sweep=""
 	if [[ ! -f $otutable_dir/n2_table_hdf5.biom ]]; then
-	## filter singletons by sample and normalize
-	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir/n2_table0.biom -n 1
-	filter_otus_from_otu_table.py -i $otutable_dir/n2_table0.biom -o $otutable_dir/n2_table.biom -n 1 -s 2
-	biom convert -i $otutable_dir/n2_table.biom -o $otutable_dir/n2_table_hdf5.biom --table-type="OTU table" --to-hdf5
+	sweep="$sweep n2_table_hdf5.biom:n=1,mc=1"
+	fi
+	if [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]]; then
+	sweep="$sweep mc2_table_hdf5.biom:mc=2"
+	fi
+	if [[ ! -f $otutable_dir/005_table_hdf5.biom ]]; then
+	sweep="$sweep 005_table_hdf5.biom:mf=0.00005"
+	fi
+	if [[ ! -f $otutable_dir/03_table_hdf5.biom ]]; then
+	sweep="$sweep 03_table_hdf5.biom:f=0.003,mc=1"
+	fi
+	if [[ ! -z $sweep ]]; then
+	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir -s 2 --sweep $sweep
 	fi
 wait
+	## normalize
 	if [[ ! -f $otutable_dir/n2_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/n2_table_hdf5.biom -o $otutable_dir/n2_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter singletons by table and normalize
-	if [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]]; then
-	filter_otus_from_otu_table.py -i $otutable_dir/min100_table.biom -o $otutable_dir/mc2_table_hdf5.biom -n 2 -s 2
-	fi
 wait
 	if [[ ! -f $otutable_dir/mc2_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/mc2_table_hdf5.biom -o $otutable_dir/mc2_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter table by 0.005 percent and normalize
-	if [[ ! -f $otutable_dir/005_table_hdf5.biom ]]; then
-	filter_otus_from_otu_table.py -i $otutable_dir/min100_table.biom -o $otutable_dir/005_table_hdf5.biom --min_count_fraction 0.00005 -s 2
-	fi
 wait
 	if [[ ! -f $otutable_dir/005_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/005_table_hdf5.biom -o $otutable_dir/005_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter at 0.3% by sample and normalize
-	if [[ ! -f $otutable_dir/03_table_hdf5.biom ]]; then
-	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir/03_table0.biom -f -n 0.003
-	filter_otus_from_otu_table.py -i $otutable_dir/03_table0.biom -o $otutable_dir/03_table.biom -n 1 -s 2
-	biom convert -i $otutable_dir/03_table.biom -o $otutable_dir/03_table_hdf5.biom --table-type="OTU table" --to-hdf5
-	fi
 wait
 	if [[ ! -f $otutable_dir/03_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/03_table_hdf5.biom -o $otutable_dir/03_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
 wait
-	rm $otutable_dir/03_table0.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/03_table.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/n2_table0.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/n2_table.biom >/dev/null 2>&1 || true
 
 ## Summarize raw otu tables
 
-	biom-summarize_folder.sh $otutable_dir >/dev/null
+	biom-summarize_folder.sh $otutable_dir $CPU_cores >/dev/null
 	written_seqs=`grep "Total count:" $otutable_dir/n2_table_hdf5.summary | cut -d" " -f3`
 	input_seqs=`grep "Total number seqs written" split_libraries/split_library_log.txt | cut -f2`
 	echo "$written_seqs out of $input_seqs input sequences written.
@@ -3635,54 +3546,46 @@ wait
 
 if [[ ! -f $otutable_dir/n2_table_hdf5.biom ]] && [[ ! -f $otutable_dir/n2_table_CSS.biom ]] && [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]] && [[ ! -f $otutable_dir/mc2_table_CSS.biom ]] && [[ ! -f $otutable_dir/005_table_hdf5.biom ]] && [[ ! -f $otutable_dir/005_table_CSS.biom ]] && [[ ! -f $otutable_dir/03_table_hdf5.biom ]] && [[ ! -f $otutable_dir/03_table_CSS.biom ]]; then
 
+	## filter singletons by sample (n2), singletons by table (mc2), table by
+	## 0.005 percent (005) and at 0.3% by sample (03) from one table load
+	sweep=""
 	if [[ ! -f $otutable_dir/n2_table_hdf5.biom ]]; then
-	## filter singletons by sample and normalize
-	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir/n2_table0.biom -n 1
-	filter_otus_from_otu_table.py -i $otutable_dir/n2_table0.biom -o $otutable_dir/n2_table.biom -n 1 -s 2
-	biom convert -i $otutable_dir/n2_table.biom -o $otutable_dir/n2_table_hdf5.biom --table-type="OTU table" --to-hdf5
+	sweep="$sweep n2_table_hdf5.biom:n=1,mc=1"
+	fi
+	if [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]]; then
+	sweep="$sweep mc2_table_hdf5.biom:mc=2"
+	fi
+	if [[ ! -f $otutable_dir/005_table_hdf5.biom ]]; then
+	sweep="$sweep 005_table_hdf5.biom:mf=0.00005"
+	fi
+	if [[ ! -f $otutable_dir/03_table_hdf5.biom ]]; then
+	sweep="$sweep 03_table_hdf5.biom:f=0.003,mc=1"
+	fi
+	if [[ ! -z $sweep ]]; then
+	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir -s 2 --sweep $sweep
 	fi
 wait
+	## normalize
 	if [[ ! -f $otutable_dir/n2_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/n2_table_hdf5.biom -o $otutable_dir/n2_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter singletons by table and normalize
-	if [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]]; then
-	filter_otus_from_otu_table.py -i $otutable_dir/min100_table.biom -o $otutable_dir/mc2_table_hdf5.biom -n 2 -s 2
-	fi
 wait
 	if [[ ! -f $otutable_dir/mc2_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/mc2_table_hdf5.biom -o $otutable_dir/mc2_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter table by 0.005 percent and normalize
-	if [[ ! -f $otutable_dir/005_table_hdf5.biom ]]; then
-	filter_otus_from_otu_table.py -i $otutable_dir/min100_table.biom -o $otutable_dir/005_table_hdf5.biom --min_count_fraction 0.00005 -s 2
-	fi
 wait
 	if [[ ! -f $otutable_dir/005_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/005_table_hdf5.biom -o $otutable_dir/005_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter at 0.3% by sample and normalize
-	if [[ ! -f $otutable_dir/03_table_hdf5.biom ]]; then
-	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir/03_table0.biom -f -n 0.003
-	filter_otus_from_otu_table.py -i $otutable_dir/03_table0.biom -o $otutable_dir/03_table.biom -n 1 -s 2
-	biom convert -i $otutable_dir/03_table.biom -o $otutable_dir/03_table_hdf5.biom --table-type="OTU table" --to-hdf5
-	fi
 wait
 	if [[ ! -f $otutable_dir/03_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/03_table_hdf5.biom -o $otutable_dir/03_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
 wait
-	rm $otutable_dir/03_table0.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/03_table.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/n2_table0.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/n2_table.biom >/dev/null 2>&1 || true
 
 ## Summarize raw otu tables
 
-	biom-summarize_folder.sh $otutable_dir >/dev/null
+	biom-summarize_folder.sh $otutable_dir $CPU_cores >/dev/null
 	written_seqs=`grep "Total count:" $otutable_dir/n2_table_hdf5.summary | cut -d" " -f3`
 	input_seqs=`grep "Total number seqs written" split_libraries/split_library_log.txt | cut -f2`
 	echo "$written_seqs out of $input_seqs input sequences written.
@@ -4064,54 +3967,46 @@ wait
 
 if [[ ! -f $otutable_dir/n2_table_hdf5.biom ]] && [[ ! -f $otutable_dir/n2_table_CSS.biom ]] && [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]] && [[ ! -f $otutable_dir/mc2_table_CSS.biom ]] && [[ ! -f $otutable_dir/005_table_hdf5.biom ]] && [[ ! -f $otutable_dir/005_table_CSS.biom ]] && [[ ! -f $otutable_dir/03_table_hdf5.biom ]] && [[ ! -f $otutable_dir/03_table_CSS.biom ]]; then
 
+	## filter singletons by sample (n2), singletons by table (mc2), table by
+	## 0.005 percent (005) and at 0.3% by sample (03) from one table load
+	sweep=""
 	if [[ ! -f $otutable_dir/n2_table_hdf5.biom ]]; then
-	## filter singletons by sample and normalize
-	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir/n2_table0.biom -n 1
-	filter_otus_from_otu_table.py -i $otutable_dir/n2_table0.biom -o $otutable_dir/n2_table.biom -n 1 -s 2
-	biom convert -i $otutable_dir/n2_table.biom -o $otutable_dir/n2_table_hdf5.biom --table-type="OTU table" --to-hdf5
+	sweep="$sweep n2_table_hdf5.biom:n=1,mc=1"
+	fi
+	if [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]]; then
+	sweep="$sweep mc2_table_hdf5.biom:mc=2"
+	fi
+	if [[ ! -f $otutable_dir/005_table_hdf5.biom ]]; then
+	sweep="$sweep 005_table_hdf5.biom:mf=0.00005"
+	fi
+	if [[ ! -f $otutable_dir/03_table_hdf5.biom ]]; then
+	sweep="$sweep 03_table_hdf5.biom:f=0.003,mc=1"
+	fi
+	if [[ ! -z $sweep ]]; then
+	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir -s 2 --sweep $sweep
 	fi
 wait
+	## normalize
 	if [[ ! -f $otutable_dir/n2_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/n2_table_hdf5.biom -o $otutable_dir/n2_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter singletons by table and normalize
-	if [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]]; then
-	filter_otus_from_otu_table.py -i $otutable_dir/min100_table.biom -o $otutable_dir/mc2_table_hdf5.biom -n 2 -s 2
-	fi
 wait
 	if [[ ! -f $otutable_dir/mc2_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/mc2_table_hdf5.biom -o $otutable_dir/mc2_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter table by 0.005 percent and normalize
-	if [[ ! -f $otutable_dir/005_table_hdf5.biom ]]; then
-	filter_otus_from_otu_table.py -i $otutable_dir/min100_table.biom -o $otutable_dir/005_table_hdf5.biom --min_count_fraction 0.00005 -s 2
-	fi
 wait
 	if [[ ! -f $otutable_dir/005_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/005_table_hdf5.biom -o $otutable_dir/005_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter at 0.3% by sample and normalize
-	if [[ ! -f $otutable_dir/03_table_hdf5.biom ]]; then
-	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir/03_table0.biom -f -n 0.003
-	filter_otus_from_otu_table.py -i $otutable_dir/03_table0.biom -o $otutable_dir/03_table.biom -n 1 -s 2
-	biom convert -i $otutable_dir/03_table.biom -o $otutable_dir/03_table_hdf5.biom --table-type="OTU table" --to-hdf5
-	fi
 wait
 	if [[ ! -f $otutable_dir/03_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/03_table_hdf5.biom -o $otutable_dir/03_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
 wait
-	rm $otutable_dir/03_table0.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/03_table.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/n2_table0.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/n2_table.biom >/dev/null 2>&1 || true
 
 ## Summarize raw otu tables
 
-	biom-summarize_folder.sh $otutable_dir >/dev/null
+	biom-summarize_folder.sh $otutable_dir $CPU_cores >/dev/null
 	written_seqs=`grep "Total count:" $otutable_dir/n2_table_hdf5.summary | cut -d" " -f3`
 	input_seqs=`grep "Total number seqs written" split_libraries/split_library_log.txt | cut -f2`
 	echo "$written_seqs out of $input_seqs input sequences written.
@@ -4261,54 +4156,46 @@ wait
 
 if [[ ! -f $otutable_dir/n2_table_hdf5.biom ]] && [[ ! -f $otutable_dir/n2_table_CSS.biom ]] && [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]] && [[ ! -f $otutable_dir/mc2_table_CSS.biom ]] && [[ ! -f $otutable_dir/005_table_hdf5.biom ]] && [[ ! -f $otutable_dir/005_table_CSS.biom ]] && [[ ! -f $otutable_dir/03_table_hdf5.biom ]] && [[ ! -f $otutable_dir/03_table_CSS.biom ]]; then
 
+	## filter singletons by sample (n2), singletons by table (mc2), table by
+	## 0.005 percent (005) and at 0.3% by sample (03) from one table load
+	sweep=""
 	if [[ ! -f $otutable_dir/n2_table_hdf5.biom ]]; then
-	## filter singletons by sample and normalize
-	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir/n2_table0.biom -n 1
-	filter_otus_from_otu_table.py -i $otutable_dir/n2_table0.biom -o $otutable_dir/n2_table.biom -n 1 -s 2
-	biom convert -i $otutable_dir/n2_table.biom -o $otutable_dir/n2_table_hdf5.biom --table-type="OTU table" --to-hdf5
+	sweep="$sweep n2_table_hdf5.biom:n=1,mc=1"
+	fi
+	if [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]]; then
+	sweep="$sweep mc2_table_hdf5.biom:mc=2"
+	fi
+	if [[ ! -f $otutable_dir/005_table_hdf5.biom ]]; then
+	sweep="$sweep 005_table_hdf5.biom:mf=0.00005"
+	fi
+	if [[ ! -f $otutable_dir/03_table_hdf5.biom ]]; then
+	sweep="$sweep 03_table_hdf5.biom:f=0.003,mc=1"
+	fi
+	if [[ ! -z $sweep ]]; then
+	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir -s 2 --sweep $sweep
 	fi
 wait
+	## normalize
 	if [[ ! -f $otutable_dir/n2_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/n2_table_hdf5.biom -o $otutable_dir/n2_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter singletons by table and normalize
-	if [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]]; then
-	filter_otus_from_otu_table.py -i $otutable_dir/min100_table.biom -o $otutable_dir/mc2_table_hdf5.biom -n 2 -s 2
-	fi
 wait
 	if [[ ! -f $otutable_dir/mc2_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/mc2_table_hdf5.biom -o $otutable_dir/mc2_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter table by 0.005 percent and normalize
-	if [[ ! -f $otutable_dir/005_table_hdf5.biom ]]; then
-	filter_otus_from_otu_table.py -i $otutable_dir/min100_table.biom -o $otutable_dir/005_table_hdf5.biom --min_count_fraction 0.00005 -s 2
-	fi
 wait
 	if [[ ! -f $otutable_dir/005_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/005_table_hdf5.biom -o $otutable_dir/005_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter at 0.3% by sample and normalize
-	if [[ ! -f $otutable_dir/03_table_hdf5.biom ]]; then
-	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir/03_table0.biom -f -n 0.003
-	filter_otus_from_otu_table.py -i $otutable_dir/03_table0.biom -o $otutable_dir/03_table.biom -n 1 -s 2
-	biom convert -i $otutable_dir/03_table.biom -o $otutable_dir/03_table_hdf5.biom --table-type="OTU table" --to-hdf5
-	fi
 wait
 	if [[ ! -f $otutable_dir/03_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/03_table_hdf5.biom -o $otutable_dir/03_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
 wait
-	rm $otutable_dir/03_table0.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/03_table.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/n2_table0.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/n2_table.biom >/dev/null 2>&1 || true
 
 ## Summarize raw otu tables
 
-	biom-summarize_folder.sh $otutable_dir >/dev/null
+	biom-summarize_folder.sh $otutable_dir $CPU_cores >/dev/null
 	written_seqs=`grep "Total count:" $otutable_dir/n2_table_hdf5.summary | cut -d" " -f3`
 	input_seqs=`grep "Total number seqs written" split_libraries/split_library_log.txt | cut -f2`
 	echo "$written_seqs out of $input_seqs input sequences written.
@@ -4451,54 +4338,46 @@ wait
 
 if [[ ! -f $otutable_dir/n2_table_hdf5.biom ]] && [[ ! -f $otutable_dir/n2_table_CSS.biom ]] && [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]] && [[ ! -f $otutable_dir/mc2_table_CSS.biom ]] && [[ ! -f $otutable_dir/005_table_hdf5.biom ]] && [[ ! -f $otutable_dir/005_table_CSS.biom ]] && [[ ! -f $otutable_dir/03_table_hdf5.biom ]] && [[ ! -f $otutable_dir/03_table_CSS.biom ]]; then
 
+	## filter singletons by sample (n2), singletons by table (mc2), table by
+	## 0.005 percent (005) and at 0.3% by sample (03) from one table load
+	sweep=""
 	if [[ ! -f $otutable_dir/n2_table_hdf5.biom ]]; then
-	## filter singletons by sample and normalize
-	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir/n2_table0.biom -n 1
-	filter_otus_from_otu_table.py -i $otutable_dir/n2_table0.biom -o $otutable_dir/n2_table.biom -n 1 -s 2
-	biom convert -i $otutable_dir/n2_table.biom -o $otutable_dir/n2_table_hdf5.biom --table-type="OTU table" --to-hdf5
+	sweep="$sweep n2_table_hdf5.biom:n=1,mc=1"
+	fi
+	if [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]]; then
+	sweep="$sweep mc2_table_hdf5.biom:mc=2"
+	fi
+	if [[ ! -f $otutable_dir/005_table_hdf5.biom ]]; then
+	sweep="$sweep 005_table_hdf5.biom:mf=0.00005"
+	fi
+	if [[ ! -f $otutable_dir/03_table_hdf5.biom ]]; then
+	sweep="$sweep 03_table_hdf5.biom:f=0.003,mc=1"
+	fi
+	if [[ ! -z $sweep ]]; then
+	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir -s 2 --sweep $sweep
 	fi
 wait
+	## normalize
 	if [[ ! -f $otutable_dir/n2_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/n2_table_hdf5.biom -o $otutable_dir/n2_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter singletons by table and normalize
-	if [[ ! -f $otutable_dir/mc2_table_hdf5.biom ]]; then
-	filter_otus_from_otu_table.py -i $otutable_dir/min100_table.biom -o $otutable_dir/mc2_table_hdf5.biom -n 2 -s 2
-	fi
 wait
 	if [[ ! -f $otutable_dir/mc2_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/mc2_table_hdf5.biom -o $otutable_dir/mc2_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter table by 0.005 percent and normalize
-	if [[ ! -f $otutable_dir/005_table_hdf5.biom ]]; then
-	filter_otus_from_otu_table.py -i $otutable_dir/min100_table.biom -o $otutable_dir/005_table_hdf5.biom --min_count_fraction 0.00005 -s 2
-	fi
 wait
 	if [[ ! -f $otutable_dir/005_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/005_table_hdf5.biom -o $otutable_dir/005_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
-wait
-	## filter at 0.3% by sample and normalize
-	if [[ ! -f $otutable_dir/03_table_hdf5.biom ]]; then
-	filter_observations_by_sample.py -i $otutable_dir/min100_table.biom -o $otutable_dir/03_table0.biom -f -n 0.003
-	filter_otus_from_otu_table.py -i $otutable_dir/03_table0.biom -o $otutable_dir/03_table.biom -n 1 -s 2
-	biom convert -i $otutable_dir/03_table.biom -o $otutable_dir/03_table_hdf5.biom --table-type="OTU table" --to-hdf5
-	fi
 wait
 	if [[ ! -f $otutable_dir/03_table_CSS.biom ]]; then
 	normalize_table.py -i $otutable_dir/03_table_hdf5.biom -o $otutable_dir/03_table_CSS.biom -a CSS >/dev/null 2>&1 || true
 	fi
 wait
-	rm $otutable_dir/03_table0.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/03_table.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/n2_table0.biom >/dev/null 2>&1 || true
-	rm $otutable_dir/n2_table.biom >/dev/null 2>&1 || true
 
 ## Summarize raw otu tables
 
-	biom-summarize_folder.sh $otutable_dir >/dev/null
+	biom-summarize_folder.sh $otutable_dir $CPU_cores >/dev/null
 	written_seqs=`grep "Total count:" $otutable_dir/n2_table_hdf5.summary | cut -d" " -f3`
 	input_seqs=`grep "Total number seqs written" split_libraries/split_library_log.txt | cut -f2`
 	echo "$written_seqs out of $input_seqs input sequences written.
@@ -28,26 +28,73 @@ such as a taxonomy mapping file, with QIIME. Reads through the file, and
 removes all characters above decimal value 127. Additionally, asterisk "*"
 characters are removed, as these inhibit the RDP classifier.
 
+Leading and trailing whitespace is stripped from each line, and line endings
+are written as newlines.  The file is read and written in large binary
+blocks, with the characters deleted by one translation of each block.
+
 Usage:
 python parse_nonstandard_chars.py X > Y
-where X is the input file to be parsed, and Y is the output parsed file"""
- 
-from sys import argv
- 
- 
-taxa_mapping = open(argv[1], "U")
- 
-for line in taxa_mapping:
-    curr_line = line.strip()
+where X is the input file to be parsed, and Y is the output parsed file
+
+python parse_nonstandard_chars.py X1 Y1 [X2 Y2 ...]
+parses each input file X into its output file Y, all files at once"""
  
-    try:
-        curr_line.decode('ascii')
-        if "*" in curr_line:
-            raise(ValueError)
-        print curr_line
-    except:
-        fixed_line = ""
-        for n in curr_line:
-            if ord(n) < 128 and n != "*":
-                fixed_line += n
-        print fixed_line
+from multiprocessing import Process
+from sys import argv, exit, stderr, stdout
+
+
+BLOCK_SIZE = 1 << 22
+DELETED_CHARS = "*" + "".join(chr(n) for n in range(128, 256))
+
+
+def parse_nonstandard_chars(input_fp, output_f):
+    """Writes the lines of input_fp to output_f without nonstandard chars"""
+    with open(input_fp, "rb") as input_f:
+        remainder = ""
+        while True:
+            block = input_f.read(BLOCK_SIZE)
+            if not block:
+                break
+            block = remainder + block
+            # A carriage return may be the first half of a CRLF
+            if block.endswith("\r"):
+                remainder = "\r"
+                block = block[:-1]
+            else:
+                remainder = ""
+            lines = block.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+            # Keep the last, unterminated line for the next block
+            remainder = lines.pop() + remainder
+            if lines:
+                lines.append("")
+                output_f.write("\n".join([line.strip() for line in
+                    lines]).translate(None, DELETED_CHARS))
+        lines = remainder.replace("\r", "\n").split("\n")
+        if lines[-1] == "":
+            lines.pop()
+        if lines:
+            lines.append("")
+            output_f.write("\n".join([line.strip() for line in
+                lines]).translate(None, DELETED_CHARS))
+
+
+def parse_to_file(input_fp, output_fp):
+    with open(output_fp, "wb", BLOCK_SIZE) as output_f:
+        parse_nonstandard_chars(input_fp, output_f)
+
+
+if __name__ == "__main__":
+    if len(argv) == 2:
+        parse_nonstandard_chars(argv[1], stdout)
+    elif len(argv) > 2 and len(argv) % 2 == 1:
+        processes = [Process(target=parse_to_file, args=(argv[i], argv[i + 1]))
+            for i in range(1, len(argv), 2)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        if any(process.exitcode for process in processes):
+            exit(1)
+    else:
+        stderr.write(__doc__ + "\n")
+        exit(1)
@@ -28,10 +28,14 @@
 ## Thanks, Bo!
 
 
+from biom import Table
 from biom.parse import load_table
 from biom.util import biom_open
+from multiprocessing import Pool
+from numpy import bincount
 import sys
 import argparse
+import os
 import os.path
 
 parser = argparse.ArgumentParser(description='This is a python script to relativize biom tables')
@@ -42,22 +46,104 @@ def file_choices(choices, fname):
 		parser.error('file must be biom format')
 	return fname
 
-parser.add_argument('-i', type=lambda s:file_choices(('biom','tab'),s), help='Input biom file', action='store', required = True)
+parser.add_argument('-i', type=lambda s:file_choices(('biom','tab'),s), help='Input biom file(s)', action='store', nargs='+', default=[])
+parser.add_argument('-d', '--input_dir', help='Directories searched (with their subdirectories) for biom tables to relativize', action='store', nargs='+', default=[])
+parser.add_argument('-w', '--workers', type=int, help='Number of tables relativized at once (default: 1)', default=1)
+parser.add_argument('-f', '--force', help='Relativize tables whose _relativized.biom file is already newer than the table', action='store_true', default=False)
+parser.add_argument('--compression', choices=('gzip', 'none'), help='HDF5 compression of the output (default: gzip)', default='gzip')
 
-if len(sys.argv)<=1:
-	parser.print_help()
-	sys.exit(1)
+OUTPUT_SUFFIX = '_relativized.biom'
 
-results = parser.parse_args()
 
-print '\nInput file:', results.i
-out = results.i[:-5] + '_relativized.biom'
-	
-t = load_table(results.i)
-normed = t.norm(axis='sample', inplace=False)
+def get_output_path(table_path):
+	return table_path[:-5] + OUTPUT_SUFFIX
 
 
-with biom_open(out, 'w') as f:
-	normed.to_hdf5(f, 'example')
+def find_tables(input_dirs):
+	"""Returns the biom tables under input_dirs, other than relativized ones"""
+	tables = []
+	for input_dir in input_dirs:
+		for dirpath, dirnames, filenames in os.walk(input_dir):
+			dirnames.sort()
+			for filename in sorted(filenames):
+				if filename.endswith('.biom') and not filename.endswith(OUTPUT_SUFFIX):
+					tables.append(os.path.join(dirpath, filename))
+	return tables
 
-print '\n\tSuccess!\n\tOutput file: ' + out + '\n'
+
+def is_up_to_date(table_path):
+	out = get_output_path(table_path)
+	return os.path.exists(out) and os.path.getmtime(out) > os.path.getmtime(table_path)
+
+
+def relativize_table(t):
+	"""Returns a table of the values of each sample divided by the sample total
+
+	Works on the nonzero values of the sparse matrix of the table, with the
+	same result as t.norm(axis='sample', inplace=False).
+	"""
+	matrix = t.matrix_data.tocsr()
+	if matrix.dtype.kind != 'f':
+		matrix = matrix.astype(float)
+	else:
+		matrix = matrix.copy()
+	# Sample (column) totals from the nonzero values only
+	sums = bincount(matrix.indices, weights=matrix.data, minlength=matrix.shape[1])
+	matrix.data /= sums[matrix.indices]
+	return Table(matrix, t.ids('observation'), t.ids(),
+		t.metadata(axis='observation'), t.metadata(), t.table_id, type=t.type,
+		create_date=t.create_date, generated_by=t.generated_by,
+		observation_group_metadata=t.group_metadata(axis='observation'),
+		sample_group_metadata=t.group_metadata())
+
+
+def write_relativized(args):
+	"""Relativizes one table and writes it, args is (table path, gzip compression)"""
+	table_path, compress = args
+	out = get_output_path(table_path)
+	t = relativize_table(load_table(table_path))
+	with biom_open(out, 'w') as f:
+		t.to_hdf5(f, 'example', compress=compress)
+	return out
+
+
+def main():
+	if len(sys.argv)<=1:
+		parser.print_help()
+		sys.exit(1)
+
+	results = parser.parse_args()
+
+	if not results.i and not results.input_dir:
+		parser.error('give input biom file(s) with -i and/or directories with -d')
+	if results.workers < 1:
+		parser.error('-w/--workers must be at least 1')
+
+	tables = results.i + find_tables(results.input_dir)
+	if not results.force:
+		skipped = [table for table in tables if is_up_to_date(table)]
+		tables = [table for table in tables if table not in skipped]
+		for table in skipped:
+			print '\nUp to date, skipped:', table
+
+	compress = results.compression == 'gzip'
+	tasks = [(table, compress) for table in tables]
+
+	if results.workers > 1 and len(tasks) > 1:
+		pool = Pool(min(results.workers, len(tasks)))
+		outputs = pool.imap(write_relativized, tasks)
+	else:
+		pool = None
+		outputs = (write_relativized(task) for task in tasks)
+
+	for table, out in zip(tables, outputs):
+		print '\nInput file:', table
+		print '\n\tSuccess!\n\tOutput file: ' + out + '\n'
+
+	if pool:
+		pool.close()
+		pool.join()
+
+
+if __name__ == '__main__':
+	main()
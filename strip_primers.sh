@@ -77,10 +77,8 @@ generated files.
 		fastq1base=`basename "$read1" | cut -d. -f1`
 		fastq2base=`basename "$read2" | cut -d. -f1`
 		index1base=`basename "$index1" | cut -d. -f1`
-		( cp $index1 $outdir/$index1base.fastq ) &
 		if [[ ! -z $index2 ]]; then
 		index2base=`basename "$index2" | cut -d. -f1`
-		( cp $index2 $outdir/$index2base.fastq ) &
 		fi
    
 ## fastq-mcf command (single process)
@@ -114,44 +112,25 @@ date "+%a %b %I:%M %p %Z %Y" >> $log
 	echo "
 Removing any empty fastq records from input files."
 
-		emptycount=`grep -e "^$" $outdir/$fastq1base.mcf.fastq | wc -l`
+## Reads and indexes are read in lockstep and written without the records
+## where either read is empty, keeping all outputs in phase
 
-		if [[ $emptycount != 0 ]]; then
-
-		grep -B 1 -e "^$" $outdir/$fastq1base.mcf.fastq > $outdir/empty.fastq.records
-		sed -i '/^\s*$/d' $outdir/empty.fastq.records
-		sed -i '/^\+/d' $outdir/empty.fastq.records
-		sed -i '/^\--/d' $outdir/empty.fastq.records
-		sed -i 's/^\@//' $outdir/empty.fastq.records
-		empties=`cat $outdir/empty.fastq.records | wc -l`
-	echo "
-Found $empties empty fastq records." >> $log
-	echo "
-Found $empties empty fastq records."
-
-		( filter_fasta.py -f $outdir/$fastq1base.mcf.fastq -o $outdir/$fastq1base.mcf.noempties.fastq -s $outdir/empty.fastq.records -n ) &
-		( filter_fasta.py -f $outdir/$fastq2base.mcf.fastq -o $outdir/$fastq2base.mcf.noempties.fastq -s $outdir/empty.fastq.records -n ) &
-		( filter_fasta.py -f $outdir/$index1base.fastq -o $outdir/$index1base.noprimers.fastq -s $outdir/empty.fastq.records -n ) &
+		if [[ -f $outdir/$fastq1base.mcf.fastq ]] && [[ -f $outdir/$fastq2base.mcf.fastq ]]; then
 		if [[ ! -z $index2 ]]; then
-		( filter_fasta.py -f $outdir/$index2base.fastq -o $outdir/$index2base.noprimers.fastq -s $outdir/empty.fastq.records -n ) &
+		indexes="$index1 $index2"
+		indexoutputs="$outdir/$index1base.noprimers.fastq $outdir/$index2base.noprimers.fastq"
+		else
+		indexes="$index1"
+		indexoutputs="$outdir/$index1base.noprimers.fastq"
 		fi
-		wait
+		emptyresult=`python $scriptdir/akutils_resources/remove_empty_records.py -r $outdir/$fastq1base.mcf.fastq $outdir/$fastq2base.mcf.fastq -x $indexes -o $outdir/$fastq1base.noprimers.fastq $outdir/$fastq2base.noprimers.fastq $indexoutputs -e $outdir/empty.fastq.records`
+	echo "
+$emptyresult" >> $log
+	echo "
+$emptyresult"
+		rm $outdir/$fastq1base.mcf.fastq $outdir/$fastq2base.mcf.fastq
 		fi
 
-## Clean up and rename files as appropriate
-echo $fastq1base
-echo $fastq2base
-	if [[ -f $outdir/$fastq1base.mcf.noempties.fastq ]]; then
-	mv $outdir/$fastq1base.mcf.noempties.fastq $outdir/$fastq1base.noprimers.fastq
-	elif [[ -f $outdir/$fastq1base.mcf.fastq ]]; then
-	mv $outdir/$fastq1base.mcf.fastq $outdir/$fastq1base.noprimers.fastq
-	fi
-	if [[ -f $outdir/$fastq2base.mcf.noempties.fastq ]]; then
-	mv $outdir/$fastq2base.mcf.noempties.fastq $outdir/$fastq2base.noprimers.fastq
-	elif [[ -f $outdir/$fastq2base.mcf.fastq ]]; then
-	mv $outdir/$fastq2base.mcf.fastq $outdir/$fastq2base.noprimers.fastq
-	fi
-
 #	if [[ -f $outdir/$fastq1base.mcf.noempties.fastq ]]; then
 #	mv $outdir/$fastq1base.mcf.noempties.fastq $outdir/$fastq1base.noprimers.fastq
 #	elif [[ -f $outdir/$fastq1base.mcf.fastq ]]; then
@@ -193,14 +172,18 @@ Building length distribution histograms of output files:
 $outdir/histogram.read1.txt
 $outdir/histogram.read2.txt
 "
+	histinputs=""
+	histoutputs=""
 	if [[ -f $outdir/$fastq1base.noprimers.fastq ]]; then
-	echo "Count Length" > $outdir/histogram.read1.txt
-	cat $outdir/$fastq1base.noprimers.fastq | awk '{if(NR%4==2) print length($1)}' | sort -V | uniq -c >> $outdir/histogram.read1.txt
+	histinputs="$histinputs $outdir/$fastq1base.noprimers.fastq"
+	histoutputs="$histoutputs $outdir/histogram.read1.txt"
 	fi
-
 	if [[ -f $outdir/$fastq2base.noprimers.fastq ]]; then
-	echo "Count Length" > $outdir/histogram.read2.txt
-	cat $outdir/$fastq2base.noprimers.fastq | awk '{if(NR%4==2) print length($1)}' | sort -V | uniq -c >> $outdir/histogram.read2.txt
+	histinputs="$histinputs $outdir/$fastq2base.noprimers.fastq"
+	histoutputs="$histoutputs $outdir/histogram.read2.txt"
+	fi
+	if [[ ! -z "$histinputs" ]]; then
+	python $scriptdir/akutils_resources/read_length_histogram.py -i $histinputs -o $histoutputs -f fastq --header -w 2 >/dev/null
 	fi
 wait
 
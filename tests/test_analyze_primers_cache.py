@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+
+""" Tests of the alignment cache of analyze_primers.py """
+
+from os.path import abspath, dirname, join
+from shutil import rmtree
+from sys import path
+from tempfile import mkdtemp
+from unittest import TestCase, main
+
+path.insert(0, join(dirname(dirname(abspath(__file__))),
+ 'akutils_resources'))
+
+from analyze_primers import AlignmentCache
+
+__author__ = "Andrew Krohn"
+__copyright__ = "Copyright 2026"
+__license__ = "zlib"
+__version__ = "1.0.0"
+
+
+class AlignmentCacheTests(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+        self.cache_fp = join(self.tmp_dir, 'cache.sqlite')
+        self.result = ('ACGT', 'ACGA', 3, 1.5, 0, 0, 1, 0, 0)
+
+    def tearDown(self):
+        rmtree(self.tmp_dir)
+
+    def test_concurrent_caches(self):
+        """ Two caches open on the same file at once do not lock each other
+        """
+
+        first = AlignmentCache(self.cache_fp, timeout=1)
+        second = AlignmentCache(self.cache_fp, timeout=1)
+        self.assertNotEqual(first.Run, second.Run)
+
+        first.addScores('primer', [('sha1', self.result)])
+        self.assertEqual(second.getScores('primer', ['sha1', 'other']),
+         [self.result, None])
+        second.addScores('primer', [('other', self.result)])
+        self.assertEqual(first.getScores('primer', ['other']),
+         [self.result])
+
+        first.close()
+        second.close()
+
+        reopened = AlignmentCache(self.cache_fp, timeout=1)
+        self.assertEqual(reopened.getScores('primer', ['sha1', 'other']),
+         [self.result, self.result])
+        reopened.close()
+
+
+if __name__ == "__main__":
+    main()